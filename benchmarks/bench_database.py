@@ -0,0 +1,84 @@
+"""
+Бенчмарк хранения ссылок в SQLite: python -m benchmarks.bench_database [rows]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base
+from src.database.operations import DatabaseOperations
+
+def generate_urls(count: int, seed: int = 42) -> List[str]:
+    """
+    Уникальные ссылки: примерно четверть инвайтов, остальное username
+    """
+    rng = random.Random(seed)
+    urls = []
+    for index in range(count):
+        if rng.random() < 0.25:
+            urls.append(f"https://t.me/+bench{index:08d}{rng.getrandbits(32):08x}")
+        else:
+            urls.append(f"https://t.me/bench_{index}")
+    return urls
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # Same settings as the production engine in src.database.database
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+def run(rows: int = 100_000) -> dict:
+    urls = generate_urls(rows)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            db_ops = DatabaseOperations(db)
+            account_id = db_ops.create_account("bench", "bench").id
+
+            started = time.perf_counter()
+            added = db_ops.add_links(account_id, urls)
+            insert_seconds = time.perf_counter() - started
+            db.expunge_all()
+
+            # Pasting the same list again only runs the duplicate check
+            started = time.perf_counter()
+            duplicates = db_ops.add_links(account_id, urls)
+            dedupe_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            pending = db_ops.get_pending_links(account_id)
+            query_seconds = time.perf_counter() - started
+        finally:
+            db.close()
+            engine.dispose()
+
+    return {
+        "rows": rows,
+        "added": len(added),
+        "duplicates_added": len(duplicates),
+        "pending": len(pending),
+        "add_links_seconds": insert_seconds,
+        "add_links_rows_per_second": rows / insert_seconds if insert_seconds else 0.0,
+        "dedupe_seconds": dedupe_seconds,
+        "get_pending_links_seconds": query_seconds,
+        "get_pending_links_rows_per_second": len(pending) / query_seconds if query_seconds else 0.0,
+    }
+
+if __name__ == "__main__":
+    result = run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
+    print(
+        f"{result['rows']} rows: add_links {result['add_links_seconds']:.2f}s "
+        f"({result['add_links_rows_per_second']:,.0f} rows/s), "
+        f"re-add {result['dedupe_seconds']:.2f}s, "
+        f"get_pending_links {result['get_pending_links_seconds']:.2f}s"
+    )
@@ -0,0 +1,83 @@
+"""
+Бенчмарк конвейера вступлений (process_links) на поддельном клиенте:
+python -m benchmarks.bench_join_pipeline [links]
+
+Время виртуальное, поэтому wall-время - это накладные расходы самого
+конвейера: планировщик, rate limiter, события, write-behind в SQLite.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_database import _set_sqlite_pragmas, generate_urls
+from src.core.account_manager import AccountManager
+from src.core.client_pool import ClientPool
+from src.core.fake_telegram import SimulatedTelegram, SimulationConfig
+from src.core.simulation import run_virtual
+from src.database.models import Base
+from src.database.operations import DatabaseOperations
+
+# Joins per minute: fast enough that virtual time does not dominate the run
+PIPELINE_RATE = 600.0
+
+async def _campaign(db_ops: DatabaseOperations, count: int) -> dict:
+    loop = asyncio.get_running_loop()
+    # No FloodWait and no cap: pacing strategies are compared with src.core.simulation,
+    # here only the cost per link matters
+    world = SimulatedTelegram(SimulationConfig(
+        links=count, member_ratio=0.0, dialog_limit=count + 1000, flood_threshold=count + 1
+    ))
+    urls = generate_urls(count)
+    for url in urls:
+        world.add_chat(url)
+
+    account = db_ops.create_account("bench", "bench")
+    links = db_ops.add_links(account.id, urls)
+    account_manager = AccountManager(
+        "bench", account.id, db_ops, pool=ClientPool(client_factory=world.client), clock=loop.time
+    )
+    await account_manager.load_joined_index()
+    # The real profile caps a free account at 500 chats; the benchmark measures the pipeline, not the cap
+    account_manager.profile.groups_limit = count + 1000
+    account_manager.pacer.max_rate = PIPELINE_RATE
+    account_manager.pacer.set(PIPELINE_RATE)
+
+    virtual_started = loop.time()
+    started = time.perf_counter()
+    success_count, fail_count = await account_manager.process_links(links)
+    elapsed = time.perf_counter() - started
+    virtual_seconds = loop.time() - virtual_started
+    await account_manager.pool.close_all()
+    return {
+        "links": count,
+        "succeeded": success_count,
+        "failed": fail_count,
+        "seconds": elapsed,
+        "links_per_second": count / elapsed if elapsed else 0.0,
+        "virtual_seconds": virtual_seconds,
+    }
+
+def run(count: int = 2_000) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            return run_virtual(_campaign(DatabaseOperations(db), count))
+        finally:
+            db.close()
+            engine.dispose()
+
+if __name__ == "__main__":
+    result = run(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000)
+    print(
+        f"{result['links']} links in {result['seconds']:.2f}s wall "
+        f"({result['links_per_second']:,.0f} links/s), {result['succeeded']} succeeded, "
+        f"{result['failed']} failed"
+    )
@@ -0,0 +1,61 @@
+"""
+Бенчмарк разбора ссылок: python -m benchmarks.bench_link_parser [lines]
+"""
+import random
+import string
+import sys
+import time
+from typing import List
+
+from src.utils.link_parser import parse_links
+
+TEMPLATES = [
+    "@{name}",
+    "t.me/{name}",
+    "https://t.me/{name}",
+    "https://t.me/{name}/{msg}",
+    "https://t.me/{name}?start=ref{msg}",
+    "https://t.me/+{hash}",
+    "https://t.me/joinchat/{hash}",
+    "https://t.me/c/{channel}/{msg}",
+    "not a link {msg}",
+]
+
+def generate_lines(count: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + "_-"
+    # Small name pool so the dataset contains realistic duplicates
+    names = [
+        rng.choice(string.ascii_letters) + "".join(rng.choices(string.ascii_lowercase + string.digits + "_", k=rng.randint(4, 20)))
+        for _ in range(max(1, count // 4))
+    ]
+    lines = []
+    for _ in range(count):
+        lines.append(rng.choice(TEMPLATES).format(
+            name=rng.choice(names),
+            msg=rng.randint(1, 100000),
+            hash="".join(rng.choices(alphabet, k=16)),
+            channel=rng.randint(10**9, 10**10)
+        ))
+    return lines
+
+def run(count: int = 1_000_000) -> dict:
+    lines = generate_lines(count)
+    started = time.perf_counter()
+    parsed_links, invalid_lines = parse_links(lines)
+    elapsed = time.perf_counter() - started
+    return {
+        "lines": count,
+        "unique": len(parsed_links),
+        "invalid": len(invalid_lines),
+        "seconds": elapsed,
+        "lines_per_second": count / elapsed if elapsed else 0.0,
+    }
+
+if __name__ == "__main__":
+    result = run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
+    print(
+        f"{result['lines']} lines in {result['seconds']:.2f}s "
+        f"({result['lines_per_second']:,.0f} lines/s), "
+        f"{result['unique']} unique, {result['invalid']} invalid"
+    )
@@ -0,0 +1,30 @@
+"""
+Бенчмарк валидации вставленного списка ссылок: python -m benchmarks.bench_validators [lines]
+"""
+import sys
+import time
+
+from benchmarks.bench_link_parser import generate_lines
+from src.utils.validators import validate_links
+
+def run(count: int = 100_000) -> dict:
+    # One paste as the bot receives it: a single message split into lines
+    paste = "\n".join(generate_lines(count))
+    started = time.perf_counter()
+    valid_links, invalid_links = validate_links(paste.split("\n"))
+    elapsed = time.perf_counter() - started
+    return {
+        "lines": count,
+        "valid": len(valid_links),
+        "invalid": len(invalid_links),
+        "seconds": elapsed,
+        "lines_per_second": count / elapsed if elapsed else 0.0,
+    }
+
+if __name__ == "__main__":
+    result = run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
+    print(
+        f"{result['lines']} lines in {result['seconds']:.2f}s "
+        f"({result['lines_per_second']:,.0f} lines/s), "
+        f"{result['valid']} valid, {result['invalid']} invalid"
+    )
@@ -0,0 +1,116 @@
+"""
+Набор бенчмарков с записью результатов в JSON:
+
+    python -m benchmarks.run                      # full sizes, 10k-1M rows
+    python -m benchmarks.run --quick              # smallest size of each
+    python -m benchmarks.run --quick --repeat 5   # fastest of 5 runs, less noise
+    python -m benchmarks.run --compare benchmarks/results/<before>.json
+
+Результаты пишутся в benchmarks/results/<UTC время>.json. С --compare
+печатается изменение каждой метрики скорости, а код выхода равен 1,
+если какая-то из них хуже базовой больше чем на --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks import bench_database, bench_join_pipeline, bench_link_parser, bench_validators
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# name -> (run function, full sizes, quick sizes)
+SUITE: Dict[str, Tuple[Callable[[int], dict], List[int], List[int]]] = {
+    "link_parser": (bench_link_parser.run, [100_000, 1_000_000], [100_000]),
+    "validate_links": (bench_validators.run, [10_000, 100_000, 1_000_000], [10_000]),
+    "database": (bench_database.run, [10_000, 100_000, 1_000_000], [10_000]),
+    "join_pipeline": (bench_join_pipeline.run, [1_000, 5_000], [1_000]),
+}
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _best(runs: List[dict]) -> dict:
+    # The fastest run is the least disturbed by the machine, compare those
+    key = next((metric for metric in runs[0] if metric.endswith("_per_second")), None)
+    return max(runs, key=lambda result: result[key]) if key else runs[0]
+
+def run_suite(quick: bool = False, only: Optional[List[str]] = None, repeat: int = 1) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    for name, (run, sizes, quick_sizes) in SUITE.items():
+        if only and name not in only:
+            continue
+        results[name] = {}
+        for size in quick_sizes if quick else sizes:
+            print(f"{name} [{size}]...", file=sys.stderr, flush=True)
+            results[name][str(size)] = _best([run(size) for _ in range(max(1, repeat))])
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """
+    Возвращает описания регрессий: метрики *_per_second, упавшие больше чем на tolerance
+    """
+    regressions = []
+    for name, sizes in current["results"].items():
+        for size, metrics in sizes.items():
+            before = baseline.get("results", {}).get(name, {}).get(size)
+            if before is None:
+                continue
+            for metric, value in metrics.items():
+                if not metric.endswith("_per_second") or not before.get(metric):
+                    continue
+                change = value / before[metric] - 1
+                line = f"{name}[{size}] {metric}: {before[metric]:,.0f} -> {value:,.0f} ({change:+.1%})"
+                print(line)
+                if change < -tolerance:
+                    regressions.append(line)
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and save the results as JSON")
+    parser.add_argument("--quick", action="store_true", help="only the smallest dataset of each benchmark")
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITE), help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per dataset, the fastest is kept")
+    parser.add_argument("--output", help="result file, default benchmarks/results/<timestamp>.json")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, default 0.2 (20%%)")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.quick, args.only, args.repeat)
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.utcnow().strftime("%Y%m%dT%H%M%SZ") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
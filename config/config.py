@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 import os
 from dotenv import load_dotenv
 
@@ -20,11 +20,73 @@ class Settings(BaseSettings):
     # Logging settings
     LOG_DIR: str = "logs"
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # "text" or "json", one object per line
+    LOG_SAMPLE_EVERY: int = 1  # keep 1 of N records from per-link call sites, 1 keeps all
     
-    # Joining settings
-    MIN_JOIN_DELAY: int = 10  # seconds
-    MAX_JOIN_DELAY: int = 300  # seconds
-    DELAY_INCREMENT: float = 0.1  # 10%
+    # Joining settings (per-account token bucket)
+    JOIN_RATE_PER_MINUTE: float = 6.0  # sustained joins per minute
+    JOIN_BURST: int = 2  # joins allowed back to back
+    JOIN_RATE_MIN_PER_MINUTE: float = 1.0  # adaptive pacing bounds
+    JOIN_RATE_MAX_PER_MINUTE: float = 30.0
+    JOIN_RATE_INCREASE: float = 1.0  # joins/min gained per minute without FloodWait
+    JOIN_RATE_DECREASE: float = 0.5  # rate multiplier on FloodWait
+    JOIN_RATE_SAVE_EVERY: int = 10  # persist the learned rate every N joins
+    ACCOUNT_SLOT_RESERVE: int = 5  # chat slots kept free on every account
+    JOIN_RETRY_MAX_ATTEMPTS: int = 3  # transient failures only
+    JOIN_RETRY_BASE_DELAY: float = 5.0  # seconds, doubled per attempt, full jitter
+    JOIN_RETRY_MAX_DELAY: float = 300.0
+    
+    # Username resolution cache
+    PEER_CACHE_TTL: int = 86400  # seconds
+    
+    # Invite pre-check settings
+    INVITE_CHECK_CONCURRENCY: int = 4
+    INVITE_CHECK_TTL: int = 3600  # seconds
+    
+    # Account info cache
+    ACCOUNT_PROFILE_TTL: int = 600  # seconds
+    
+    # Telegram client pool
+    MAX_CLIENT_CONNECTIONS: int = 50
+    CLIENT_IDLE_TIMEOUT: int = 300  # seconds
+    
+    # Warm start settings
+    WARM_START_CONCURRENCY: int = 10
+    WARM_START_TIMEOUT: int = 30  # seconds per account
+    
+    # Durable join queue
+    JOB_LEASE_SECONDS: int = 30
+    JOB_HEARTBEAT_INTERVAL: int = 10  # seconds
+    JOB_POLL_INTERVAL: float = 2.0  # seconds
+    JOB_STALLED_RETRY: float = 300.0  # seconds before a worker node retries a job its accounts could not finish
+    
+    # Write-behind persistence of join results
+    WRITE_BEHIND_BATCH_SIZE: int = 100
+    WRITE_BEHIND_FLUSH_MS: int = 500
+    WRITE_BEHIND_MAX_PENDING: int = 10000
+    
+    # Progress message updates
+    PROGRESS_EDIT_INTERVAL: float = 3.0  # seconds between edits
+    
+    # Fair share between operators (Telegram id -> weight, default 1.0)
+    OPERATOR_WEIGHTS: Dict[int, float] = {}
+    
+    # Multi-process mode: 0 runs joins in the bot process
+    WORKER_PROCESSES: int = 0
+    
+    # Multi-node coordination through account leases in the shared database
+    NODE_COORDINATION: bool = False
+    NODE_ROLE: str = "bot"  # bot/worker; worker nodes only run join jobs
+    NODE_LEASE_SECONDS: int = 60
+    NODE_HEARTBEAT_INTERVAL: int = 15  # seconds
+    
+    # Prometheus metrics endpoint: 0 disables it; worker processes use the following ports
+    METRICS_PORT: int = 0
+    METRICS_HOST: str = "127.0.0.1"
+    
+    # Per-RPC tracing: spans kept in memory, optionally appended to a JSON lines file
+    RPC_TRACE_BUFFER: int = 10000
+    RPC_TRACE_FILE: Optional[str] = None
     
     # Proxy settings
     USE_PROXY: bool = False
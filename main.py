@@ -1,12 +1,44 @@
+import asyncio
 import os
+import signal
+import time
+from config.config import settings
 from src.bot import create_bot
-from src.database.database import init_db
+from src.core.worker_node import run_worker_node
+from src.database.database import get_db, init_db
+from src.database.operations import DatabaseOperations
 from src.utils.logger import setup_logger
-import signal
-import sys
 
 logger = setup_logger(__name__)
 
+async def warm_start_stage(application):
+    """
+    Этап запуска: подключает все сохраненные аккаунты до начала polling
+    """
+    started_at = time.monotonic()
+    handlers = application.bot_data["handlers"]
+    await handlers.start_metrics()
+    if handlers.worker_pool is not None:
+        handlers.worker_pool.start()
+    ready = await handlers.restore_accounts()
+    logger.info(f"{ready} accounts ready after {time.monotonic() - started_at:.1f}s")
+    await handlers.resume_jobs(application)
+
+async def run_worker():
+    """
+    Рабочий узел без бота: своя доля аккаунтов и общая очередь заданий
+    """
+    db_ops = DatabaseOperations(next(get_db()))
+    node = asyncio.create_task(run_worker_node(db_ops))
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        # Cancel cleanly so the node hands its accounts over right away
+        loop.add_signal_handler(signum, node.cancel)
+    try:
+        await node
+    except asyncio.CancelledError:
+        logger.info("Worker node stopped")
+
 def main():
     # Create necessary directories
     os.makedirs("sessions", exist_ok=True)
@@ -15,19 +47,20 @@ def main():
     # Initialize database
     init_db()
     
+    if settings.NODE_ROLE == "worker":
+        logger.info("Starting worker node...")
+        asyncio.run(run_worker())
+        return
+    
     # Create and start bot
     bot = create_bot()
+    bot.post_init = warm_start_stage
     logger.info("Starting bot...")
 
-    def shutdown(signum, frame):
-        logger.info(f"Received signal {signum}, shutting down bot...")
-        bot.stop()
-        sys.exit(0)
-
-    signal.signal(signal.SIGINT, shutdown)
-    signal.signal(signal.SIGTERM, shutdown)
-
+    # run_polling stops on SIGINT/SIGTERM and runs post_shutdown, which
+    # flushes pending join results and closes the client pool
     bot.run_polling()
+    logger.info("Bot stopped")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -7,6 +7,10 @@ from telegram.ext import (
 )
 
 from src.bot.handlers import BotHandlers
+from src.core.client_pool import client_pool
+from src.core.events import event_bus
+from src.core.worker_pool import WorkerPool
+from src.utils.rpc_trace import rpc_tracer
 from src.database.operations import DatabaseOperations
 from src.core.session_manager import SessionManager
 from src.database.database import get_db
@@ -15,18 +19,43 @@ from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+async def shutdown_clients(application: Application):
+    """
+    Сбрасывает отложенные записи и закрывает все MTProto соединения пула
+    при остановке бота
+    """
+    handlers = application.bot_data.get("handlers")
+    if handlers is not None:
+        if handlers.worker_pool is not None:
+            await handlers.worker_pool.close()
+        if handlers.node is not None:
+            await handlers.node.close()
+        await handlers.write_buffer.close()
+        if handlers.metrics_server is not None:
+            await handlers.metrics_server.close()
+    event_bus.close()
+    await client_pool.close_all()
+    rpc_tracer.close()
+
 def create_bot() -> Application:
     """
     Создает и настраивает бота
     """
     # Create application
-    application = Application.builder().token(settings.BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(settings.BOT_TOKEN)
+        .post_shutdown(shutdown_clients)
+        .build()
+    )
     
     # Create handlers
     db = next(get_db())
     db_ops = DatabaseOperations(db)
     session_manager = SessionManager(settings.SESSION_DIR)
-    handlers = BotHandlers(db_ops, session_manager)
+    worker_pool = WorkerPool() if settings.WORKER_PROCESSES > 0 else None
+    handlers = BotHandlers(db_ops, session_manager, worker_pool)
+    application.bot_data["handlers"] = handlers
     
     # Add handlers
     application.add_handler(CommandHandler("start", handlers.start))
@@ -12,6 +12,7 @@ from typing import Dict, Optional
 import os
 
 from config.config import settings
+from src.bot.progress import ProgressReporter
 from src.core.account_manager import AccountManager
 from src.database.models import Account, Link, JoinAttempt
 from src.utils.logger import setup_logger
@@ -161,28 +162,37 @@ class TelegramBot:
         # Start joining process
         account_manager = self.active_accounts[update.effective_user.id]
         
-        async def progress_callback(success: int, failed: int, total: int):
+        # Add cancel button
+        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("Отменить", callback_data="cancel_joining")]])
+        await progress_message.edit_reply_markup(keyboard)
+        reporter = ProgressReporter(progress_message, reply_markup=keyboard)
+        owner_id = update.effective_user.id
+        
+        async def run_campaign():
+            try:
+                success, failed = await account_manager.process_links(links, reporter.update)
+            finally:
+                # Stop background edits first, a late one would overwrite the final text
+                await reporter.close()
+                if self.active_join_tasks.get(owner_id) is asyncio.current_task():
+                    del self.active_join_tasks[owner_id]
             await progress_message.edit_text(
-                f"Процесс вступления...\n"
-                f"Успешно: {success}/{total}\n"
+                f"Процесс вступления завершен!\n"
+                f"Успешно: {success}/{len(links)}\n"
                 f"Не удалось: {failed}"
             )
             
         # Create task
-        task = asyncio.create_task(
-            account_manager.process_links(links, progress_callback)
-        )
-        self.active_join_tasks[update.effective_user.id] = task
-        
-        # Add cancel button
-        keyboard = [[InlineKeyboardButton("Отменить", callback_data="cancel_joining")]]
-        await progress_message.edit_reply_markup(InlineKeyboardMarkup(keyboard))
+        task = asyncio.create_task(run_campaign())
+        self.active_join_tasks[owner_id] = task
         
     async def cancel_joining(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if update.effective_user.id in self.active_join_tasks:
             task = self.active_join_tasks[update.effective_user.id]
             task.cancel()
             del self.active_join_tasks[update.effective_user.id]
+            # Let the campaign close its progress reporter before the final edit
+            await asyncio.gather(task, return_exceptions=True)
             
             await update.callback_query.message.edit_text(
                 "Процесс вступления отменен."
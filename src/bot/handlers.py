@@ -1,12 +1,26 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 import asyncio
 
+from config.config import settings
 from src.core.account_manager import AccountManager
+from src.core.events import event_bus, subscribe_join_metrics, JOIN_QUEUED
+from src.core.invite_checker import InviteChecker
+from src.core.job_queue import JobQueue
+from src.core.join_scheduler import JoinScheduler
+from src.core.peer_cache import PeerCache
 from src.core.session_manager import SessionManager
+from src.core.node_coordinator import NodeCoordinator
+from src.core.warm_start import warm_start
+from src.core.worker_node import AccountShard
+from src.core.worker_pool import WorkerPool
+from src.database.models import Link
 from src.database.operations import DatabaseOperations
+from src.database.write_behind import WriteBehindBuffer
+from src.utils.metrics import MetricsServer, QUEUE_DEPTH
 from src.utils.validators import validate_links
+from src.bot.progress import ProgressReporter
 from src.bot.keyboards import (
     get_main_menu,
     get_account_menu,
@@ -21,7 +35,6 @@ from src.bot.messages import (
     get_links_add_message,
     get_links_added_message,
     get_joining_start_message,
-    get_joining_progress_message,
     get_joining_complete_message,
     get_failed_links_message,
     get_error_message,
@@ -33,11 +46,58 @@ from src.utils.logger import setup_logger
 logger = setup_logger(__name__)
 
 class BotHandlers:
-    def __init__(self, db_ops: DatabaseOperations, session_manager: SessionManager):
+    def __init__(self, db_ops: DatabaseOperations, session_manager: SessionManager,
+                 worker_pool: Optional[WorkerPool] = None):
         self.db_ops = db_ops
         self.session_manager = session_manager
+        self.worker_pool = worker_pool
         self.active_accounts: Dict[int, AccountManager] = {}
+        # Every connected account by account id, used to fan campaigns out
+        self.account_managers: Dict[int, AccountManager] = {}
+        self.peer_cache = PeerCache(db_ops)
+        self.invite_checker = InviteChecker()
         self.active_join_tasks: Dict[int, asyncio.Task] = {}
+        self.active_jobs: Dict[int, int] = {}
+        self.write_buffer = WriteBehindBuffer(db_ops)
+        self.node: Optional[NodeCoordinator] = None
+        if settings.NODE_COORDINATION:
+            shard = AccountShard(db_ops, self.peer_cache, self.account_managers)
+            self.node = NodeCoordinator(db_ops, on_acquired=shard.acquired, on_released=shard.released)
+        self.metrics_server: Optional[MetricsServer] = MetricsServer() if settings.METRICS_PORT else None
+        
+    async def start_metrics(self):
+        """
+        Поднимает endpoint метрик, если задан METRICS_PORT
+        """
+        if self.metrics_server is None:
+            return
+        subscribe_join_metrics(event_bus)
+        # The job queue lives in the shared database, so this covers every node
+        QUEUE_DEPTH.set_function(self.db_ops.count_queued_by_owner)
+        await self.metrics_server.start()
+        
+    async def restore_accounts(self) -> int:
+        """
+        Прогрев при старте: подключает все сохраненные аккаунты и
+        восстанавливает привязку аккаунтов к операторам
+        """
+        if self.worker_pool is not None or self.node is not None:
+            # Join workers or node leases decide which sessions this process
+            # connects; the rest connect only on demand
+            ready = [
+                (account, AccountManager(account.session_file, account.id, self.db_ops, self.peer_cache))
+                for account in self.db_ops.get_active_accounts()
+            ]
+        else:
+            ready = await warm_start(self.db_ops, self.peer_cache)
+        for account, account_manager in ready:
+            self.account_managers[account.id] = account_manager
+            if account.owner_id is not None:
+                self.active_accounts.setdefault(account.owner_id, account_manager)
+        if self.node is not None:
+            await self.node.start()
+            return len(self.node.owned)
+        return len(ready)
         
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -65,21 +125,18 @@ class BotHandlers:
         """
         state = context.user_data.get("state")
         text = update.message.text.strip()
-        logger.info(f"handle_account_input: state={state}, text={text}")
+        # The text can be a login code, never log it
+        logger.debug(f"handle_account_input: user={update.effective_user.id}, state={state}")
 
         if state == "waiting_for_links":
             links = text.split("\n")
             valid_links, invalid_links = validate_links(links)
-            logger.info(f"handle_account_input: valid_links={valid_links}, invalid_links={invalid_links}")
-            # Логируем контекст и phone
-            logger.info(f"DEBUG: context.user_data={context.user_data}")
+            logger.info(f"Received {len(valid_links)} valid and {len(invalid_links)} invalid links")
             phone = context.user_data.get("phone")
-            logger.info(f"DEBUG: phone={phone}")
             if not phone and update.effective_user.id in self.active_accounts:
                 account_manager = self.active_accounts[update.effective_user.id]
-                phone = account_manager.client.session.filename.split("/")[-1].replace(".session", "")
+                phone = account_manager.session_file.split("/")[-1].replace(".session", "")
             account = self.db_ops.get_account(phone)
-            logger.info(f"DEBUG: account from DB={account}")
             if not valid_links:
                 await update.message.reply_text(
                     get_error_message("Ни одна из ссылок не прошла валидацию. Проверьте формат: @username, t.me/..., https://...")
@@ -114,14 +171,22 @@ class BotHandlers:
                 return
             context.user_data["phone"] = text
             context.user_data["state"] = "waiting_for_code"
+            existing = self.db_ops.get_account(text)
+            if existing is not None and self.worker_pool is not None:
+                # One MTProto connection per auth key: take the session back from its worker while signing in
+                await self.worker_pool.release_account(existing.id)
             # Создаем менеджер аккаунта
             session_file = f"sessions/{text}.session"
-            account_manager = AccountManager(session_file)
+            account_manager = AccountManager(
+                session_file,
+                account_id=existing.id if existing is not None else None,
+                db_ops=self.db_ops,
+                peer_cache=self.peer_cache
+            )
             context.user_data["account_manager"] = account_manager
             try:
-                await account_manager.client.connect()
-                if not await account_manager.client.is_user_authorized():
-                    await account_manager.client.send_code_request(text)
+                if not await account_manager.is_authorized():
+                    context.user_data["phone_code_hash"] = await account_manager.send_code(text)
                     await update.message.reply_text(
                         "Код подтверждения отправлен в Telegram. Пожалуйста, введите его:"
                     )
@@ -131,9 +196,16 @@ class BotHandlers:
                     if not account:
                         account = self.db_ops.create_account(
                             phone=text,
-                            session_file=f"sessions/{text}.session"
+                            session_file=f"sessions/{text}.session",
+                            owner_id=update.effective_user.id
                         )
+                    elif account.owner_id != update.effective_user.id:
+                        self.db_ops.set_account_owner(account.id, update.effective_user.id)
+                    if account:
+                        account_manager.account_id = account.id
+                        self.account_managers[account.id] = account_manager
                     self.active_accounts[update.effective_user.id] = account_manager
+                    await self._hand_over(account_manager)
                     await update.message.reply_text(
                         "Аккаунт готов к работе. Выберите действие в меню.",
                         reply_markup=get_main_menu()
@@ -141,6 +213,7 @@ class BotHandlers:
                     context.user_data["state"] = None
             except Exception as e:
                 await update.message.reply_text(f"Ошибка при отправке кода: {e}")
+                await self._hand_over(account_manager)
                 context.user_data["state"] = None
             return
 
@@ -149,15 +222,20 @@ class BotHandlers:
             account_manager = context.user_data.get("account_manager")
             code = text
             try:
-                await account_manager.client.sign_in(phone, code)
+                await account_manager.sign_in(phone, code, context.user_data.get("phone_code_hash"))
                 # Получаем инфо об аккаунте
                 success, account_type, groups_count, groups_limit = await account_manager.get_account_info()
                 if success:
-                    account = self.db_ops.create_account(
+                    account = self.db_ops.get_account(phone) or self.db_ops.create_account(
                         phone=phone,
-                        session_file=f"sessions/{phone}.session"
+                        session_file=f"sessions/{phone}.session",
+                        owner_id=update.effective_user.id
                     )
                     if account:
+                        if account.owner_id != update.effective_user.id:
+                            self.db_ops.set_account_owner(account.id, update.effective_user.id)
+                        account_manager.account_id = account.id
+                        self.account_managers[account.id] = account_manager
                         self.active_accounts[update.effective_user.id] = account_manager
                         await update.message.reply_text(
                             get_account_info_message(account_type, groups_count, groups_limit),
@@ -173,12 +251,57 @@ class BotHandlers:
                     )
             except Exception as e:
                 await update.message.reply_text(f"Ошибка авторизации: {e}")
+            await self._hand_over(account_manager)
             context.user_data["state"] = None
             return
 
         # Если не в процессе добавления аккаунта, игнорируем
         return
         
+    async def _hand_over(self, account_manager: AccountManager):
+        """
+        После входа в многопроцессном режиме закрывает сессию здесь и
+        возвращает ее воркеру аккаунта: дальше ее держит только он
+        """
+        if self.worker_pool is not None:
+            await account_manager.pool.disconnect(account_manager.session_file)
+            if account_manager.account_id is not None:
+                await self.worker_pool.release_account(account_manager.account_id, hold=False)
+
+    async def _account_info(self, account_manager: AccountManager) -> Tuple[bool, str, int, int]:
+        if self.worker_pool is not None and account_manager.account_id is not None:
+            return await self.worker_pool.account_info(account_manager.account_id)
+        return await account_manager.get_account_info()
+
+    async def _filter_links(self, account_manager: AccountManager,
+                            links: List[Link]) -> Tuple[List[Link], List[Link], List[Link]]:
+        """
+        Предпроверка инвайтов; в многопроцессном режиме ее делает воркер,
+        который держит сессию аккаунта
+        """
+        if self.worker_pool is None:
+            return await self.invite_checker.filter_links(account_manager, links)
+        checked = None
+        if account_manager.account_id is not None:
+            checked = await self.worker_pool.check_invites(
+                account_manager.account_id, [(link.id, link.url) for link in links]
+            )
+        if checked is None:
+            logger.warning("Invite pre-check unavailable, all links go to the join queue")
+            return links, [], []
+        dead_ids, joined_ids = set(checked[0]), set(checked[1])
+        pending_links, dead_links, joined_links = [], [], []
+        for link in links:
+            if link.id in dead_ids:
+                link.status = "dead"
+                dead_links.append(link)
+            elif link.id in joined_ids:
+                link.status = "success"
+                joined_links.append(link)
+            else:
+                pending_links.append(link)
+        return pending_links, dead_links, joined_links
+
     async def check_account(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         Обработчик проверки аккаунта
@@ -186,7 +309,7 @@ class BotHandlers:
         phone = context.user_data.get("phone")
         if not phone and update.effective_user.id in self.active_accounts:
             account_manager = self.active_accounts[update.effective_user.id]
-            phone = account_manager.client.session.filename.split("/")[-1].replace(".session", "")
+            phone = account_manager.session_file.split("/")[-1].replace(".session", "")
         if not phone:
             await update.callback_query.message.reply_text(
                 get_error_message("Сначала добавьте аккаунт")
@@ -198,7 +321,7 @@ class BotHandlers:
                 get_error_message("Сначала добавьте аккаунт")
             )
             return
-        success, account_type, groups_count, groups_limit = await account_manager.get_account_info()
+        success, account_type, groups_count, groups_limit = await self._account_info(account_manager)
         if success:
             await update.callback_query.message.reply_text(
                 get_account_info_message(account_type, groups_count, groups_limit),
@@ -231,7 +354,7 @@ class BotHandlers:
         phone = context.user_data.get("phone")
         if not phone and update.effective_user.id in self.active_accounts:
             account_manager = self.active_accounts[update.effective_user.id]
-            phone = account_manager.client.session.filename.split("/")[-1].replace(".session", "")
+            phone = account_manager.session_file.split("/")[-1].replace(".session", "")
         if not phone:
             await update.callback_query.message.reply_text(
                 get_error_message("Сначала добавьте аккаунт")
@@ -249,20 +372,120 @@ class BotHandlers:
                 get_error_message("Нет ссылок для вступления")
             )
             return
+        if update.effective_user.id in self.active_join_tasks:
+            await update.callback_query.message.reply_text(
+                get_error_message("Процесс вступления уже запущен")
+            )
+            return
         progress_message = await update.callback_query.message.reply_text(
             get_joining_start_message(),
             reply_markup=get_joining_menu()
         )
-        account_manager = self.active_accounts[update.effective_user.id]
-        async def progress_callback(success: int, failed: int, total: int):
+        owner_id = update.effective_user.id
+        account_manager = self.active_accounts[owner_id]
+        account_managers = self._campaign_managers(account_manager)
+        async def run_campaign():
+            try:
+                # Drop dead invites and chats we are already in before they take a join slot
+                pending_links, dead_links, joined_links = await self._filter_links(account_manager, links)
+                for link in dead_links + joined_links:
+                    self.write_buffer.set_link_status(link.id, link.status)
+                job = self.db_ops.create_join_job(owner_id, pending_links)
+                if job is None:
+                    await progress_message.edit_text(
+                        get_error_message("Не удалось создать задание на вступление"),
+                        reply_markup=get_main_menu()
+                    )
+                    return
+                self.active_jobs[owner_id] = job.id
+                for link in pending_links:
+                    event_bus.publish(JOIN_QUEUED, link.account_id, link.url)
+                await self._run_job(owner_id, job.id, account_managers, progress_message,
+                                    len(joined_links), len(dead_links))
+            except Exception as e:
+                logger.error(f"Join campaign for user {owner_id} failed: {e}")
+                await progress_message.edit_text(
+                    get_error_message(str(e)),
+                    reply_markup=get_main_menu()
+                )
+            finally:
+                # Also on the early returns above, otherwise the operator is locked out until restart
+                if self.active_join_tasks.get(owner_id) is asyncio.current_task():
+                    del self.active_join_tasks[owner_id]
+        task = asyncio.create_task(run_campaign())
+        self.active_join_tasks[owner_id] = task
+        
+    def _campaign_managers(self, account_manager: Optional[AccountManager]) -> List[AccountManager]:
+        """
+        Все подключенные аккаунты для кампании, аккаунт оператора первым
+        """
+        account_managers = [account_manager] if account_manager is not None else []
+        account_managers += [
+            manager for manager in dict.fromkeys(self.account_managers.values())
+            if manager is not account_manager
+        ]
+        return account_managers
+        
+    async def _run_job(self, owner_id: int, job_id: int, account_managers: List[AccountManager],
+                       progress_message, joined_before: int = 0, dead_before: int = 0):
+        reporter = ProgressReporter(progress_message, reply_markup=get_joining_menu())
+        try:
+            # Both a local JoinScheduler and a worker pool run expose the same counters
+            if self.worker_pool is not None:
+                run = await self.worker_pool.run_job(
+                    job_id, owner_id, self.db_ops.count_work_items(job_id), reporter.update
+                )
+            else:
+                run = JoinScheduler(
+                    account_managers, reporter.update, self.write_buffer, owner_id,
+                    is_owned=self.node.owns if self.node is not None else None
+                )
+                await run.run_job(JobQueue(self.db_ops), job_id)
+            success, failed = run.success_count, run.fail_count
+            left = 0
+            if not self.db_ops.finish_join_job(job_id):
+                # Every account retired with links still queued: the job stays open for a later run
+                left = JobQueue(self.db_ops).remaining(job_id)
+            await reporter.close()
             await progress_message.edit_text(
-                get_joining_progress_message(success, failed, total),
+                get_joining_complete_message(
+                    success + joined_before,
+                    failed + dead_before,
+                    run.total + joined_before + dead_before,
+                    run.joins_per_minute,
+                    left
+                ),
+                reply_markup=get_error_details_menu()
+            )
+        finally:
+            await reporter.close()
+            if self.active_jobs.get(owner_id) == job_id:
+                del self.active_jobs[owner_id]
+                self.active_join_tasks.pop(owner_id, None)
+                
+    async def resume_jobs(self, application) -> int:
+        """
+        Продолжает задания, прерванные перезапуском: элементы с истекшим lease
+        снова попадают в очередь, уже выполненные не повторяются
+        """
+        requeued = self.db_ops.requeue_expired_leases()
+        resumed = 0
+        for job in self.db_ops.get_unfinished_jobs():
+            account_managers = self._campaign_managers(self.active_accounts.get(job.owner_id))
+            if not account_managers or job.owner_id in self.active_join_tasks:
+                continue
+            progress_message = await application.bot.send_message(
+                job.owner_id,
+                get_joining_start_message(),
                 reply_markup=get_joining_menu()
             )
-        task = asyncio.create_task(
-            account_manager.process_links(links, progress_callback)
-        )
-        self.active_join_tasks[update.effective_user.id] = task
+            self.active_jobs[job.owner_id] = job.id
+            self.active_join_tasks[job.owner_id] = asyncio.create_task(
+                self._run_job(job.owner_id, job.id, account_managers, progress_message)
+            )
+            resumed += 1
+        logger.info(f"Resumed {resumed} join jobs, requeued {requeued} expired leases")
+        return resumed
         
     async def cancel_joining(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -272,6 +495,9 @@ class BotHandlers:
             task = self.active_join_tasks[update.effective_user.id]
             task.cancel()
             del self.active_join_tasks[update.effective_user.id]
+            job_id = self.active_jobs.pop(update.effective_user.id, None)
+            if job_id is not None:
+                self.db_ops.finish_join_job(job_id, "cancelled")
             
             await update.callback_query.message.edit_text(
                 get_cancelled_message(),
@@ -285,7 +511,7 @@ class BotHandlers:
         phone = context.user_data.get("phone")
         if not phone and update.effective_user.id in self.active_accounts:
             account_manager = self.active_accounts[update.effective_user.id]
-            phone = account_manager.client.session.filename.split("/")[-1].replace(".session", "")
+            phone = account_manager.session_file.split("/")[-1].replace(".session", "")
         if not phone:
             await update.callback_query.message.reply_text(
                 get_error_message("Сначала добавьте аккаунт")
@@ -51,11 +51,14 @@ def get_joining_progress_message(success: int, failed: int, total: int) -> str:
         f"Не удалось: {failed}"
     )
 
-def get_joining_complete_message(success: int, failed: int, total: int) -> str:
+def get_joining_complete_message(success: int, failed: int, total: int,
+                                 joins_per_minute: float = 0.0, left: int = 0) -> str:
     return (
-        f"Процесс вступления завершен!\n\n"
+        f"Процесс вступления {'приостановлен' if left else 'завершен'}!\n\n"
         f"Успешно: {success}/{total}\n"
-        f"Не удалось: {failed}\n\n"
+        f"Не удалось: {failed}\n"
+        + (f"Ожидают свободного аккаунта: {left}\n" if left else "")
+        + f"Скорость: {joins_per_minute:.1f} вступлений/мин\n\n"
         "Нажмите 'Показать ошибки' чтобы увидеть детали."
     )
 
@@ -0,0 +1,82 @@
+import asyncio
+from typing import Callable, Optional, Tuple
+
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from config.config import settings
+from src.bot.messages import get_joining_progress_message
+from src.utils.logger import setup_logger
+from src.utils.metrics import BOT_EDITS
+
+logger = setup_logger(__name__)
+
+class ProgressReporter:
+    """
+    Обновляет сообщение о прогрессе в фоне, не блокируя вступления.
+
+    update() только запоминает последние счетчики; отдельная задача
+    редактирует сообщение не чаще раза в min_interval секунд, всегда
+    с актуальными числами, и пропускает правку, если текст не изменился.
+    """
+    def __init__(self, message, reply_markup=None,
+                 render: Callable[[int, int, int], str] = get_joining_progress_message,
+                 min_interval: float = settings.PROGRESS_EDIT_INTERVAL):
+        self.message = message
+        self.reply_markup = reply_markup
+        self.render = render
+        self.min_interval = min_interval
+        self._latest: Optional[Tuple[int, int, int]] = None
+        self._last_text: Optional[str] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, success: int, failed: int, total: int):
+        self._latest = (success, failed, total)
+        if self._task is None:
+            self._changed = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._changed.set()
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            await self._edit(self.render(*self._latest))
+            await asyncio.sleep(self.min_interval)
+
+    async def _edit(self, text: str):
+        if text == self._last_text:
+            return
+        try:
+            await self.message.edit_text(text, reply_markup=self.reply_markup)
+            self._last_text = text
+            BOT_EDITS.inc("ok")
+        except RetryAfter as e:
+            BOT_EDITS.inc("retry_after")
+            logger.warning(f"Progress edit rate limited, retrying in {e.retry_after}s")
+            await asyncio.sleep(e.retry_after)
+            # Retry with whatever the counts are by then
+            self._changed.set()
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                self._last_text = text
+                BOT_EDITS.inc("not_modified")
+            else:
+                BOT_EDITS.inc("error")
+                logger.warning(f"Failed to edit progress message: {e}")
+        except TelegramError as e:
+            BOT_EDITS.inc("error")
+            logger.warning(f"Failed to edit progress message: {e}")
+
+    async def close(self):
+        """
+        Останавливает фоновые правки; итоговое сообщение пишет вызывающий
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
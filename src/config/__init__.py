@@ -24,10 +24,18 @@ class Settings(BaseSettings):
     LOG_DIR: str = "logs"
     LOG_LEVEL: str = "INFO"
     
-    # Joining settings
-    MIN_JOIN_DELAY: int = 10  # seconds
-    MAX_JOIN_DELAY: int = 300  # seconds
-    DELAY_INCREMENT: float = 0.1  # 10%
+    # Joining settings (per-account token bucket)
+    JOIN_RATE_PER_MINUTE: float = 6.0  # sustained joins per minute
+    JOIN_BURST: int = 2  # joins allowed back to back
+    JOIN_RATE_MIN_PER_MINUTE: float = 1.0  # adaptive pacing bounds
+    JOIN_RATE_MAX_PER_MINUTE: float = 30.0
+    JOIN_RATE_INCREASE: float = 1.0  # joins/min gained per minute without FloodWait
+    JOIN_RATE_DECREASE: float = 0.5  # rate multiplier on FloodWait
+    JOIN_RATE_SAVE_EVERY: int = 10  # persist the learned rate every N joins
+    ACCOUNT_SLOT_RESERVE: int = 5  # chat slots kept free on every account
+    JOIN_RETRY_MAX_ATTEMPTS: int = 3  # transient failures only
+    JOIN_RETRY_BASE_DELAY: float = 5.0  # seconds, doubled per attempt, full jitter
+    JOIN_RETRY_MAX_DELAY: float = 300.0
     
     # Proxy settings
     USE_PROXY: bool = False
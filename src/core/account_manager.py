@@ -1,140 +1,385 @@
 from telethon import TelegramClient
 from telethon.tl.functions.channels import JoinChannelRequest
-from telethon.tl.functions.messages import ImportChatInviteRequest
+from telethon.tl.functions.messages import CheckChatInviteRequest, ImportChatInviteRequest
 from telethon.errors import (
+    AuthKeyUnregisteredError,
     ChatAdminRequiredError,
+    ChannelInvalidError,
     ChannelPrivateError,
+    ChannelsTooMuchError,
     InviteHashExpiredError,
     UserAlreadyParticipantError,
-    FloodWaitError
+    FloodWaitError,
+    PeerIdInvalidError,
+    SessionRevokedError,
+    UserDeactivatedBanError,
+    UserDeactivatedError
 )
-import re
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple, TYPE_CHECKING
 import asyncio
+import time
 from datetime import datetime
 
 from config.config import settings
 from src.database.models import Account, Link, JoinAttempt
-from src.utils.logger import setup_logger
+from src.core.account_profile import AccountProfile
+from src.core.client_pool import ClientPool, client_pool
+from src.core.events import (
+    EventBus,
+    event_bus,
+    JOIN_FAILED,
+    JOIN_FLOOD_WAIT,
+    JOIN_STARTED,
+    JOIN_SUCCEEDED
+)
+from src.core.join_scheduler import JoinScheduler
+from src.database.write_behind import WriteBehindBuffer
+from src.core.join_errors import (
+    classify_error,
+    JoinResult,
+    ERROR_ACCOUNT,
+    ERROR_PERMANENT,
+    ERROR_RATE_LIMITED
+)
+from src.core.joined_index import JoinedIndex
+from src.core.peer_cache import PeerCache
+from src.core.rate_limiter import AimdPacer, TokenBucket
+from src.utils.link_parser import parse_link, LINK_INVITE, LINK_PRIVATE, LINK_USERNAME
+from src.utils.logger import SAMPLED, setup_logger
+
+if TYPE_CHECKING:
+    from src.database.operations import DatabaseOperations
 
 logger = setup_logger(__name__)
 
+JOIN_OPERATION = "join"
+
+# The account itself can no longer join anything
+ACCOUNT_DEAD_ERRORS = (
+    AuthKeyUnregisteredError,
+    SessionRevokedError,
+    UserDeactivatedBanError,
+    UserDeactivatedError
+)
+
 class AccountManager:
-    def __init__(self, session_file: str):
-        self.client = TelegramClient(
-            session_file,
-            settings.API_ID,
-            settings.API_HASH,
-            proxy=self._get_proxy_settings()
+    """
+    Операции одного аккаунта поверх клиента из пула.
+
+    pool задает, откуда берутся клиенты (по умолчанию общий пул
+    TelegramClient), clock - часы rate limiter; симуляция подставляет
+    пул с поддельными клиентами и виртуальное время event loop.
+    """
+    def __init__(self, session_file: str, account_id: Optional[int] = None,
+                 db_ops: Optional["DatabaseOperations"] = None,
+                 peer_cache: Optional[PeerCache] = None,
+                 events: EventBus = event_bus,
+                 pool: ClientPool = client_pool,
+                 clock: Callable[[], float] = time.monotonic):
+        self.session_file = session_file
+        self.account_id = account_id
+        self.db_ops = db_ops
+        self.peer_cache = peer_cache or PeerCache(db_ops)
+        self.events = events
+        self.pool = pool
+        self.joined_index = JoinedIndex()
+        self.profile: Optional[AccountProfile] = None
+        self._profile_refresh: Optional[asyncio.Task] = None
+        self.rate_limiter = TokenBucket(
+            settings.JOIN_RATE_PER_MINUTE / 60,
+            settings.JOIN_BURST,
+            clock
         )
-        self.current_delay = settings.MIN_JOIN_DELAY
+        self.pacer = AimdPacer(
+            self.rate_limiter,
+            settings.JOIN_RATE_MIN_PER_MINUTE,
+            settings.JOIN_RATE_MAX_PER_MINUTE,
+            settings.JOIN_RATE_INCREASE,
+            settings.JOIN_RATE_DECREASE
+        )
+        self._joins_since_save = 0
+        self.healthy = True
+        self.chat_limit_reached = False
+        
+    def restore_cooldown(self) -> float:
+        """
+        Переносит сохраненную в БД блокировку в rate limiter без обращения к Telegram.
+        Возвращает оставшееся время блокировки в секундах.
+        """
+        if self.db_ops is None or self.account_id is None:
+            return 0.0
+        blocked_until = self.db_ops.get_blocked_until(self.account_id, JOIN_OPERATION)
+        if blocked_until is None:
+            return 0.0
+        remaining = (blocked_until - datetime.utcnow()).total_seconds()
+        if remaining > 0:
+            self.rate_limiter.set_cooldown(remaining)
+        return max(0.0, remaining)
+        
+    def restore_pacing(self) -> float:
+        """
+        Продолжает с выученной в прошлых запусках скорости вступлений.
+        Возвращает текущую скорость (вступлений в минуту).
+        """
+        if self.db_ops is not None and self.account_id is not None:
+            rate = self.db_ops.get_join_rate(self.account_id)
+            if rate:
+                self.pacer.set(rate)
+        return self.pacer.rate
         
-    def _get_proxy_settings(self):
-        if not settings.USE_PROXY:
-            return None
+    def save_pacing(self):
+        self._joins_since_save = 0
+        if self.db_ops is not None and self.account_id is not None:
+            self.db_ops.save_join_rate(self.account_id, self.pacer.rate)
             
-        return {
-            'proxy_type': settings.PROXY_TYPE,
-            'addr': settings.PROXY_HOST,
-            'port': settings.PROXY_PORT,
-            'username': settings.PROXY_USERNAME,
-            'password': settings.PROXY_PASSWORD
-        }
+    def _on_join_success(self):
+        self.pacer.on_success()
+        self._joins_since_save += 1
+        if self._joins_since_save >= settings.JOIN_RATE_SAVE_EVERY:
+            self.save_pacing()
         
+    @property
+    def client(self) -> TelegramClient:
+        """
+        Клиент сессии из общего пула (может быть еще не подключен)
+        """
+        return self.pool.get_client(self.session_file)
+        
+    async def is_authorized(self) -> bool:
+        async with self.pool.lease(self.session_file) as client:
+            return await client.is_user_authorized()
+            
     async def connect(self) -> bool:
         try:
-            await self.client.connect()
-            return await self.client.is_user_authorized()
+            return await self.is_authorized()
         except Exception as e:
             logger.error(f"Failed to connect: {e}")
             return False
             
-    async def get_account_info(self) -> Tuple[bool, str, int, int]:
-        try:
-            me = await self.client.get_me()
-            full = await self.client.get_entity(me.id)
+    async def send_code(self, phone: str) -> str:
+        """
+        Отправляет код подтверждения, возвращает phone_code_hash
+        """
+        async with self.pool.lease(self.session_file) as client:
+            sent_code = await client.send_code_request(phone)
+            return sent_code.phone_code_hash
             
-            # Get account type
-            account_type = "free"
-            if hasattr(full, 'premium'):
-                account_type = "premium"
-            elif hasattr(full, 'business'):
-                account_type = "business"
-                
-            # Get groups count and limit
-            dialogs = await self.client.get_dialogs()
-            groups_count = len([d for d in dialogs if d.is_group or d.is_channel])
+    async def sign_in(self, phone: str, code: str, phone_code_hash: Optional[str] = None):
+        async with self.pool.lease(self.session_file) as client:
+            return await client.sign_in(phone, code, phone_code_hash=phone_code_hash)
+            
+    async def refresh_profile(self) -> AccountProfile:
+        """
+        Пересчитывает профиль одним потоковым проходом по диалогам.
+        Тот же проход заново строит индекс вступленных чатов.
+        """
+        async with self.pool.lease(self.session_file) as client:
+            me = await client.get_me()
+            account_type = "premium" if getattr(me, 'premium', False) else "free"
             
-            # Approximate limit based on account type
-            groups_limit = 500 if account_type == "free" else 2000
+            # Campaigns keep checking the current index while the walk runs,
+            # so build a fresh one aside and swap it in once it is complete
+            self.joined_index.snapshot()
+            rebuilt = JoinedIndex()
+            groups_count = 0
+            async for dialog in client.iter_dialogs():
+                if dialog.is_group or dialog.is_channel:
+                    groups_count += 1
+                rebuilt.add(dialog.entity)
+            rebuilt.mark_loaded()
+            self.joined_index.replace(rebuilt)
+        
+        # Approximate limit based on account type
+        groups_limit = 500 if account_type == "free" else 2000
+        
+        self.profile = AccountProfile(account_type, groups_count, groups_limit)
+        # get_me and the dialog walk just succeeded: the account is alive and its chat count is fresh
+        self.healthy = True
+        self.chat_limit_reached = False
+        return self.profile
+        
+    async def _refresh_profile_in_background(self):
+        try:
+            await self.refresh_profile()
+        except Exception as e:
+            logger.error(f"Failed to refresh account profile: {e}")
+        finally:
+            self._profile_refresh = None
             
-            return True, account_type, groups_count, groups_limit
+    async def get_account_info(self) -> Tuple[bool, str, int, int]:
+        """
+        Возвращает профиль из кеша; устаревший профиль обновляется в фоне
+        """
+        try:
+            if self.profile is None:
+                return (await self.refresh_profile()).as_info()
+            if not self.profile.is_fresh(settings.ACCOUNT_PROFILE_TTL) and self._profile_refresh is None:
+                self._profile_refresh = asyncio.create_task(self._refresh_profile_in_background())
+            return self.profile.as_info()
         except Exception as e:
             logger.error(f"Failed to get account info: {e}")
             return False, "unknown", 0, 0
             
-    async def join_chat(self, url: str) -> Tuple[bool, str]:
+    def _on_chats_changed(self, delta: int):
+        if self.profile is not None:
+            self.profile.groups_count = max(0, self.profile.groups_count + delta)
+        if delta < 0:
+            self.chat_limit_reached = False
+            
+    def can_join(self) -> bool:
+        """
+        Может ли аккаунт брать новые ссылки: жив и не исчерпал лимит чатов
+        (с запасом ACCOUNT_SLOT_RESERVE). Без профиля лимит считается неизвестным.
+        """
+        if not self.healthy or self.chat_limit_reached:
+            return False
+        return self.profile is None or self.profile.free_slots > settings.ACCOUNT_SLOT_RESERVE
+            
+    async def resolve_entity(self, username: str):
+        """
+        Резолвит username через Telegram и кладет результат в кеш
+        """
+        async with self.pool.lease(self.session_file) as client:
+            entity = await client.get_entity(username)
+        self.peer_cache.put(self.account_id, username, entity)
+        return entity
+        
+    async def _join_channel(self, username: str):
+        cached = self.peer_cache.get(self.account_id, username)
+        if cached is not None and cached.peer_type == "channel":
+            try:
+                # Cached input peer: no ResolveUsername call at all
+                return await self.client(JoinChannelRequest(cached.to_input_channel()))
+            except (ChannelInvalidError, PeerIdInvalidError):
+                # Stale access_hash: drop the entry and resolve once more
+                self.peer_cache.invalidate(self.account_id, username)
+        entity = await self.resolve_entity(username)
+        return await self.client(JoinChannelRequest(entity))
+        
+    async def load_joined_index(self) -> JoinedIndex:
+        """
+        Строит индекс вступленных чатов (вместе с профилем) один раз
+        """
+        if not self.joined_index.is_loaded:
+            try:
+                await self.refresh_profile()
+                logger.info(f"Joined index for account {self.account_id}: {len(self.joined_index)} chats")
+            except Exception as e:
+                logger.error(f"Failed to build joined index: {e}")
+        return self.joined_index
+        
+    async def leave_chat(self, url: str) -> Tuple[bool, str]:
+        """
+        Выходит из канала/группы и обновляет профиль и индекс без полного пересчета
+        """
+        try:
+            parsed = parse_link(url)
+            if parsed is None or parsed.kind != LINK_USERNAME:
+                return False, "Only public username links can be left"
+            async with self.pool.lease(self.session_file) as client:
+                cached = self.peer_cache.get(self.account_id, parsed.value)
+                if cached is not None:
+                    peer, peer_id = cached.to_input_peer(), cached.peer_id
+                else:
+                    peer = await self.resolve_entity(parsed.value)
+                    peer_id = peer.id
+                await client.delete_dialog(peer)
+            self.joined_index.discard(peer_id, parsed.value)
+            self._on_chats_changed(-1)
+            return True, ""
+        except Exception as e:
+            logger.error(f"Failed to leave chat {url}: {e}")
+            return False, str(e)
+        
+    def is_joined(self, url: str) -> bool:
+        """
+        Проверяет по индексу, состоит ли аккаунт уже в чате (без RPC)
+        """
+        parsed = parse_link(url)
+        if parsed is None:
+            return False
+        peer_id = None
+        if parsed.kind == LINK_USERNAME:
+            cached = self.peer_cache.get(self.account_id, parsed.value)
+            peer_id = cached.peer_id if cached is not None else None
+        return self.joined_index.contains(parsed, peer_id)
+            
+    async def check_invite(self, invite_hash: str):
+        """
+        Проверяет invite hash без вступления (ChatInvite/ChatInviteAlready/ChatInvitePeek)
+        """
+        async with self.pool.lease(self.session_file) as client:
+            return await client(CheckChatInviteRequest(invite_hash))
+            
+    async def join_chat(self, url: str) -> JoinResult:
         try:
-            # Extract username or invite hash
-            if 't.me/' in url:
-                username = url.split('t.me/')[-1]
-            elif url.startswith('@'):
-                username = url[1:]
-            else:
-                username = url
+            parsed = parse_link(url)
+            if parsed is None:
+                self.events.publish(JOIN_FAILED, self.account_id, url, "Invalid link", error_class=ERROR_PERMANENT)
+                return JoinResult(False, "Invalid link", ERROR_PERMANENT)
+            if parsed.kind == LINK_PRIVATE:
+                self.events.publish(
+                    JOIN_FAILED, self.account_id, url, "Private channel link", error_class=ERROR_PERMANENT
+                )
+                return JoinResult(False, "Private channel link, an invite link is required", ERROR_PERMANENT)
                 
+            # Wait for a free slot in this account's bucket
+            await self.rate_limiter.acquire()
+            self.events.publish(JOIN_STARTED, self.account_id, url)
+
             # Try to join
-            if '+' in username or len(username) > 5:  # Likely an invite link
-                invite_hash = username.split('+')[-1]
-                await self.client(ImportChatInviteRequest(invite_hash))
-            else:
-                await self.client(JoinChannelRequest(username))
+            async with self.pool.lease(self.session_file) as client:
+                if parsed.kind == LINK_INVITE:
+                    updates = await client(ImportChatInviteRequest(parsed.value))
+                else:
+                    updates = await self._join_channel(parsed.value)
+                    self.joined_index.add_username(parsed.value)
+            self.joined_index.add_from_updates(updates)
+            self._on_chats_changed(1)
+            self._on_join_success()
+            self.events.publish(JOIN_SUCCEEDED, self.account_id, url)
                 
-            # Update delay
-            self.current_delay = min(
-                self.current_delay * (1 + settings.DELAY_INCREMENT),
-                settings.MAX_JOIN_DELAY
-            )
-            
-            return True, ""
+            return JoinResult(True)
         except UserAlreadyParticipantError:
-            return True, "Already a member"
+            if parsed.kind == LINK_USERNAME:
+                self.joined_index.add_username(parsed.value)
+            self._on_join_success()
+            self.events.publish(JOIN_SUCCEEDED, self.account_id, url, "Already a member")
+            return JoinResult(True, "Already a member")
         except FloodWaitError as e:
             wait_time = e.seconds
-            self.current_delay = max(wait_time, self.current_delay)
-            return False, f"Flood wait: {wait_time} seconds"
+            self.rate_limiter.set_cooldown(wait_time)
+            rate = self.pacer.on_flood_wait()
+            self.save_pacing()
+            logger.info(f"Account {self.account_id} hit FloodWait, join rate cut to {rate:.1f}/min", extra=SAMPLED)
+            if self.db_ops is not None and self.account_id is not None:
+                self.db_ops.set_cooldown(self.account_id, JOIN_OPERATION, wait_time, str(e))
+            self.events.publish(JOIN_FLOOD_WAIT, self.account_id, url, str(e), wait_time, ERROR_RATE_LIMITED)
+            return JoinResult(False, f"Flood wait: {wait_time} seconds", ERROR_RATE_LIMITED)
+        except ChannelsTooMuchError as e:
+            self.chat_limit_reached = True
+            logger.warning(f"Account {self.account_id} reached its chat limit")
+            self.events.publish(JOIN_FAILED, self.account_id, url, str(e), error_class=ERROR_ACCOUNT)
+            return JoinResult(False, "Chat limit reached", ERROR_ACCOUNT)
+        except ACCOUNT_DEAD_ERRORS as e:
+            self.healthy = False
+            logger.error(f"Account {self.account_id} can no longer join: {e!r}")
+            self.events.publish(JOIN_FAILED, self.account_id, url, str(e), error_class=ERROR_ACCOUNT)
+            return JoinResult(False, str(e), ERROR_ACCOUNT)
         except (ChatAdminRequiredError, ChannelPrivateError, InviteHashExpiredError) as e:
-            return False, str(e)
+            self.events.publish(JOIN_FAILED, self.account_id, url, str(e), error_class=ERROR_PERMANENT)
+            return JoinResult(False, str(e), ERROR_PERMANENT)
         except Exception as e:
-            logger.error(f"Failed to join chat {url}: {e}")
-            return False, str(e)
+            error_class = classify_error(e)
+            logger.error(f"Failed to join chat {url} ({error_class}): {e!r}", extra=SAMPLED)
+            self.events.publish(JOIN_FAILED, self.account_id, url, str(e), error_class=error_class)
+            return JoinResult(False, str(e) or type(e).__name__, error_class)
             
     async def process_links(self, links: list[Link], progress_callback=None) -> Tuple[int, int]:
-        success_count = 0
-        fail_count = 0
-        
-        for link in links:
-            if progress_callback:
-                await progress_callback(success_count, fail_count, len(links))
-                
-            success, error = await self.join_chat(link.url)
-            
-            if success:
-                success_count += 1
-                link.status = "success"
-            else:
-                fail_count += 1
-                link.status = "failed"
-                
-            # Create join attempt record
-            join_attempt = JoinAttempt(
-                account_id=link.account_id,
-                link_id=link.id,
-                status="success" if success else "failed",
-                error_message=error
-            )
-            
-            # Wait before next join
-            await asyncio.sleep(self.current_delay)
-            
-        return success_count, fail_count 
\ No newline at end of file
+        write_buffer = WriteBehindBuffer(self.db_ops) if self.db_ops is not None else None
+        scheduler = JoinScheduler([self], progress_callback, write_buffer, clock=self.rate_limiter.clock)
+        try:
+            return await scheduler.run(links)
+        finally:
+            if write_buffer is not None:
+                await write_buffer.close()
@@ -0,0 +1,22 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+@dataclass
+class AccountProfile:
+    """
+    Закешированная информация об аккаунте для кнопки "Проверить аккаунт"
+    """
+    account_type: str
+    groups_count: int
+    groups_limit: int
+    refreshed_at: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def free_slots(self) -> int:
+        return max(0, self.groups_limit - self.groups_count)
+
+    def is_fresh(self, ttl: int) -> bool:
+        return datetime.utcnow() - self.refreshed_at < timedelta(seconds=ttl)
+
+    def as_info(self):
+        return True, self.account_type, self.groups_count, self.groups_limit
@@ -0,0 +1,247 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+
+from telethon import TelegramClient
+from telethon.errors import FloodTestPhoneWaitError, FloodWaitError, SlowModeWaitError
+
+from config.config import settings
+from src.utils.logger import setup_logger
+from src.utils.rpc_trace import RpcTracer, request_name, rpc_tracer
+
+logger = setup_logger(__name__)
+
+def get_proxy_settings():
+    if not settings.USE_PROXY:
+        return None
+
+    return {
+        'proxy_type': settings.PROXY_TYPE,
+        'addr': settings.PROXY_HOST,
+        'port': settings.PROXY_PORT,
+        'username': settings.PROXY_USERNAME,
+        'password': settings.PROXY_PASSWORD
+    }
+
+class TracedTelegramClient(TelegramClient):
+    """
+    TelegramClient, который записывает каждый MTProto вызов в RpcTracer.
+
+    Высокоуровневые методы (get_entity, iter_dialogs, sign_in и т.д.)
+    тоже идут через __call__, поэтому в журнал попадают все запросы.
+
+    Короткие FloodWait Telethon проспал бы внутри вызова, и он попал бы
+    в журнал как успешный запрос на десятки секунд. Поэтому клиент спит
+    сам, между вызовами: каждая попытка - отдельная запись, FloodWait
+    записывается с исходом FloodWaitError.
+    """
+    def __init__(self, session: str, *args, tracer: RpcTracer = rpc_tracer, **kwargs):
+        super().__init__(session, *args, **kwargs)
+        self._tracer = tracer
+        self._auto_sleep_threshold = self.flood_sleep_threshold
+        self.flood_sleep_threshold = 0
+        self._trace_account = os.path.basename(session)
+        proxy = kwargs.get("proxy")
+        self._trace_proxy = f"{proxy['addr']}:{proxy['port']}" if proxy else ""
+
+    async def __call__(self, request, ordered=False, flood_sleep_threshold=None):
+        threshold = self._auto_sleep_threshold if flood_sleep_threshold is None else flood_sleep_threshold
+        attempts = max(1, self._request_retries)
+        for attempt in range(1, attempts + 1):
+            try:
+                with self._tracer.span(request, self._trace_account, self.session.dc_id, self._trace_proxy):
+                    return await super().__call__(request, ordered, 0)
+            except (FloodWaitError, SlowModeWaitError, FloodTestPhoneWaitError) as e:
+                if e.seconds > threshold or attempt == attempts:
+                    raise
+                logger.info(f"Sleeping {e.seconds}s on {type(e).__name__} before retrying {request_name(request)}")
+                await asyncio.sleep(max(1, e.seconds))
+
+    async def connect(self):
+        # Connection setup covers the proxy handshake, traced apart from requests
+        with self._tracer.span("connect", self._trace_account, self.session.dc_id, self._trace_proxy):
+            return await super().connect()
+
+class ClientPool:
+    """
+    Общий для процесса пул TelegramClient, один клиент на файл сессии.
+
+    Клиенты подключаются лениво, число открытых MTProto соединений
+    ограничено max_connections. Когда лимит достигнут, отключается
+    давно не используемый клиент (LRU); клиенты, занятые через lease(),
+    не вытесняются. Фоновая задача отключает клиентов, простаивающих
+    дольше idle_timeout, и удаляет лишние отключенные объекты.
+
+    client_factory создает клиента по файлу сессии. По умолчанию это
+    TelegramClient; подойдет любой объект с тем же интерфейсом
+    (connect/disconnect/is_connected, вызов запроса и методы, которые
+    использует AccountManager), например FakeTelegramClient из simulation.
+    """
+    def __init__(self, max_connections: int = settings.MAX_CLIENT_CONNECTIONS,
+                 idle_timeout: int = settings.CLIENT_IDLE_TIMEOUT,
+                 client_factory: Optional[Callable[[str], TelegramClient]] = None):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.client_factory = client_factory or self._telegram_client
+        self._clients: "OrderedDict[str, TelegramClient]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._in_use: Dict[str, int] = {}
+        self._key_locks: Dict[str, asyncio.Lock] = {}
+        self._slots = asyncio.Condition()
+        self._connecting = 0
+        self._evictor: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(session_file: str) -> str:
+        return session_file if session_file.endswith('.session') else f"{session_file}.session"
+
+    @staticmethod
+    def _telegram_client(key: str) -> TelegramClient:
+        return TracedTelegramClient(
+            key,
+            settings.API_ID,
+            settings.API_HASH,
+            proxy=get_proxy_settings()
+        )
+
+    def _touch(self, key: str):
+        self._clients.move_to_end(key)
+        self._last_used[key] = time.monotonic()
+
+    def _open_count(self) -> int:
+        return self._connecting + sum(1 for client in self._clients.values() if client.is_connected())
+
+    def get_client(self, session_file: str) -> TelegramClient:
+        """
+        Возвращает клиента сессии, создавая его без подключения
+        """
+        key = self._key(session_file)
+        client = self._clients.get(key)
+        if client is None:
+            client = self.client_factory(key)
+            self._clients[key] = client
+            self._drop_disconnected()
+        self._touch(key)
+        return client
+
+    def _drop_disconnected(self):
+        # Keep memory flat: forget idle disconnected clients beyond the connection cap
+        for key in list(self._clients):
+            if len(self._clients) <= self.max_connections:
+                return
+            client = self._clients[key]
+            if not client.is_connected() and not self._in_use.get(key):
+                del self._clients[key]
+                self._last_used.pop(key, None)
+                self._key_locks.pop(key, None)
+
+    async def _evict_one(self, keep: str) -> bool:
+        # OrderedDict is kept in LRU order, the first idle connected client goes
+        for key, client in self._clients.items():
+            if key != keep and client.is_connected() and not self._in_use.get(key):
+                logger.info(f"Evicting idle client {key}")
+                await client.disconnect()
+                return True
+        return False
+
+    async def connect(self, session_file: str) -> TelegramClient:
+        """
+        Подключает клиента, если он еще не подключен, соблюдая лимит соединений
+        """
+        key = self._key(session_file)
+        lock = self._key_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            client = self.get_client(key)
+            if client.is_connected():
+                return client
+
+            async with self._slots:
+                while self._open_count() >= self.max_connections:
+                    if not await self._evict_one(keep=key):
+                        await self._slots.wait()
+                self._connecting += 1
+            try:
+                await client.connect()
+            finally:
+                async with self._slots:
+                    self._connecting -= 1
+                    self._slots.notify_all()
+
+        if self._evictor is None:
+            self._evictor = asyncio.create_task(self._run_evictor())
+        return client
+
+    @asynccontextmanager
+    async def lease(self, session_file: str):
+        """
+        Выдает подключенного клиента; пока lease открыт, клиент не вытесняется
+        """
+        key = self._key(session_file)
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield await self.connect(key)
+        finally:
+            self._in_use[key] -= 1
+            if not self._in_use[key]:
+                del self._in_use[key]
+            if key in self._clients:
+                self._touch(key)
+            async with self._slots:
+                self._slots.notify_all()
+
+    async def disconnect(self, session_file: str) -> bool:
+        """
+        Отключает и забывает клиента сессии, например когда аккаунт
+        перешел к другому узлу
+        """
+        key = self._key(session_file)
+        client = self._clients.pop(key, None)
+        self._last_used.pop(key, None)
+        self._key_locks.pop(key, None)
+        if client is None or not client.is_connected():
+            return False
+        await client.disconnect()
+        async with self._slots:
+            self._slots.notify_all()
+        return True
+
+    async def evict_idle(self) -> int:
+        """
+        Отключает клиентов, простаивающих дольше idle_timeout
+        """
+        now = time.monotonic()
+        evicted = 0
+        for key, client in list(self._clients.items()):
+            idle = now - self._last_used.get(key, now)
+            if idle >= self.idle_timeout and client.is_connected() and not self._in_use.get(key):
+                await client.disconnect()
+                evicted += 1
+        self._drop_disconnected()
+        if evicted:
+            async with self._slots:
+                self._slots.notify_all()
+        return evicted
+
+    async def _run_evictor(self):
+        while True:
+            await asyncio.sleep(max(1, self.idle_timeout // 2))
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"Failed to evict idle clients: {e}")
+
+    async def close_all(self):
+        if self._evictor is not None:
+            self._evictor.cancel()
+            self._evictor = None
+        for client in self._clients.values():
+            if client.is_connected():
+                await client.disconnect()
+        self._clients.clear()
+        self._last_used.clear()
+        self._key_locks.clear()
+
+client_pool = ClientPool()
@@ -0,0 +1,173 @@
+import asyncio
+import inspect
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Hashable, List, NamedTuple, Optional, Set
+
+from src.utils.logger import setup_logger
+from src.utils.metrics import EVENTS_DROPPED, FLOOD_WAIT_SECONDS, FLOOD_WAITS, JOIN_RESULTS
+
+logger = setup_logger(__name__)
+
+JOIN_QUEUED = "queued"
+JOIN_STARTED = "started"
+JOIN_SUCCEEDED = "succeeded"
+JOIN_FAILED = "failed"
+JOIN_FLOOD_WAIT = "flood_wait"
+
+# What a subscriber loses when its queue is full
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+COALESCE = "coalesce"
+
+class JoinEvent(NamedTuple):
+    kind: str
+    account_id: Optional[int]
+    url: Optional[str] = None
+    error: Optional[str] = None
+    wait_seconds: Optional[int] = None
+    timestamp: float = 0.0
+    error_class: Optional[str] = None
+
+def coalesce_by_account(event: JoinEvent) -> Hashable:
+    return event.account_id
+
+class Subscription:
+    """
+    Очередь одного подписчика со своей задачей-обработчиком.
+
+    При переполнении drop_oldest вытесняет самое старое событие,
+    drop_newest отбрасывает новое, coalesce хранит только последнее
+    событие на ключ coalesce_key (по умолчанию - на аккаунт).
+    """
+    def __init__(self, handler: Callable, kinds: Optional[Set[str]] = None,
+                 maxsize: int = 1000, policy: str = DROP_OLDEST,
+                 coalesce_key: Callable[[JoinEvent], Hashable] = coalesce_by_account):
+        self.handler = handler
+        self.kinds = kinds
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce_key = coalesce_key
+        self._queue: deque = deque()
+        self._latest: "OrderedDict[Hashable, JoinEvent]" = OrderedDict()
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._latest) if self.policy == COALESCE else len(self._queue)
+
+    def push(self, event: JoinEvent):
+        if self.kinds is not None and event.kind not in self.kinds:
+            return
+        if self.policy == COALESCE:
+            key = self.coalesce_key(event)
+            if key in self._latest:
+                self._latest.move_to_end(key)
+                self.dropped += 1
+            elif len(self._latest) >= self.maxsize:
+                self._latest.popitem(last=False)
+                self.dropped += 1
+            self._latest[key] = event
+        elif len(self._queue) >= self.maxsize:
+            self.dropped += 1
+            if self.policy == DROP_NEWEST:
+                return
+            self._queue.popleft()
+            self._queue.append(event)
+        else:
+            self._queue.append(event)
+        self._start()
+        self._ready.set()
+
+    def _start(self):
+        if self._task is None:
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _pop(self) -> Optional[JoinEvent]:
+        if self.policy == COALESCE:
+            return self._latest.popitem(last=False)[1] if self._latest else None
+        return self._queue.popleft() if self._queue else None
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while True:
+                event = self._pop()
+                if event is None:
+                    break
+                try:
+                    result = self.handler(event)
+                    if inspect.isawaitable(result):
+                        await result
+                    self.delivered += 1
+                except Exception as e:
+                    logger.error(f"Event subscriber {self.handler!r} failed on {event.kind}: {e}")
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+class EventBus:
+    """
+    Внутрипроцессная шина событий жизненного цикла вступления.
+
+    publish() только раскладывает событие по очередям подписчиков и
+    никогда не ждет их, поэтому медленный подписчик (UI, метрики, БД)
+    не тормозит вступления, а теряет или схлопывает свои события.
+    """
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+
+    def subscribe(self, handler: Callable, kinds: Optional[Set[str]] = None,
+                  maxsize: int = 1000, policy: str = DROP_OLDEST,
+                  coalesce_key: Callable[[JoinEvent], Hashable] = coalesce_by_account) -> Subscription:
+        subscription = Subscription(handler, kinds, maxsize, policy, coalesce_key)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def publish(self, kind: str, account_id: Optional[int], url: Optional[str] = None,
+                error: Optional[str] = None, wait_seconds: Optional[int] = None,
+                error_class: Optional[str] = None):
+        if not self._subscriptions:
+            return
+        event = JoinEvent(kind, account_id, url, error, wait_seconds, time.time(), error_class)
+        for subscription in self._subscriptions:
+            subscription.push(event)
+
+    def close(self):
+        for subscription in self._subscriptions:
+            subscription.close()
+        self._subscriptions.clear()
+
+def _on_join_event(event: JoinEvent):
+    if event.kind == JOIN_SUCCEEDED:
+        JOIN_RESULTS.inc("succeeded", "")
+    elif event.kind == JOIN_FAILED:
+        JOIN_RESULTS.inc("failed", event.error_class or "unknown")
+    elif event.kind == JOIN_FLOOD_WAIT:
+        JOIN_RESULTS.inc("failed", event.error_class or "rate_limited")
+        FLOOD_WAITS.inc(event.account_id)
+        FLOOD_WAIT_SECONDS.inc(event.account_id, amount=event.wait_seconds or 0)
+
+def subscribe_join_metrics(bus: EventBus) -> Subscription:
+    """
+    Считает исходы вступлений и FloodWait по событиям шины
+    """
+    subscription = bus.subscribe(
+        _on_join_event, {JOIN_SUCCEEDED, JOIN_FAILED, JOIN_FLOOD_WAIT}, maxsize=10000
+    )
+    EVENTS_DROPPED.set_function(lambda: {(): subscription.dropped})
+    return subscription
+
+event_bus = EventBus()
@@ -0,0 +1,92 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable, List, Optional, Tuple, TYPE_CHECKING
+
+from config.config import settings
+from src.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from src.core.account_manager import AccountManager
+
+logger = setup_logger(__name__)
+
+class FairShare:
+    """
+    Взвешенное справедливое распределение вступлений между операторами.
+
+    Когда несколько кампаний ждут один аккаунт, слот получает оператор
+    с наименьшим виртуальным временем (pass); за каждый слот его pass
+    растет на 1/weight. Оператор, который только начал, стартует с
+    текущего виртуального времени, поэтому небольшое задание сразу
+    получает свою долю, а не ждет окончания массового импорта.
+    """
+    def __init__(self, weights: Optional[Dict[int, float]] = None):
+        self.weights: Dict[Hashable, float] = dict(weights or {})
+        self.granted: Dict[Hashable, int] = defaultdict(int)
+        self._pass: Dict[Hashable, float] = {}
+        self._virtual_time = 0.0
+        self._waiters: Dict[str, List[Tuple[Hashable, asyncio.Future]]] = {}
+        self._granters: Dict[str, asyncio.Task] = {}
+
+    def weight(self, owner: Hashable) -> float:
+        return self.weights.get(owner, 1.0)
+
+    def _start_tag(self, owner: Hashable) -> float:
+        return max(self._pass.get(owner, 0.0), self._virtual_time)
+
+    @asynccontextmanager
+    async def turn(self, account_manager: "AccountManager", owner: Hashable):
+        """
+        Ждет очереди оператора на аккаунте; пока блок открыт, аккаунт
+        не отдается другим кампаниям
+        """
+        key = account_manager.session_file
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append((owner, future))
+        if key not in self._granters:
+            self._granters[key] = asyncio.create_task(
+                self._grant(key, account_manager.rate_limiter)
+            )
+        try:
+            released = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                future.result().set()
+            else:
+                future.cancel()
+            raise
+        try:
+            yield
+        finally:
+            released.set()
+
+    async def _grant(self, key: str, rate_limiter):
+        waiters = self._waiters[key]
+        try:
+            while True:
+                waiters[:] = [(owner, future) for owner, future in waiters if not future.done()]
+                if not waiters:
+                    return
+                # Hand the slot out only when the account can actually join
+                await rate_limiter.wait_ready()
+                waiters[:] = [(owner, future) for owner, future in waiters if not future.done()]
+                if not waiters:
+                    return
+                owner, future = min(waiters, key=lambda waiter: self._start_tag(waiter[0]))
+                waiters.remove((owner, future))
+
+                start = self._start_tag(owner)
+                self._virtual_time = start
+                self._pass[owner] = start + 1 / self.weight(owner)
+                self.granted[owner] += 1
+
+                released = asyncio.Event()
+                future.set_result(released)
+                await released.wait()
+        finally:
+            del self._granters[key]
+            if not waiters:
+                self._waiters.pop(key, None)
+
+fair_share = FairShare(settings.OPERATOR_WEIGHTS)
@@ -0,0 +1,237 @@
+import asyncio
+import random
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, NamedTuple, Optional, Set
+
+from telethon.errors import (
+    ChannelsTooMuchError,
+    FloodWaitError,
+    InviteHashExpiredError,
+    UserAlreadyParticipantError
+)
+from telethon.tl.functions.channels import JoinChannelRequest
+from telethon.tl.functions.messages import CheckChatInviteRequest, ImportChatInviteRequest
+from telethon.tl.types import Channel, ChatInvite, ChatInviteAlready, ChatPhotoEmpty, PhotoEmpty, Updates
+
+from src.utils.link_parser import parse_link, LINK_INVITE, LINK_PRIVATE
+
+@dataclass
+class SimulationConfig:
+    """
+    Параметры модели Telegram для симуляции кампании
+    """
+    accounts: int = 10
+    links: int = 1000
+    invite_ratio: float = 0.3  # share of invite links among the campaign links
+    expired_ratio: float = 0.05  # share of invite links that have expired
+    member_ratio: float = 0.05  # share of chats every account is already in
+    dialog_limit: int = 500  # ChannelsTooMuchError past this many chats
+    latency_min: float = 0.2  # seconds per RPC
+    latency_max: float = 1.5
+    flood_threshold: int = 20  # joins per flood_window before FloodWait
+    flood_window: float = 600.0
+    flood_wait_min: int = 60
+    flood_wait_max: int = 900
+    flood_probability: float = 0.0  # FloodWait on any join regardless of pace
+    seed: int = 0
+
+class _Chat(NamedTuple):
+    id: int
+    access_hash: int
+    username: Optional[str]
+    invite_hash: Optional[str]
+    expired: bool
+
+    def entity(self) -> Channel:
+        return Channel(
+            self.id,
+            self.username or f"chat {self.id}",
+            ChatPhotoEmpty(),
+            None,
+            megagroup=True,
+            access_hash=self.access_hash,
+            username=self.username
+        )
+
+class _AccountState:
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.joined: Set[int] = set()
+        self.join_times: Deque[float] = deque()
+
+class FakeDialog(NamedTuple):
+    entity: Channel
+    is_group: bool
+    is_channel: bool
+
+class FakeMe(NamedTuple):
+    id: int
+    premium: bool = False
+
+class SimulatedTelegram:
+    """
+    Модель Telegram в памяти процесса: чаты, инвайты и состояние аккаунтов.
+
+    Вступления задерживаются на случайную латентность RPC, а ответы
+    повторяют ошибки Telethon: FloodWaitError при превышении
+    flood_threshold вступлений за flood_window, InviteHashExpiredError,
+    UserAlreadyParticipantError и ChannelsTooMuchError на лимите диалогов.
+    Время берется из event loop, поэтому под VirtualTimeLoop кампания
+    проходит в ускоренном виртуальном времени.
+    """
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.stats: Counter = Counter()
+        self._chats: Dict[int, _Chat] = {}
+        self._by_username: Dict[str, _Chat] = {}
+        self._by_invite: Dict[str, _Chat] = {}
+        self._accounts: Dict[str, _AccountState] = {}
+
+    def make_links(self, count: int) -> List[str]:
+        """
+        Создает count чатов и возвращает ссылки на них
+        """
+        urls = []
+        for _ in range(count):
+            if self.random.random() < self.config.invite_ratio:
+                url = f"https://t.me/+sim{self.random.getrandbits(64):016x}"
+            else:
+                url = f"https://t.me/simchat{len(self._chats) + 1000}"
+            self.add_chat(url)
+            urls.append(url)
+        return urls
+
+    def add_chat(self, url: str):
+        """
+        Заводит чат, на который указывает ссылка (username или инвайт)
+        """
+        parsed = parse_link(url)
+        if parsed is None or parsed.kind == LINK_PRIVATE:
+            raise ValueError(f"Cannot simulate a chat for {url}")
+        chat_id = len(self._chats) + 1000
+        if parsed.kind == LINK_INVITE:
+            chat = _Chat(chat_id, self.random.getrandbits(63), None, parsed.value,
+                         self.random.random() < self.config.expired_ratio)
+            self._by_invite[parsed.value] = chat
+        else:
+            chat = _Chat(chat_id, self.random.getrandbits(63), parsed.value, None, False)
+            self._by_username[parsed.value] = chat
+        self._chats[chat_id] = chat
+
+    def client(self, session_file: str) -> "FakeTelegramClient":
+        """
+        Фабрика клиентов для ClientPool(client_factory=...)
+        """
+        return FakeTelegramClient(self, self._account(session_file))
+
+    def _account(self, session_file: str) -> _AccountState:
+        state = self._accounts.get(session_file)
+        if state is None:
+            state = _AccountState(len(self._accounts) + 1)
+            for chat_id in self._chats:
+                if self.random.random() < self.config.member_ratio:
+                    state.joined.add(chat_id)
+            self._accounts[session_file] = state
+        return state
+
+    async def latency(self):
+        await asyncio.sleep(self.random.uniform(self.config.latency_min, self.config.latency_max))
+
+    def _check_flood(self, state: _AccountState, request):
+        now = asyncio.get_running_loop().time()
+        while state.join_times and state.join_times[0] <= now - self.config.flood_window:
+            state.join_times.popleft()
+        if (len(state.join_times) >= self.config.flood_threshold
+                or self.random.random() < self.config.flood_probability):
+            self.stats["flood_waits"] += 1
+            raise FloodWaitError(
+                request,
+                capture=self.random.randint(self.config.flood_wait_min, self.config.flood_wait_max)
+            )
+        state.join_times.append(now)
+
+    async def join(self, state: _AccountState, chat: _Chat, request) -> Updates:
+        await self.latency()
+        self.stats["requests"] += 1
+        if chat.expired:
+            self.stats["expired_invites"] += 1
+            raise InviteHashExpiredError(request)
+        if chat.id in state.joined:
+            self.stats["already_member"] += 1
+            if chat.invite_hash is not None:
+                raise UserAlreadyParticipantError(request)
+            # Joining a public channel twice is a no-op on Telegram's side
+            return Updates([], [], [chat.entity()], None, 0)
+        self._check_flood(state, request)
+        if len(state.joined) >= self.config.dialog_limit:
+            self.stats["chat_limit"] += 1
+            raise ChannelsTooMuchError(request)
+        state.joined.add(chat.id)
+        self.stats["joins"] += 1
+        return Updates([], [], [chat.entity()], None, 0)
+
+    def resolve(self, username: str) -> _Chat:
+        chat = self._by_username.get(username.lstrip('@').lower())
+        if chat is None:
+            raise ValueError(f'No user has "{username}" as username')
+        return chat
+
+class FakeTelegramClient:
+    """
+    Поддельный клиент с интерфейсом TelegramClient в объеме, который
+    использует AccountManager. Авторизация (send_code_request/sign_in)
+    в симуляции не поддерживается.
+    """
+    def __init__(self, world: SimulatedTelegram, state: _AccountState):
+        self.world = world
+        self.state = state
+        self._connected = False
+
+    async def connect(self):
+        self._connected = True
+
+    async def disconnect(self):
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def is_user_authorized(self) -> bool:
+        return True
+
+    async def get_me(self) -> FakeMe:
+        return FakeMe(self.state.user_id)
+
+    async def iter_dialogs(self):
+        for chat_id in list(self.state.joined):
+            yield FakeDialog(self.world._chats[chat_id].entity(), True, False)
+
+    async def get_entity(self, username: str) -> Channel:
+        await self.world.latency()
+        return self.world.resolve(username).entity()
+
+    async def delete_dialog(self, peer):
+        chat_id = getattr(peer, 'channel_id', None) or peer.id
+        self.state.joined.discard(chat_id)
+
+    async def __call__(self, request):
+        if isinstance(request, JoinChannelRequest):
+            channel = request.channel
+            chat_id = getattr(channel, 'channel_id', None) or channel.id
+            return await self.world.join(self.state, self.world._chats[chat_id], request)
+        if isinstance(request, ImportChatInviteRequest):
+            chat = self.world._by_invite.get(request.hash)
+            if chat is None:
+                raise InviteHashExpiredError(request)
+            return await self.world.join(self.state, chat, request)
+        if isinstance(request, CheckChatInviteRequest):
+            await self.world.latency()
+            chat = self.world._by_invite.get(request.hash)
+            if chat is None or chat.expired:
+                raise InviteHashExpiredError(request)
+            if chat.id in self.state.joined:
+                return ChatInviteAlready(chat.entity())
+            return ChatInvite(f"chat {chat.id}", PhotoEmpty(0), 0, megagroup=True)
+        raise NotImplementedError(f"{type(request).__name__} is not simulated")
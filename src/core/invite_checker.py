@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+from telethon.errors import (
+    FloodWaitError,
+    InviteHashExpiredError,
+    InviteHashInvalidError
+)
+from telethon.tl.types import ChatInviteAlready
+
+from config.config import settings
+from src.database.models import Link
+from src.utils.link_parser import parse_link, LINK_INVITE
+from src.utils.logger import SAMPLED, setup_logger
+
+if TYPE_CHECKING:
+    from src.core.account_manager import AccountManager
+
+logger = setup_logger(__name__)
+
+INVITE_VALID = "valid"
+INVITE_ALREADY_MEMBER = "already_member"
+INVITE_DEAD = "dead"
+INVITE_UNKNOWN = "unknown"
+
+CHECK_INVITE_OPERATION = "check_invite"
+
+class InviteCheckResult(NamedTuple):
+    status: str
+    title: Optional[str]
+    checked_at: datetime
+
+def extract_invite_hash(url: str) -> Optional[str]:
+    """
+    Возвращает hash из t.me/+hash и t.me/joinchat/hash, иначе None
+    """
+    parsed = parse_link(url)
+    if parsed is None or parsed.kind != LINK_INVITE:
+        return None
+    return parsed.value
+
+class InviteChecker:
+    """
+    Предварительная проверка invite-ссылок через CheckChatInviteRequest.
+
+    Проверки идут параллельно с ограничением по semaphore, результаты
+    кешируются с TTL. Мертвые хеши общие для всех аккаунтов, а
+    "уже участник" запоминается для конкретного аккаунта.
+    """
+    def __init__(self, concurrency: int = settings.INVITE_CHECK_CONCURRENCY,
+                 ttl: int = settings.INVITE_CHECK_TTL):
+        self.concurrency = concurrency
+        self.ttl = timedelta(seconds=ttl)
+        self._results: Dict[Tuple[Optional[int], str], InviteCheckResult] = {}
+
+    def _cached(self, account_id: Optional[int], invite_hash: str) -> Optional[InviteCheckResult]:
+        now = datetime.utcnow()
+        for key in ((None, invite_hash), (account_id, invite_hash)):
+            result = self._results.get(key)
+            if result is not None and now - result.checked_at < self.ttl:
+                return result
+        return None
+
+    def _store(self, account_id: Optional[int], invite_hash: str, result: InviteCheckResult):
+        owner = None if result.status == INVITE_DEAD else account_id
+        self._results[(owner, invite_hash)] = result
+
+    async def check(self, account_manager: "AccountManager", invite_hash: str) -> InviteCheckResult:
+        cached = self._cached(account_manager.account_id, invite_hash)
+        if cached is not None:
+            return cached
+
+        try:
+            invite = await account_manager.check_invite(invite_hash)
+        except (InviteHashExpiredError, InviteHashInvalidError):
+            result = InviteCheckResult(INVITE_DEAD, None, datetime.utcnow())
+        else:
+            if isinstance(invite, ChatInviteAlready):
+                title = getattr(invite.chat, 'title', None)
+                result = InviteCheckResult(INVITE_ALREADY_MEMBER, title, datetime.utcnow())
+            else:
+                title = getattr(invite, 'title', None) or getattr(getattr(invite, 'chat', None), 'title', None)
+                result = InviteCheckResult(INVITE_VALID, title, datetime.utcnow())
+
+        self._store(account_manager.account_id, invite_hash, result)
+        return result
+
+    async def filter_links(self, account_manager: "AccountManager",
+                           links: List[Link]) -> Tuple[List[Link], List[Link], List[Link]]:
+        """
+        Проверяет все invite-ссылки пачкой.
+        Возвращает (ссылки для очереди вступления, мертвые, уже вступили).
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        flood_wait = asyncio.Event()
+        if account_manager.db_ops is not None and account_manager.account_id is not None:
+            # Account is still cooling down from a previous pre-check: no RPC at all
+            if account_manager.db_ops.get_blocked_until(account_manager.account_id, CHECK_INVITE_OPERATION):
+                flood_wait.set()
+
+        async def check_link(link: Link) -> str:
+            invite_hash = extract_invite_hash(link.url)
+            if invite_hash is None or flood_wait.is_set():
+                return INVITE_UNKNOWN
+            async with semaphore:
+                if flood_wait.is_set():
+                    return INVITE_UNKNOWN
+                try:
+                    return (await self.check(account_manager, invite_hash)).status
+                except FloodWaitError as e:
+                    # Stop the pre-check, remaining links go to the join queue unchecked
+                    flood_wait.set()
+                    if account_manager.db_ops is not None and account_manager.account_id is not None:
+                        account_manager.db_ops.set_cooldown(
+                            account_manager.account_id, CHECK_INVITE_OPERATION, e.seconds, str(e)
+                        )
+                    logger.warning(f"Invite pre-check stopped by flood wait: {e.seconds} seconds")
+                    return INVITE_UNKNOWN
+                except Exception as e:
+                    logger.error(f"Failed to check invite {link.url}: {e}", extra=SAMPLED)
+                    return INVITE_UNKNOWN
+
+        statuses = await asyncio.gather(*(check_link(link) for link in links))
+
+        pending_links, dead_links, joined_links = [], [], []
+        for link, status in zip(links, statuses):
+            if status == INVITE_DEAD:
+                link.status = "dead"
+                dead_links.append(link)
+            elif status == INVITE_ALREADY_MEMBER:
+                link.status = "success"
+                joined_links.append(link)
+            else:
+                pending_links.append(link)
+
+        logger.info(
+            f"Invite pre-check: {len(pending_links)} to join, {len(dead_links)} dead, "
+            f"{len(joined_links)} already joined"
+        )
+        return pending_links, dead_links, joined_links
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import socket
+import uuid
+from typing import Optional, Set, TYPE_CHECKING
+
+from config.config import settings
+from src.database.models import JoinWorkItem
+from src.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from src.database.operations import DatabaseOperations
+
+logger = setup_logger(__name__)
+
+class JobQueue:
+    """
+    Персистентная очередь вступлений поверх таблиц join_jobs/join_work_items.
+
+    Воркер забирает элемент под lease и продлевает его heartbeat'ом, пока
+    обрабатывает. Если процесс упал, lease истекает и элемент снова
+    попадает в очередь, поэтому после перезапуска задание продолжается
+    с того же места.
+    """
+    def __init__(self, db_ops: "DatabaseOperations",
+                 lease_seconds: int = settings.JOB_LEASE_SECONDS,
+                 heartbeat_interval: int = settings.JOB_HEARTBEAT_INTERVAL):
+        self.db_ops = db_ops
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._held: Set[int] = set()
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def claim(self, job_id: int) -> Optional[JoinWorkItem]:
+        item = self.db_ops.claim_work_item(job_id, self.worker_id, self.lease_seconds)
+        if item is not None:
+            self._held.add(item.id)
+        return item
+
+    def complete(self, item: JoinWorkItem, status: str, account_id: Optional[int] = None,
+                 error_message: Optional[str] = None) -> bool:
+        self._held.discard(item.id)
+        completed = self.db_ops.complete_work_item(item.id, self.worker_id, status, account_id, error_message)
+        if not completed:
+            logger.warning(f"Lease on work item {item.id} was lost before completion")
+        return completed
+
+    def release(self, item: JoinWorkItem) -> bool:
+        """
+        Возвращает элемент в очередь, чтобы его взял другой аккаунт
+        """
+        self._held.discard(item.id)
+        return self.db_ops.release_work_items(self.worker_id, [item.id]) == 1
+
+    def retry(self, item: JoinWorkItem, delay: float, error_message: Optional[str] = None) -> bool:
+        """
+        Откладывает элемент после временной ошибки
+        """
+        self._held.discard(item.id)
+        return self.db_ops.retry_work_item(item.id, self.worker_id, delay, error_message)
+
+    def release_all(self) -> int:
+        released = self.db_ops.release_work_items(self.worker_id, list(self._held))
+        self._held.clear()
+        return released
+
+    def remaining(self, job_id: int) -> int:
+        counts = self.db_ops.count_work_items(job_id)
+        return counts.get("queued", 0) + counts.get("leased", 0)
+
+    def start_heartbeat(self):
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._run_heartbeat())
+
+    def stop_heartbeat(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    async def _run_heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if self._held:
+                self.db_ops.heartbeat_work_items(self.worker_id, list(self._held), self.lease_seconds)
@@ -0,0 +1,73 @@
+import asyncio
+import random
+from typing import NamedTuple
+
+from telethon.errors import (
+    AuthKeyUnregisteredError,
+    ChannelsTooMuchError,
+    FloodError,
+    FloodWaitError,
+    InterdcCallErrorError,
+    RpcCallFailError,
+    ServerError,
+    SessionRevokedError,
+    TimedOutError,
+    UserDeactivatedBanError,
+    UserDeactivatedError,
+    WorkerBusyTooLongRetryError
+)
+
+# Error classes of a failed join
+ERROR_TRANSIENT = "transient"  # network, timeouts, Telegram server side: retry with backoff
+ERROR_RATE_LIMITED = "rate_limited"  # FloodWait: the account waits, the link goes to another one
+ERROR_ACCOUNT = "account"  # chat limit, ban, revoked session: the account stops taking links
+ERROR_PERMANENT = "permanent"  # bad or expired link, private chat: never retried
+
+TRANSIENT_ERRORS = (
+    ConnectionError,
+    asyncio.TimeoutError,
+    OSError,
+    ServerError,
+    TimedOutError,
+    RpcCallFailError,
+    InterdcCallErrorError,
+    WorkerBusyTooLongRetryError
+)
+
+ACCOUNT_ERRORS = (
+    ChannelsTooMuchError,
+    AuthKeyUnregisteredError,
+    SessionRevokedError,
+    UserDeactivatedBanError,
+    UserDeactivatedError
+)
+
+class JoinResult(NamedTuple):
+    success: bool
+    error: str = ""
+    error_class: str = ""
+
+    @property
+    def retryable(self) -> bool:
+        return self.error_class in (ERROR_TRANSIENT, ERROR_RATE_LIMITED)
+
+def classify_error(error: BaseException) -> str:
+    """
+    Относит исключение к одному из классов ошибок; неизвестные считаются
+    постоянными, чтобы не тратить на них слоты вступлений
+    """
+    if isinstance(error, (FloodWaitError, FloodError)):
+        return ERROR_RATE_LIMITED
+    if isinstance(error, ACCOUNT_ERRORS):
+        return ERROR_ACCOUNT
+    if isinstance(error, TRANSIENT_ERRORS):
+        return ERROR_TRANSIENT
+    return ERROR_PERMANENT
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Экспоненциальная задержка с полным jitter после attempt-й неудачной
+    попытки (с 1): случайно от 0 до min(cap, base * 2^(attempt - 1)),
+    то есть до base, 2*base, 4*base...
+    """
+    return random.uniform(0, min(cap, base * 2 ** max(0, attempt - 1)))
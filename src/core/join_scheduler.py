@@ -0,0 +1,388 @@
+import asyncio
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from config.config import settings
+from src.core.events import event_bus, JOIN_FAILED, JOIN_QUEUED, JOIN_SUCCEEDED
+from src.core.fair_share import FairShare, fair_share
+from src.core.join_errors import (
+    backoff_delay,
+    JoinResult,
+    ERROR_ACCOUNT,
+    ERROR_PERMANENT,
+    ERROR_RATE_LIMITED
+)
+from src.database.models import Link
+from src.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from src.core.account_manager import AccountManager
+    from src.core.job_queue import JobQueue
+    from src.database.write_behind import WriteBehindBuffer
+
+logger = setup_logger(__name__)
+
+class JoinScheduler:
+    """
+    Распределяет одну кампанию вступлений по всем подключенным аккаунтам.
+
+    Каждый аккаунт обслуживается отдельным воркером со своим rate limiter,
+    поэтому пока один аккаунт ждет, остальные продолжают вступать.
+    Если задан owner_id, слоты аккаунтов делятся с кампаниями других
+    операторов через FairShare. is_owned ограничивает задание аккаунтами,
+    которые сейчас принадлежат этому узлу. clock - часы для started_at,
+    finished_at и joins_per_minute; симуляция подставляет loop.time.
+    """
+    def __init__(self, account_managers: List["AccountManager"], progress_callback=None,
+                 write_buffer: Optional["WriteBehindBuffer"] = None,
+                 owner_id: Optional[int] = None, share: FairShare = fair_share,
+                 is_owned: Optional[Callable[[Optional[int]], bool]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.account_managers = account_managers
+        self.clock = clock
+        self.progress_callback = progress_callback
+        self.write_buffer = write_buffer
+        self.owner_id = owner_id
+        self.share = share
+        self.is_owned = is_owned
+        self.success_count = 0
+        self.fail_count = 0
+        self.total = 0
+        self.skipped_links: List[Link] = []
+        self.retired: List["AccountManager"] = []
+        # Transient failures wait here with backoff before going back to the queue
+        self._retries: Dict[asyncio.TimerHandle, Link] = {}
+        self._retry_fired = asyncio.Event()
+        self._attempts: Dict[int, int] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else self.clock()
+        return end - self.started_at
+
+    @property
+    def joins_per_minute(self) -> float:
+        elapsed = self.elapsed
+        if elapsed <= 0:
+            return 0.0
+        return self.success_count / elapsed * 60
+
+    async def _skip_joined(self, links: List[Link]) -> List[Link]:
+        """
+        Убирает ссылки на чаты, где уже состоит один из аккаунтов кампании,
+        и записывает их как успешные
+        """
+        await asyncio.gather(*(
+            account_manager.load_joined_index() for account_manager in self.account_managers
+        ))
+        pending_links = []
+        for link in links:
+            member = next(
+                (account_manager for account_manager in self.account_managers if account_manager.is_joined(link.url)),
+                None
+            )
+            if member is None:
+                pending_links.append(link)
+                continue
+            link.status = "success"
+            self.skipped_links.append(link)
+            # Persisted like any other outcome, otherwise the next campaign queues it again
+            self._write_attempt(member.account_id, link, link.status, "Already a member")
+            if self.write_buffer is not None:
+                self.write_buffer.set_link_status(link.id, link.status)
+        if self.skipped_links:
+            logger.info(f"Skipped {len(self.skipped_links)} already joined links")
+        return pending_links
+
+    async def run(self, links: List[Link]) -> Tuple[int, int]:
+        links = await self._skip_joined(links)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for link in links:
+            queue.put_nowait(link)
+            event_bus.publish(JOIN_QUEUED, link.account_id, link.url)
+
+        self.total = len(links)
+        await self._start()
+
+        workers = [
+            asyncio.create_task(self._worker(account_manager, queue))
+            for account_manager in self.account_managers
+        ]
+        try:
+            while True:
+                await queue.join()
+                if not self._retries:
+                    if queue.empty():
+                        break
+                    continue
+                self._retry_fired.clear()
+                await self._retry_fired.wait()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            for handle in self._retries:
+                handle.cancel()
+            self._retries.clear()
+            self._finish()
+
+        return self.success_count, self.fail_count
+
+    async def run_job(self, job_queue: "JobQueue", job_id: int) -> Tuple[int, int]:
+        """
+        Выполняет персистентное задание: воркеры забирают элементы из БД под lease.
+        Повторный вызов после перезапуска продолжает с необработанных элементов.
+        """
+        # Load joined indexes so already joined chats are completed without an RPC
+        await asyncio.gather(*(
+            account_manager.load_joined_index() for account_manager in self.account_managers
+            if self._owns(account_manager)
+        ))
+        counts = job_queue.db_ops.count_work_items(job_id)
+        self.total = sum(counts.values())
+        self.success_count = counts.get("success", 0)
+        self.fail_count = counts.get("failed", 0)
+        await self._start()
+
+        done = asyncio.Event()
+        job_queue.start_heartbeat()
+        workers = [
+            asyncio.create_task(self._job_worker(account_manager, job_queue, job_id, done))
+            for account_manager in self.account_managers
+        ]
+        try:
+            if workers:
+                await done.wait()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            job_queue.stop_heartbeat()
+            # Hand unfinished leases back instead of waiting for them to expire
+            job_queue.release_all()
+            self._finish()
+
+        return self.success_count, self.fail_count
+
+    async def _start(self):
+        self.started_at = self.clock()
+        self.finished_at = None
+
+        if self.progress_callback:
+            # Plain callback: it must only record the counts, never wait on the UI
+            self.progress_callback(self.success_count, self.fail_count, self.total)
+
+        # Free chat slots bound how many links each account may take
+        slots = [
+            account_manager.profile.free_slots - settings.ACCOUNT_SLOT_RESERVE
+            for account_manager in self.account_managers
+            if account_manager.profile is not None
+        ]
+        if len(slots) == len(self.account_managers) and sum(max(0, n) for n in slots) < self.total:
+            logger.warning(
+                f"Campaign has {self.total} links but the accounts have only "
+                f"{sum(max(0, n) for n in slots)} free chat slots"
+            )
+
+        # Restore persisted FloodWait cooldowns: blocked accounts just wait on
+        # their bucket and never spend an RPC while the others keep joining
+        for account_manager in self.account_managers:
+            account_manager.restore_pacing()
+            remaining = account_manager.restore_cooldown()
+            if remaining > 0:
+                logger.info(
+                    f"Account {account_manager.account_id} is blocked for {remaining:.0f}s, skipping until then"
+                )
+
+    def _finish(self):
+        self.finished_at = self.clock()
+        for account_manager in self.account_managers:
+            if self._owns(account_manager):
+                account_manager.save_pacing()
+        logger.info(
+            f"Join campaign finished: {self.success_count} succeeded, {self.fail_count} failed, "
+            f"{len(self.account_managers)} accounts, {self.joins_per_minute:.1f} joins/min"
+        )
+
+    def _owns(self, account_manager: "AccountManager") -> bool:
+        return self.is_owned is None or self.is_owned(account_manager.account_id)
+
+    async def _wait_ready(self, account_manager: "AccountManager"):
+        if self.owner_id is None:
+            await account_manager.rate_limiter.wait_ready()
+        elif account_manager.rate_limiter.cooldown_remaining() > 0:
+            # Sit out a cooldown here; otherwise queue for a fair share turn
+            # right away, the share itself waits for the next token
+            await account_manager.rate_limiter.wait_ready()
+
+    def _turn(self, account_manager: "AccountManager"):
+        if self.owner_id is None:
+            return nullcontext()
+        return self.share.turn(account_manager, self.owner_id)
+
+    def _retire(self, account_manager: "AccountManager") -> bool:
+        """
+        Выводит из кампании аккаунт без свободных слотов или заблокированный.
+        Возвращает True, если брать ссылки больше некому: выведены все
+        аккаунты этого узла (аккаунты других узлов тут не работают).
+        """
+        if account_manager not in self.retired:
+            self.retired.append(account_manager)
+            logger.info(f"Account {account_manager.account_id} can take no more links, retiring it")
+        return all(
+            manager in self.retired
+            for manager in self.account_managers if self._owns(manager)
+        )
+
+    def _fail_remaining(self, queue: asyncio.Queue):
+        # Nobody can join the rest: close them out so queue.join() returns
+        for handle, link in list(self._retries.items()):
+            handle.cancel()
+            del self._retries[handle]
+            queue.put_nowait(link)
+        self._retry_fired.set()
+        while not queue.empty():
+            link = queue.get_nowait()
+            self._record(None, link, JoinResult(False, "No account with free chat slots", ERROR_ACCOUNT))
+            if self.write_buffer is not None:
+                self.write_buffer.set_link_status(link.id, link.status)
+            queue.task_done()
+
+    def _hands_off(self, account_manager: "AccountManager", result: JoinResult) -> bool:
+        # The account filled up or got banned: the link is fine, give it to another account
+        return not result.success and (
+            result.error_class == ERROR_ACCOUNT or not account_manager.can_join()
+        )
+
+    def _retry_delay(self, result: JoinResult, attempt: int) -> Optional[float]:
+        """
+        Задержка перед повтором или None, если результат окончательный
+        """
+        if result.success or not result.retryable or attempt >= settings.JOIN_RETRY_MAX_ATTEMPTS:
+            return None
+        if result.error_class == ERROR_RATE_LIMITED:
+            # Only this account is blocked, another one can take the link right away
+            return 0.0
+        return backoff_delay(attempt, settings.JOIN_RETRY_BASE_DELAY, settings.JOIN_RETRY_MAX_DELAY)
+
+    def _schedule_retry(self, queue: asyncio.Queue, link: Link, delay: float):
+        def requeue():
+            self._retries.pop(handle, None)
+            queue.put_nowait(link)
+            self._retry_fired.set()
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retries[handle] = link
+
+    async def _worker(self, account_manager: "AccountManager", queue: asyncio.Queue):
+        while True:
+            if not account_manager.can_join():
+                if self._retire(account_manager):
+                    self._fail_remaining(queue)
+                return
+            # Take a link only once this account has a free token, so links
+            # stay available to other accounts during a cooldown
+            await self._wait_ready(account_manager)
+            link = await queue.get()
+            try:
+                async with self._turn(account_manager):
+                    result = await self._attempt(account_manager, link)
+                if self._hands_off(account_manager, result):
+                    self._write_attempt(account_manager.account_id, link, "failed", result.error)
+                    queue.put_nowait(link)
+                    continue
+                attempt = self._attempts[link.id] = self._attempts.get(link.id, 0) + 1
+                delay = self._retry_delay(result, attempt)
+                if delay is not None:
+                    self._write_attempt(account_manager.account_id, link, "failed", result.error)
+                    self._schedule_retry(queue, link, delay)
+                    continue
+                self._record(account_manager.account_id, link, result)
+                if self.write_buffer is not None:
+                    self.write_buffer.set_link_status(link.id, link.status)
+            finally:
+                queue.task_done()
+
+    async def _job_worker(self, account_manager: "AccountManager", job_queue: "JobQueue",
+                          job_id: int, done: asyncio.Event):
+        while True:
+            if not self._owns(account_manager):
+                # The account belongs to another node for now, it may come back
+                if job_queue.remaining(job_id) == 0:
+                    done.set()
+                    return
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+            if not account_manager.can_join():
+                if self._retire(account_manager):
+                    # Leftover items stay queued for a later run or another node
+                    logger.warning(f"Job {job_id}: no account can take the remaining links")
+                    done.set()
+                return
+            await self._wait_ready(account_manager)
+            async with self._turn(account_manager):
+                item = job_queue.claim(job_id)
+                if item is not None:
+                    result = await self._attempt(account_manager, item.link)
+            if item is None:
+                # Nothing to claim: finished, backing off, or other workers still hold leases
+                if job_queue.remaining(job_id) == 0:
+                    done.set()
+                    return
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+
+            if self._hands_off(account_manager, result):
+                self._write_attempt(account_manager.account_id, item.link, "failed", result.error)
+                job_queue.release(item)
+                continue
+            # attempts counts earlier transient failures, this one is the next
+            delay = self._retry_delay(result, item.attempts + 1)
+            if delay is not None:
+                self._write_attempt(account_manager.account_id, item.link, "failed", result.error)
+                job_queue.retry(item, delay, result.error)
+                continue
+            self._record(account_manager.account_id, item.link, result)
+            job_queue.complete(
+                item,
+                "success" if result.success else "failed",
+                account_manager.account_id,
+                result.error or None
+            )
+
+    async def _attempt(self, account_manager: "AccountManager", link: Link) -> JoinResult:
+        if account_manager.is_joined(link.url):
+            # Joined earlier in this campaign through another link form
+            account_manager.events.publish(JOIN_SUCCEEDED, account_manager.account_id, link.url, "Already a member")
+            return JoinResult(True, "Already a member")
+        if link.deadline is not None and link.deadline < datetime.utcnow():
+            account_manager.events.publish(
+                JOIN_FAILED, account_manager.account_id, link.url, "Deadline exceeded", error_class=ERROR_PERMANENT
+            )
+            return JoinResult(False, "Deadline exceeded", ERROR_PERMANENT)
+        return await account_manager.join_chat(link.url)
+
+    def _record(self, account_id: Optional[int], link: Link, result: JoinResult):
+        """
+        Учитывает окончательный результат по ссылке
+        """
+        if result.success:
+            self.success_count += 1
+            link.status = "success"
+        else:
+            self.fail_count += 1
+            link.status = "failed"
+        self._write_attempt(account_id, link, link.status, result.error)
+
+        if self.progress_callback:
+            self.progress_callback(self.success_count, self.fail_count, self.total)
+
+    def _write_attempt(self, account_id: Optional[int], link: Link, status: str, error: str):
+        # Attempt history is written behind, batched with other results
+        if self.write_buffer is not None:
+            self.write_buffer.add_attempt(account_id or link.account_id, link.id, status, error or None)
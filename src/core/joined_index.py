@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Optional, Set
+
+from telethon.tl.types import Channel, Chat
+
+from src.utils.link_parser import ParsedLink, LINK_PRIVATE, LINK_USERNAME
+
+class JoinedIndex:
+    """
+    Множество чатов, в которых аккаунт уже состоит.
+
+    Строится тем же проходом iter_dialogs, что и профиль аккаунта, и дополняется после каждого
+    успешного вступления, чтобы повторный запуск кампании не тратил RPC
+    на уже вступленные чаты.
+    """
+    def __init__(self):
+        self.peer_ids: Set[int] = set()
+        self.usernames: Set[str] = set()
+        self.loaded_at: Optional[datetime] = None
+        self._snapshot_ids: Set[int] = set()
+        self._snapshot_usernames: Set[str] = set()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self.peer_ids)
+
+    def add(self, entity):
+        if not isinstance(entity, (Channel, Chat)):
+            return
+        self.peer_ids.add(entity.id)
+        username = getattr(entity, 'username', None)
+        if username:
+            self.usernames.add(username.lower())
+        for extra in getattr(entity, 'usernames', None) or []:
+            self.usernames.add(extra.username.lower())
+
+    def add_username(self, username: str):
+        self.usernames.add(username.lower())
+
+    def discard(self, peer_id: int, username: Optional[str] = None):
+        self.peer_ids.discard(peer_id)
+        if username:
+            self.usernames.discard(username.lower())
+
+    def add_from_updates(self, updates):
+        """
+        Добавляет чаты из ответа JoinChannelRequest/ImportChatInviteRequest
+        """
+        for chat in getattr(updates, 'chats', None) or []:
+            self.add(chat)
+
+    def replace(self, rebuilt: "JoinedIndex"):
+        """
+        Подставляет индекс, построенный заново. Чаты, добавленные сюда, пока
+        шла сборка, сохраняются: iter_dialogs мог пройти их раньше вступления
+        """
+        rebuilt.peer_ids |= self.peer_ids - self._snapshot_ids
+        rebuilt.usernames |= self.usernames - self._snapshot_usernames
+        self.peer_ids = rebuilt.peer_ids
+        self.usernames = rebuilt.usernames
+        self.loaded_at = rebuilt.loaded_at
+
+    def snapshot(self):
+        """
+        Запоминает содержимое перед сборкой нового индекса для replace
+        """
+        self._snapshot_ids = set(self.peer_ids)
+        self._snapshot_usernames = set(self.usernames)
+
+    def mark_loaded(self):
+        self.loaded_at = datetime.utcnow()
+
+    def contains(self, parsed: ParsedLink, peer_id: Optional[int] = None) -> bool:
+        if parsed.kind == LINK_USERNAME and parsed.value in self.usernames:
+            return True
+        if parsed.kind == LINK_PRIVATE and int(parsed.value) in self.peer_ids:
+            return True
+        return peer_id is not None and peer_id in self.peer_ids
@@ -0,0 +1,104 @@
+import asyncio
+import math
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, List, Optional, Set, TYPE_CHECKING
+
+from config.config import settings
+from src.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from src.database.operations import DatabaseOperations
+
+logger = setup_logger(__name__)
+
+LeaseCallback = Callable[[List[int]], Awaitable[None]]
+
+class NodeCoordinator:
+    """
+    Распределение аккаунтов между узлами через общую БД.
+
+    Узел регистрируется в таблице nodes и раз в heartbeat_interval
+    продлевает свои lease в account_leases. Каждый узел держит не больше
+    ceil(аккаунтов / живых узлов) аккаунтов: лишние отдает, недостающие
+    забирает из свободных и просроченных. Если узел умер, его lease
+    истекают, и аккаунты переходят к оставшимся узлам.
+    """
+    def __init__(self, db_ops: "DatabaseOperations", node_id: Optional[str] = None,
+                 lease_seconds: int = settings.NODE_LEASE_SECONDS,
+                 heartbeat_interval: int = settings.NODE_HEARTBEAT_INTERVAL,
+                 on_acquired: Optional[LeaseCallback] = None,
+                 on_released: Optional[LeaseCallback] = None):
+        self.db_ops = db_ops
+        self.hostname = socket.gethostname()
+        self.node_id = node_id or f"{self.hostname}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.on_acquired = on_acquired
+        self.on_released = on_released
+        self.owned: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def owns(self, account_id: Optional[int]) -> bool:
+        return account_id in self.owned
+
+    async def start(self):
+        await self.sync()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Node {self.node_id} owns {len(self.owned)} accounts")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Node {self.node_id} failed to sync leases: {e}")
+
+    async def sync(self):
+        """
+        Heartbeat узла, продление lease и ребалансировка
+        """
+        self.db_ops.heartbeat_node(self.node_id, self.hostname)
+        self.db_ops.prune_nodes(self.lease_seconds * 10)
+        held = set(self.db_ops.renew_account_leases(self.node_id, self.lease_seconds))
+        lost = self.owned - held
+
+        account_ids = sorted(account.id for account in self.db_ops.get_active_accounts())
+        live_nodes = max(1, self.db_ops.count_live_nodes(self.lease_seconds))
+        target = math.ceil(len(account_ids) / live_nodes)
+
+        released: List[int] = []
+        if len(held) > target:
+            # Hand the surplus to nodes that joined since the last sync
+            released = sorted(held)[target:]
+            self.db_ops.release_account_leases(self.node_id, released)
+            held -= set(released)
+
+        acquired: List[int] = []
+        if len(held) < target:
+            candidates = [account_id for account_id in account_ids if account_id not in held]
+            acquired = self.db_ops.acquire_account_leases(
+                self.node_id, candidates, target - len(held), self.lease_seconds
+            )
+            held |= set(acquired)
+
+        gone = sorted(lost | (self.owned & set(released)))
+        new = sorted(held - self.owned)
+        self.owned = held
+        if gone:
+            logger.info(f"Node {self.node_id} gave up accounts {gone}")
+            if self.on_released is not None:
+                await self.on_released(gone)
+        if new:
+            logger.info(f"Node {self.node_id} took over accounts {new}")
+            if self.on_acquired is not None:
+                await self.on_acquired(new)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.db_ops.remove_node(self.node_id)
+        self.owned = set()
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+from telethon.tl.types import (
+    Channel,
+    Chat,
+    InputChannel,
+    InputPeerChannel,
+    InputPeerChat,
+    InputPeerUser
+)
+
+from config.config import settings
+from src.utils.link_parser import parse_link, LINK_USERNAME
+from src.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from src.database.operations import DatabaseOperations
+
+logger = setup_logger(__name__)
+
+class CachedPeer(NamedTuple):
+    peer_id: int
+    access_hash: Optional[int]
+    peer_type: str
+    title: Optional[str]
+    resolved_at: datetime
+
+    def to_input_peer(self):
+        if self.peer_type == "channel":
+            return InputPeerChannel(self.peer_id, self.access_hash)
+        if self.peer_type == "chat":
+            return InputPeerChat(self.peer_id)
+        return InputPeerUser(self.peer_id, self.access_hash)
+
+    def to_input_channel(self) -> InputChannel:
+        return InputChannel(self.peer_id, self.access_hash)
+
+def canonical_username(value: str) -> str:
+    """
+    Приводит @name, t.me/name, https://t.me/name и просто name к ключу кеша
+    """
+    parsed = parse_link(value) or parse_link('@' + value.strip())
+    if parsed is not None and parsed.kind == LINK_USERNAME:
+        return parsed.value
+    return value.strip().lower()
+
+class PeerCache:
+    """
+    Общий кеш резолва username -> peer с TTL.
+
+    Память используется как первый уровень, SQLite (через DatabaseOperations)
+    как второй, чтобы кеш переживал перезапуск. access_hash в MTProto
+    выдается конкретному аккаунту, поэтому ключ - (account_id, username).
+    """
+    def __init__(self, db_ops: Optional["DatabaseOperations"] = None, ttl: int = settings.PEER_CACHE_TTL):
+        self.db_ops = db_ops
+        self.ttl = timedelta(seconds=ttl)
+        self._peers: Dict[Tuple[Optional[int], str], CachedPeer] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self, peer: CachedPeer) -> bool:
+        return datetime.utcnow() - peer.resolved_at < self.ttl
+
+    def get(self, account_id: Optional[int], username: str) -> Optional[CachedPeer]:
+        key = (account_id, canonical_username(username))
+        peer = self._peers.get(key)
+        if peer is None and self.db_ops is not None and account_id is not None:
+            row = self.db_ops.get_resolved_peer(account_id, key[1])
+            if row is not None:
+                peer = CachedPeer(row.peer_id, row.access_hash, row.peer_type, row.title, row.resolved_at)
+                self._peers[key] = peer
+        if peer is None or not self._is_fresh(peer):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return peer
+
+    def put(self, account_id: Optional[int], username: str, entity) -> Optional[CachedPeer]:
+        """
+        Сохраняет сущность, полученную от get_entity
+        """
+        if isinstance(entity, Channel):
+            peer_type = "channel"
+        elif isinstance(entity, Chat):
+            peer_type = "chat"
+        else:
+            peer_type = "user"
+        title = getattr(entity, 'title', None) or getattr(entity, 'username', None)
+        peer = CachedPeer(
+            entity.id,
+            getattr(entity, 'access_hash', None),
+            peer_type,
+            title,
+            datetime.utcnow()
+        )
+        key = (account_id, canonical_username(username))
+        self._peers[key] = peer
+        if self.db_ops is not None and account_id is not None:
+            self.db_ops.save_resolved_peer(
+                account_id, key[1], peer.peer_id, peer.access_hash, peer.peer_type, peer.title
+            )
+        return peer
+
+    def invalidate(self, account_id: Optional[int], username: str):
+        key = (account_id, canonical_username(username))
+        self._peers.pop(key, None)
+        if self.db_ops is not None and account_id is not None:
+            self.db_ops.delete_resolved_peer(account_id, key[1])
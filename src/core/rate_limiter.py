@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Callable
+
+class TokenBucket:
+    """
+    Token bucket для ограничения частоты вступлений одного аккаунта.
+
+    rate - скорость пополнения (токенов в секунду), burst - емкость ведра.
+    FloodWaitError выставляет жесткий cooldown, во время которого токены
+    не выдаются и не накапливаются.
+    """
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated_at = clock()
+        self.cooldown_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        start = max(self.updated_at, self.cooldown_until)
+        if now > start:
+            self.tokens = min(self.burst, self.tokens + (now - start) * self.rate)
+        self.updated_at = max(self.updated_at, now)
+
+    def delay(self) -> float:
+        """
+        Сколько секунд осталось до появления свободного токена
+        """
+        now = self.clock()
+        self._refill(now)
+        if now < self.cooldown_until:
+            return self.cooldown_until - now + max(0.0, 1 - self.tokens) / self.rate
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def try_acquire(self) -> bool:
+        if self.delay() > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def wait_ready(self):
+        """
+        Ждет появления токена, не забирая его
+        """
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def acquire(self):
+        async with self._lock:
+            while not self.try_acquire():
+                await asyncio.sleep(self.delay())
+
+    def set_rate(self, rate: float):
+        """
+        Меняет скорость пополнения; накопленное по старой скорости сохраняется
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self._refill(self.clock())
+        self.rate = rate
+
+    def set_cooldown(self, seconds: float):
+        """
+        Блокирует выдачу токенов на seconds секунд (FloodWaitError)
+        """
+        now = self.clock()
+        self._refill(now)
+        self.tokens = 0.0
+        self.cooldown_until = max(self.cooldown_until, now + seconds)
+
+    def cooldown_remaining(self) -> float:
+        return max(0.0, self.cooldown_until - self.clock())
+
+class AimdPacer:
+    """
+    Адаптивная скорость вступлений аккаунта (AIMD).
+
+    Каждое успешное вступление прибавляет increase / rate вступлений в
+    минуту, то есть примерно increase за минуту чистой работы; FloodWait
+    умножает скорость на decrease. Так скорость колеблется у предела,
+    который аккаунт выдерживает. Скорость хранится в вступлениях в минуту.
+    """
+    def __init__(self, bucket: TokenBucket, min_rate: float, max_rate: float,
+                 increase: float, decrease: float):
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        self.bucket = bucket
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate * 60
+
+    def set(self, rate: float) -> float:
+        rate = min(self.max_rate, max(self.min_rate, rate))
+        self.bucket.set_rate(rate / 60)
+        return rate
+
+    def on_success(self) -> float:
+        return self.set(self.rate + self.increase / self.rate)
+
+    def on_flood_wait(self) -> float:
+        return self.set(self.rate * self.decrease)
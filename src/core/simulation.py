@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional
+
+from src.core.account_manager import AccountManager
+from src.core.client_pool import ClientPool
+from src.core.events import EventBus
+from src.core.fake_telegram import SimulatedTelegram, SimulationConfig
+from src.core.join_scheduler import JoinScheduler
+from src.database.models import Link
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop с виртуальным временем: когда готовых задач нет, время
+    сразу перескакивает к ближайшему таймеру вместо ожидания.
+
+    Подходит только для кампаний целиком внутри процесса (поддельные
+    клиенты, без сети и executor): реальные I/O события такой loop не ждет.
+    """
+    def __init__(self):
+        super().__init__()
+        self._offset = 0.0
+
+    def time(self) -> float:
+        return super().time() + self._offset
+
+    def _run_once(self):
+        # Both attributes are BaseEventLoop internals, stable since 3.4
+        if not self._ready and self._scheduled:
+            gap = self._scheduled[0].when() - self.time()
+            if gap > 0:
+                self._offset += gap
+        super()._run_once()
+
+def run_virtual(coro):
+    """
+    Выполняет корутину в VirtualTimeLoop
+    """
+    with asyncio.Runner(loop_factory=VirtualTimeLoop) as runner:
+        return runner.run(coro)
+
+@dataclass
+class SimulationReport:
+    accounts: int
+    links: int
+    succeeded: int
+    failed: int
+    skipped: int
+    virtual_seconds: float
+    wall_seconds: float
+    joins_per_minute: float
+    mean_join_rate: float
+    stats: Dict[str, int]
+
+    @property
+    def speedup(self) -> float:
+        return self.virtual_seconds / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+async def simulate(config: SimulationConfig, join_rate: Optional[float] = None,
+                   join_burst: Optional[int] = None, adaptive: bool = True) -> SimulationReport:
+    """
+    Прогоняет кампанию на поддельных аккаунтах через настоящий JoinScheduler.
+
+    join_rate и join_burst переопределяют JOIN_RATE_PER_MINUTE и JOIN_BURST;
+    adaptive=False фиксирует скорость, отключая AIMD.
+    """
+    loop = asyncio.get_running_loop()
+    world = SimulatedTelegram(config)
+    urls = world.make_links(config.links)
+    pool = ClientPool(max_connections=max(1, config.accounts), client_factory=world.client)
+    events = EventBus()
+
+    managers: List[AccountManager] = []
+    for account_id in range(1, config.accounts + 1):
+        account_manager = AccountManager(
+            f"simulated_{account_id}", account_id, events=events, pool=pool, clock=loop.time
+        )
+        pacer = account_manager.pacer
+        if join_burst is not None:
+            account_manager.rate_limiter.burst = join_burst
+            account_manager.rate_limiter.tokens = float(join_burst)
+        if join_rate is not None:
+            pacer.min_rate = min(pacer.min_rate, join_rate)
+            pacer.max_rate = max(pacer.max_rate, join_rate)
+        if not adaptive:
+            pacer.min_rate = pacer.max_rate = join_rate if join_rate is not None else pacer.rate
+        pacer.set(join_rate if join_rate is not None else pacer.rate)
+        managers.append(account_manager)
+
+    links = [Link(id=index, url=url, status="pending") for index, url in enumerate(urls, 1)]
+    scheduler = JoinScheduler(managers, clock=loop.time)
+    started_at = loop.time()
+    wall_started_at = time.perf_counter()
+    try:
+        succeeded, failed = await scheduler.run(links)
+    finally:
+        await pool.close_all()
+    virtual_seconds = loop.time() - started_at
+
+    return SimulationReport(
+        accounts=config.accounts,
+        links=config.links,
+        succeeded=succeeded,
+        failed=failed,
+        skipped=len(scheduler.skipped_links),
+        virtual_seconds=round(virtual_seconds, 1),
+        wall_seconds=round(time.perf_counter() - wall_started_at, 3),
+        joins_per_minute=round(succeeded / virtual_seconds * 60, 2) if virtual_seconds > 0 else 0.0,
+        mean_join_rate=round(sum(m.pacer.rate for m in managers) / max(1, len(managers)), 2),
+        stats=dict(world.stats)
+    )
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run a join campaign against simulated Telegram accounts in virtual time"
+    )
+    for field in fields(SimulationConfig):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(field.default), default=field.default)
+    parser.add_argument("--join-rate", type=float, default=None, help="joins per minute per account")
+    parser.add_argument("--join-burst", type=int, default=None)
+    parser.add_argument("--fixed-rate", action="store_true", help="disable AIMD pacing")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    config = SimulationConfig(**{field.name: getattr(args, field.name) for field in fields(SimulationConfig)})
+    report = run_virtual(simulate(config, args.join_rate, args.join_burst, not args.fixed_rate))
+    if args.json:
+        print(json.dumps(asdict(report), indent=2))
+        return
+    print(
+        f"{report.accounts} accounts, {report.links} links: {report.succeeded} succeeded, "
+        f"{report.skipped} already joined, {report.failed} failed\n"
+        f"{report.virtual_seconds:.0f}s virtual in {report.wall_seconds:.2f}s wall "
+        f"(x{report.speedup:.0f}), {report.joins_per_minute:.1f} joins/min, "
+        f"mean rate {report.mean_join_rate:.1f}/min per account\n"
+        f"{report.stats}"
+    )
+
+if __name__ == "__main__":
+    main()
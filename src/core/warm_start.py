@@ -0,0 +1,55 @@
+import asyncio
+import time
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+from config.config import settings
+from src.core.account_manager import AccountManager
+from src.core.peer_cache import PeerCache
+from src.database.models import Account
+from src.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from src.database.operations import DatabaseOperations
+
+logger = setup_logger(__name__)
+
+async def warm_start(db_ops: "DatabaseOperations", peer_cache: Optional[PeerCache] = None,
+                     concurrency: int = settings.WARM_START_CONCURRENCY,
+                     timeout: int = settings.WARM_START_TIMEOUT,
+                     accounts: Optional[List[Account]] = None) -> List[Tuple[Account, AccountManager]]:
+    """
+    Подключает сессии всех сохраненных аккаунтов (или только accounts)
+    параллельно, не больше concurrency одновременно, и проверяет авторизацию.
+    Возвращает пары (account, account_manager) для готовых аккаунтов.
+    """
+    started_at = time.monotonic()
+    if accounts is None:
+        accounts = db_ops.get_active_accounts()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def connect(account: Account) -> Optional[Tuple[Account, AccountManager]]:
+        account_manager = AccountManager(
+            account.session_file,
+            account_id=account.id,
+            db_ops=db_ops,
+            peer_cache=peer_cache
+        )
+        async with semaphore:
+            try:
+                authorized = await asyncio.wait_for(account_manager.is_authorized(), timeout)
+            except Exception as e:
+                logger.error(f"Warm start failed for account {account.phone}: {e!r}")
+                return None
+        if not authorized:
+            logger.warning(f"Account {account.phone} is not authorized, skipping")
+            return None
+        return account, account_manager
+
+    results = await asyncio.gather(*(connect(account) for account in accounts))
+    ready = [result for result in results if result is not None]
+
+    logger.info(
+        f"Warm start: {len(ready)}/{len(accounts)} accounts ready "
+        f"in {time.monotonic() - started_at:.1f}s"
+    )
+    return ready
@@ -0,0 +1,120 @@
+import asyncio
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from config.config import settings
+from src.core.account_manager import AccountManager
+from src.core.client_pool import client_pool
+from src.core.events import event_bus, subscribe_join_metrics
+from src.core.job_queue import JobQueue
+from src.core.join_scheduler import JoinScheduler
+from src.core.node_coordinator import NodeCoordinator
+from src.core.peer_cache import PeerCache
+from src.database.write_behind import WriteBehindBuffer
+from src.utils.logger import setup_logger
+from src.utils.metrics import MetricsServer
+from src.utils.rpc_trace import rpc_tracer
+
+if TYPE_CHECKING:
+    from src.database.operations import DatabaseOperations
+
+logger = setup_logger(__name__)
+
+class AccountShard:
+    """
+    Аккаунты узла: подключает перешедшие к нему и отключает отданные.
+
+    account_managers содержит менеджеры всех аккаунтов (клиенты создаются
+    без подключения), поэтому запущенные кампании видят смену владельца
+    без пересоздания менеджеров.
+    """
+    def __init__(self, db_ops: "DatabaseOperations", peer_cache: PeerCache,
+                 account_managers: Dict[int, AccountManager],
+                 concurrency: int = settings.WARM_START_CONCURRENCY):
+        self.db_ops = db_ops
+        self.peer_cache = peer_cache
+        self.account_managers = account_managers
+        self.concurrency = concurrency
+
+    def load(self) -> List[AccountManager]:
+        """
+        Создает менеджеры для аккаунтов, которых еще нет, без подключения
+        """
+        for account in self.db_ops.get_active_accounts():
+            if account.id not in self.account_managers:
+                self.account_managers[account.id] = AccountManager(
+                    account.session_file, account.id, self.db_ops, self.peer_cache
+                )
+        return list(self.account_managers.values())
+
+    async def acquired(self, account_ids: List[int]):
+        self.load()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def connect(account_manager: AccountManager):
+            async with semaphore:
+                if not await account_manager.connect():
+                    logger.warning(f"Account {account_manager.account_id} is not ready on this node")
+
+        await asyncio.gather(*(
+            connect(self.account_managers[account_id])
+            for account_id in account_ids if account_id in self.account_managers
+        ))
+
+    async def released(self, account_ids: List[int]):
+        for account_id in account_ids:
+            account_manager = self.account_managers.get(account_id)
+            if account_manager is not None:
+                await account_manager.pool.disconnect(account_manager.session_file)
+
+async def run_worker_node(db_ops: "DatabaseOperations", poll_interval: float = settings.JOB_POLL_INTERVAL):
+    """
+    Узел без бота: держит свою долю аккаунтов и выполняет задания из общей очереди
+    """
+    peer_cache = PeerCache(db_ops)
+    write_buffer = WriteBehindBuffer(db_ops)
+    shard = AccountShard(db_ops, peer_cache, {})
+    node = NodeCoordinator(db_ops, on_acquired=shard.acquired, on_released=shard.released)
+    running: Dict[int, asyncio.Task] = {}
+    # Jobs left open because every account here retired: loop time of the next try
+    stalled: Dict[int, float] = {}
+    metrics_server = MetricsServer() if settings.METRICS_PORT else None
+
+    async def run_job(job_id: int, owner_id: Optional[int]):
+        try:
+            scheduler = JoinScheduler(shard.load(), None, write_buffer, owner_id, is_owned=node.owns)
+            await scheduler.run_job(JobQueue(db_ops), job_id)
+            # Whoever sees the queue drained closes the job; the bot node may be down
+            if not db_ops.finish_join_job(job_id):
+                stalled[job_id] = asyncio.get_running_loop().time() + settings.JOB_STALLED_RETRY
+        except Exception as e:
+            logger.error(f"Worker node failed on job {job_id}: {e}")
+        finally:
+            running.pop(job_id, None)
+
+    if metrics_server is not None:
+        subscribe_join_metrics(event_bus)
+        await metrics_server.start()
+    await node.start()
+    logger.info(f"Worker node {node.node_id} started")
+    try:
+        while True:
+            now = asyncio.get_running_loop().time()
+            jobs = db_ops.get_unfinished_jobs()
+            for job in jobs:
+                if job.id not in running and stalled.get(job.id, now) <= now:
+                    stalled.pop(job.id, None)
+                    running[job.id] = asyncio.create_task(run_job(job.id, job.owner_id))
+            # Cancelled or finished elsewhere
+            for job_id in set(stalled) - {job.id for job in jobs}:
+                del stalled[job_id]
+            await asyncio.sleep(poll_interval)
+    finally:
+        for task in list(running.values()):
+            task.cancel()
+        await asyncio.gather(*running.values(), return_exceptions=True)
+        await node.close()
+        await write_buffer.close()
+        if metrics_server is not None:
+            await metrics_server.close()
+        await client_pool.close_all()
+        rpc_tracer.close()
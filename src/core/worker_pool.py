@@ -0,0 +1,381 @@
+import asyncio
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config.config import settings
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Messages over the pipe are plain tuples: (kind, job_id, *payload)
+RUN_JOB = "run_job"
+CANCEL_JOB = "cancel_job"
+STOP = "stop"
+PROGRESS = "progress"
+JOB_DONE = "done"
+# Requests to the worker that owns an account: (kind, request_id, account_id, *args),
+# answered with (kind, request_id, *result)
+ACCOUNT_INFO = "account_info"
+RELEASE_ACCOUNT = "release_account"
+CHECK_INVITES = "check_invites"
+
+def shard_of(account_id: int, shard_count: int) -> int:
+    return account_id % shard_count
+
+class _JobRun:
+    """
+    Состояние задания на стороне координатора: счетчики от всех воркеров
+    """
+    def __init__(self, job_id: int, workers: Iterable[int], baseline: Dict[str, int], progress_callback=None):
+        self.job_id = job_id
+        self.progress_callback = progress_callback
+        self.base_success = baseline.get("success", 0)
+        self.base_failed = baseline.get("failed", 0)
+        self.total = sum(baseline.values())
+        self.counts: Dict[int, Tuple[int, int]] = {}
+        self.pending = set(workers)
+        self.done = asyncio.Event()
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def success_count(self) -> int:
+        return self.base_success + sum(success for success, _ in self.counts.values())
+
+    @property
+    def fail_count(self) -> int:
+        return self.base_failed + sum(failed for _, failed in self.counts.values())
+
+    @property
+    def joins_per_minute(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        elapsed = end - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return (self.success_count - self.base_success) / elapsed * 60
+
+    def update(self, worker: int, success: int, failed: int):
+        self.counts[worker] = (success, failed)
+        if self.progress_callback:
+            self.progress_callback(self.success_count, self.fail_count, self.total)
+
+    def worker_done(self, worker: int):
+        self.pending.discard(worker)
+        if not self.pending:
+            self.finished_at = time.monotonic()
+            self.done.set()
+
+class WorkerPool:
+    """
+    Координатор многопроцессного режима.
+
+    Аккаунты делятся между processes воркерами по account_id; каждый
+    воркер держит свои сессии и свой event loop. Задание рассылается
+    всем воркерам через Pipe, элементы они забирают из общей очереди
+    в БД под lease (см. JobQueue), а прогресс и итог шлют обратно.
+
+    Сессию аккаунта держит только его воркер: координатор не подключает
+    такие аккаунты сам, а спрашивает воркер (account_info, check_invites)
+    или просит его отпустить сессию на время повторного входа (release_account).
+    """
+    def __init__(self, processes: int = settings.WORKER_PROCESSES):
+        self.processes = processes
+        self._connections: List = []
+        self._workers: List[multiprocessing.Process] = []
+        self._readers: List[asyncio.Task] = []
+        self._runs: Dict[int, _JobRun] = {}
+        self._requests: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
+        # Blocking Pipe.recv() calls, one thread per worker
+        self._executor = ThreadPoolExecutor(max_workers=max(1, processes), thread_name_prefix="join-pipe")
+
+    def start(self):
+        ctx = multiprocessing.get_context("spawn")
+        for index in range(self.processes):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=worker_main,
+                args=(index, self.processes, child_conn),
+                name=f"join-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._workers.append(process)
+            self._readers.append(asyncio.create_task(self._read(index, parent_conn)))
+        logger.info(f"Started {self.processes} join worker processes")
+
+    async def _read(self, index: int, conn):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                kind, job_id, *payload = await loop.run_in_executor(self._executor, conn.recv)
+            except (EOFError, OSError):
+                logger.error(f"Join worker {index} exited")
+                # Its leases expire and the other workers pick the items up
+                for run in list(self._runs.values()):
+                    run.worker_done(index)
+                return
+            if kind in (ACCOUNT_INFO, RELEASE_ACCOUNT, CHECK_INVITES):
+                future = self._requests.get(job_id)
+                if future is not None and not future.done():
+                    future.set_result(tuple(payload))
+                continue
+            run = self._runs.get(job_id)
+            if run is None:
+                continue
+            if kind == PROGRESS:
+                run.update(index, *payload)
+            elif kind == JOB_DONE:
+                run.update(index, *payload)
+                run.worker_done(index)
+
+    def _send(self, message: tuple, only: Optional[int] = None) -> bool:
+        sent = False
+        for index, conn in enumerate(self._connections):
+            if only is not None and index != only:
+                continue
+            if not self._workers[index].is_alive():
+                continue
+            try:
+                conn.send(message)
+                sent = True
+            except (BrokenPipeError, OSError) as e:
+                logger.error(f"Failed to send {message[0]} to join worker {index}: {e}")
+        return sent
+
+    async def _ask(self, kind: str, account_id: int, timeout: float, *args) -> Optional[tuple]:
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = future
+        try:
+            if not self._send((kind, request_id, account_id, *args), only=shard_of(account_id, self.processes)):
+                return None
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Join worker did not answer {kind} for account {account_id} in {timeout:.0f}s")
+            return None
+        finally:
+            del self._requests[request_id]
+
+    async def account_info(self, account_id: int,
+                           timeout: float = settings.WARM_START_TIMEOUT * 2) -> Tuple[bool, str, int, int]:
+        """
+        Профиль аккаунта от воркера, который держит его сессию
+        """
+        result = await self._ask(ACCOUNT_INFO, account_id, timeout)
+        return result if result is not None else (False, "unknown", 0, 0)
+
+    async def check_invites(self, account_id: int, links: List[Tuple[int, str]],
+                            timeout: Optional[float] = None) -> Optional[Tuple[List[int], List[int]]]:
+        """
+        Предпроверка invite-ссылок сессией аккаунта в его воркере.
+        links - пары (link_id, url); возвращает (мертвые id, id уже вступивших)
+        или None, если воркер не ответил
+        """
+        if timeout is None:
+            # Every batch of parallel checks gets as long as connecting an account
+            timeout = settings.WARM_START_TIMEOUT * (1 + len(links) // max(1, settings.INVITE_CHECK_CONCURRENCY))
+        result = await self._ask(CHECK_INVITES, account_id, timeout, links)
+        return result if result is None else (result[0], result[1])
+
+    async def release_account(self, account_id: int, hold: bool = True,
+                              timeout: float = settings.WARM_START_TIMEOUT) -> bool:
+        """
+        Просит воркер отключить сессию аккаунта. С hold=True воркер не подключит
+        ее снова, пока не придет release_account(hold=False): так координатор
+        проводит повторный вход, не деля auth key с воркером
+        """
+        return await self._ask(RELEASE_ACCOUNT, account_id, timeout, hold) is not None
+
+    async def run_job(self, job_id: int, owner_id: Optional[int], baseline: Dict[str, int],
+                      progress_callback=None) -> _JobRun:
+        """
+        Выполняет задание на всех воркерах и ждет, пока каждый отчитается
+        """
+        alive = [index for index, process in enumerate(self._workers) if process.is_alive()]
+        run = _JobRun(job_id, alive, baseline, progress_callback)
+        self._runs[job_id] = run
+        try:
+            if progress_callback:
+                progress_callback(run.success_count, run.fail_count, run.total)
+            self._send((RUN_JOB, job_id, owner_id))
+            if alive:
+                await run.done.wait()
+            return run
+        except asyncio.CancelledError:
+            self._send((CANCEL_JOB, job_id))
+            raise
+        finally:
+            del self._runs[job_id]
+
+    async def close(self, timeout: float = 10.0):
+        for reader in self._readers:
+            reader.cancel()
+        self._send((STOP, None))
+        loop = asyncio.get_running_loop()
+        for process in self._workers:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._connections:
+            conn.close()
+        self._executor.shutdown(wait=False)
+        self._workers.clear()
+        self._connections.clear()
+        self._readers.clear()
+
+def worker_main(index: int, shard_count: int, conn):
+    """
+    Точка входа процесса-воркера
+    """
+    asyncio.run(_serve(index, shard_count, conn))
+
+async def _serve(index: int, shard_count: int, conn):
+    # Imported here so the coordinator does not need Telethon state of its own
+    from src.core.account_manager import AccountManager
+    from src.core.client_pool import client_pool
+    from src.core.events import event_bus, subscribe_join_metrics
+    from src.core.invite_checker import InviteChecker
+    from src.core.job_queue import JobQueue
+    from src.core.join_scheduler import JoinScheduler
+    from src.core.peer_cache import PeerCache
+    from src.core.warm_start import warm_start
+    from src.database.database import get_db
+    from src.database.models import Link
+    from src.database.operations import DatabaseOperations
+    from src.database.write_behind import WriteBehindBuffer
+    from src.utils.metrics import MetricsServer
+    from src.utils.rpc_trace import rpc_tracer
+
+    db_ops = DatabaseOperations(next(get_db()))
+    peer_cache = PeerCache(db_ops)
+    write_buffer = WriteBehindBuffer(db_ops)
+    invite_checker = InviteChecker()
+    account_managers: Dict[int, AccountManager] = {}
+    jobs: Dict[int, asyncio.Task] = {}
+    requests: Set[asyncio.Task] = set()
+    # Accounts the coordinator is signing in, their sessions stay closed here
+    held: Set[int] = set()
+    if rpc_tracer.export_path:
+        # Buffered appends from several processes would interleave lines
+        rpc_tracer.export_path = f"{rpc_tracer.export_path}.worker{index}"
+    metrics_server: Optional[MetricsServer] = None
+    if settings.METRICS_PORT:
+        # Each worker is its own scrape target next to the coordinator's port
+        metrics_server = MetricsServer(port=settings.METRICS_PORT + 1 + index)
+        subscribe_join_metrics(event_bus)
+        await metrics_server.start()
+
+    async def load_shard():
+        # Accounts added since the last job are connected on demand
+        accounts = [
+            account for account in db_ops.get_active_accounts()
+            if shard_of(account.id, shard_count) == index
+            and account.id not in account_managers and account.id not in held
+        ]
+        if accounts:
+            for account, account_manager in await warm_start(db_ops, peer_cache, accounts=accounts):
+                account_managers[account.id] = account_manager
+            # Sessions that are not ready stay closed, the bot may be signing them in
+            for account in accounts:
+                if account.id not in account_managers:
+                    await client_pool.disconnect(account.session_file)
+
+    async def answer(kind: str, request_id: int, account_id: int, *args):
+        result: tuple = ()
+        try:
+            if kind == ACCOUNT_INFO:
+                await load_shard()
+                account_manager = account_managers.get(account_id)
+                result = (
+                    await account_manager.get_account_info() if account_manager is not None
+                    else (False, "unknown", 0, 0)
+                )
+            elif kind == CHECK_INVITES:
+                await load_shard()
+                account_manager = account_managers.get(account_id)
+                result = ([], [])
+                if account_manager is not None:
+                    links = [Link(id=link_id, url=url, account_id=account_id) for link_id, url in args[0]]
+                    _, dead_links, joined_links = await invite_checker.filter_links(account_manager, links)
+                    result = ([link.id for link in dead_links], [link.id for link in joined_links])
+            elif kind == RELEASE_ACCOUNT:
+                if args[0]:
+                    held.add(account_id)
+                else:
+                    held.discard(account_id)
+                account_manager = account_managers.pop(account_id, None)
+                if account_manager is not None:
+                    # A running campaign must stop using the session being signed in again
+                    account_manager.healthy = False
+                    await client_pool.disconnect(account_manager.session_file)
+        except Exception as e:
+            logger.error(f"Join worker {index} failed on {kind} for account {account_id}: {e}")
+            if kind == ACCOUNT_INFO:
+                result = (False, "unknown", 0, 0)
+            elif kind == CHECK_INVITES:
+                result = ([], [])
+        conn.send((kind, request_id, *result))
+
+    async def run_job(job_id: int, owner_id: Optional[int]):
+        scheduler: Optional[JoinScheduler] = None
+        baseline: List[Tuple[int, int]] = []
+        try:
+            await load_shard()
+
+            def progress(success_count: int, fail_count: int, total: int):
+                if not baseline:
+                    baseline.append((success_count, fail_count))
+                    return
+                conn.send((PROGRESS, job_id, success_count - baseline[0][0], fail_count - baseline[0][1]))
+
+            managers = list(account_managers.values())
+            scheduler = JoinScheduler(managers, progress, write_buffer, owner_id)
+            if managers:
+                await scheduler.run_job(JobQueue(db_ops), job_id)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Join worker {index} failed on job {job_id}: {e}")
+        finally:
+            write_buffer.flush()
+            jobs.pop(job_id, None)
+            success = failed = 0
+            if scheduler is not None and baseline:
+                success = scheduler.success_count - baseline[0][0]
+                failed = scheduler.fail_count - baseline[0][1]
+            conn.send((JOB_DONE, job_id, success, failed))
+
+    loop = asyncio.get_running_loop()
+    logger.info(f"Join worker {index}/{shard_count} started")
+    try:
+        while True:
+            try:
+                kind, job_id, *payload = await loop.run_in_executor(None, conn.recv)
+            except (EOFError, OSError):
+                break
+            if kind == STOP:
+                break
+            if kind == RUN_JOB:
+                jobs[job_id] = asyncio.create_task(run_job(job_id, *payload))
+            elif kind == CANCEL_JOB and job_id in jobs:
+                jobs[job_id].cancel()
+            elif kind in (ACCOUNT_INFO, RELEASE_ACCOUNT, CHECK_INVITES):
+                task = asyncio.create_task(answer(kind, job_id, *payload))
+                requests.add(task)
+                task.add_done_callback(requests.discard)
+    finally:
+        for task in list(jobs.values()) + list(requests):
+            task.cancel()
+        await asyncio.gather(*jobs.values(), *requests, return_exceptions=True)
+        await write_buffer.close()
+        if metrics_server is not None:
+            await metrics_server.close()
+        await client_pool.close_all()
+        rpc_tracer.close()
+        logger.info(f"Join worker {index} stopped")
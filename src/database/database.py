@@ -1,11 +1,24 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, literal, text
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
 from config.config import settings
+from src.database.models import Base
+from src.utils.link_parser import LINK_USERNAME, parse_link
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
 
 engine = create_engine(settings.DATABASE_URL)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # Join workers run in several processes: let readers proceed while
+        # one writes, and wait on a locked database instead of failing
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
 
 def get_db():
     db = SessionLocal()
@@ -14,5 +27,62 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+def _add_missing_columns(connection):
+    """
+    create_all не меняет существующие таблицы: добавляет колонки и индексы,
+    появившиеся в моделях позже. Возвращает {таблица: [добавленные колонки]}
+    """
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+    added = {}
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = (
+                f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                f"{column.type.compile(dialect=connection.dialect)}"
+            )
+            if column.default is not None and column.default.is_scalar:
+                # Existing rows get the model default instead of NULL
+                default = literal(column.default.arg, column.type).compile(
+                    dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+                )
+                ddl += f" DEFAULT {default}"
+            connection.execute(text(ddl))
+            added.setdefault(table.name, []).append(column.name)
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(connection)
+    return added
+
+def _backfill_links(connection, added_columns):
+    # Links saved before status/link_type existed: derive them from the old columns
+    if "status" in added_columns:
+        connection.execute(text("UPDATE links SET status = 'success' WHERE is_joined = 1"))
+    if "link_type" in added_columns:
+        rows = connection.execute(text("SELECT id, url FROM links")).all()
+        for link_id, url in rows:
+            parsed = parse_link(url)
+            if parsed is not None and parsed.kind != LINK_USERNAME:
+                connection.execute(
+                    text("UPDATE links SET link_type = :kind WHERE id = :id"),
+                    {"kind": parsed.kind, "id": link_id}
+                )
+
+def init_db(bind=None):
+    """
+    Создает таблицы и доводит схему существующей базы до моделей.
+    Повторный запуск ничего не меняет
+    """
+    with (bind or engine).begin() as connection:
+        Base.metadata.create_all(bind=connection)
+        added = _add_missing_columns(connection)
+        if "links" in added:
+            _backfill_links(connection, added["links"])
+    for table, columns in added.items():
+        logger.info(f"Upgraded table {table}: added {', '.join(columns)}")
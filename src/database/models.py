@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Boolean, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -11,6 +11,8 @@ class Account(Base):
     id = Column(Integer, primary_key=True)
     phone = Column(String, unique=True, nullable=False)
     session_file = Column(String, nullable=False)
+    owner_id = Column(BigInteger, nullable=True)  # Telegram id of the bot operator
+    join_rate = Column(Float, nullable=True)  # learned joins per minute, None until measured
     is_active = Column(Boolean, default=True)
     successful_joins = Column(Integer, default=0)
     errors = Column(Integer, default=0)
@@ -19,17 +21,38 @@ class Account(Base):
     
     links = relationship("Link", back_populates="account")
     join_attempts = relationship("JoinAttempt", back_populates="account")
+    cooldowns = relationship("AccountCooldown", back_populates="account")
 
     def __repr__(self):
         return f"<Account(phone='{self.phone}', active={self.is_active}, joins={self.successful_joins})>"
 
+class AccountCooldown(Base):
+    __tablename__ = "account_cooldowns"
+    __table_args__ = (UniqueConstraint("account_id", "operation"),)
+    
+    id = Column(Integer, primary_key=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    operation = Column(String, nullable=False)  # join/resolve/check_invite
+    blocked_until = Column(DateTime, nullable=False)
+    reason = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    account = relationship("Account", back_populates="cooldowns")
+
+    def __repr__(self):
+        return f"<AccountCooldown(account_id={self.account_id}, operation='{self.operation}', until={self.blocked_until})>"
+
 class Link(Base):
     __tablename__ = "links"
     
     id = Column(Integer, primary_key=True)
-    url = Column(String, unique=True, nullable=False)
+    url = Column(String, unique=True, nullable=False)  # canonical url from link_parser
+    link_type = Column(String, default="username")  # username/invite/private
     is_active = Column(Boolean, default=True)
     is_joined = Column(Boolean, default=False)
+    status = Column(String, default="pending")  # pending/success/failed/dead
+    priority = Column(Integer, default=0)  # higher joins first within a job
+    deadline = Column(DateTime, nullable=True)  # not joined after this, the link is failed
     successful_joins = Column(Integer, default=0)
     last_check = Column(DateTime, default=datetime.now)
     created_at = Column(DateTime, default=datetime.now)
@@ -52,4 +75,82 @@ class JoinAttempt(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     account = relationship("Account", back_populates="join_attempts")
-    link = relationship("Link", back_populates="join_attempts") 
\ No newline at end of file
+    link = relationship("Link", back_populates="join_attempts")
+
+class ResolvedPeer(Base):
+    __tablename__ = "resolved_peers"
+    __table_args__ = (UniqueConstraint("username", "account_id"),)
+    
+    id = Column(Integer, primary_key=True)
+    username = Column(String, nullable=False, index=True)  # canonical, lowercase
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)  # access_hash is per account
+    peer_id = Column(BigInteger, nullable=False)
+    access_hash = Column(BigInteger, nullable=True)
+    peer_type = Column(String, nullable=False)  # channel/chat/user
+    title = Column(String, nullable=True)
+    resolved_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ResolvedPeer(username='{self.username}', peer_id={self.peer_id}, type='{self.peer_type}')>"
+
+class JoinJob(Base):
+    __tablename__ = "join_jobs"
+    
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(BigInteger, nullable=True)  # Telegram id of the operator
+    status = Column(String, default="running")  # running/finished/cancelled
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    items = relationship("JoinWorkItem", back_populates="job")
+
+    def __repr__(self):
+        return f"<JoinJob(id={self.id}, owner={self.owner_id}, status='{self.status}')>"
+
+class JoinWorkItem(Base):
+    __tablename__ = "join_work_items"
+    __table_args__ = (UniqueConstraint("job_id", "link_id"),)
+    
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("join_jobs.id"), nullable=False, index=True)
+    link_id = Column(Integer, ForeignKey("links.id"), nullable=False)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)  # account that handled it
+    status = Column(String, default="queued", index=True)  # queued/leased/success/failed
+    priority = Column(Integer, default=0)  # copied from the link
+    deadline = Column(DateTime, nullable=True)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0)  # transient failures so far, not claims
+    not_before = Column(DateTime, nullable=True)  # retry backoff, not claimable until then
+    error_message = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    job = relationship("JoinJob", back_populates="items")
+    link = relationship("Link")
+
+    def __repr__(self):
+        return f"<JoinWorkItem(id={self.id}, job={self.job_id}, link={self.link_id}, status='{self.status}')>"
+
+class Node(Base):
+    __tablename__ = "nodes"
+    
+    id = Column(Integer, primary_key=True)
+    node_id = Column(String, unique=True, nullable=False)  # host:pid:token
+    hostname = Column(String, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<Node(node_id='{self.node_id}', heartbeat={self.heartbeat_at})>"
+
+class AccountLease(Base):
+    __tablename__ = "account_leases"
+    
+    id = Column(Integer, primary_key=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), unique=True, nullable=False)
+    node_id = Column(String, nullable=True)  # owner node, None when released
+    expires_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AccountLease(account_id={self.account_id}, node='{self.node_id}', until={self.expires_at})>"
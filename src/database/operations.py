@@ -1,8 +1,21 @@
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
 
-from src.database.models import Account, Link, JoinAttempt
+from src.database.models import (
+    Account,
+    AccountCooldown,
+    AccountLease,
+    Link,
+    JoinAttempt,
+    JoinJob,
+    JoinWorkItem,
+    Node,
+    ResolvedPeer
+)
+from src.utils.link_parser import parse_links
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -11,14 +24,16 @@ class DatabaseOperations:
     def __init__(self, db: Session):
         self.db = db
         
-    def create_account(self, phone: str, session_file: str) -> Optional[Account]:
+    def create_account(self, phone: str, session_file: str,
+                       owner_id: Optional[int] = None) -> Optional[Account]:
         """
         Создает новый аккаунт в базе данных
         """
         try:
             account = Account(
                 phone=phone,
-                session_file=session_file
+                session_file=session_file,
+                owner_id=owner_id
             )
             
             self.db.add(account)
@@ -41,6 +56,57 @@ class DatabaseOperations:
             logger.error(f"Failed to get account {phone}: {e}")
             return None
             
+    def get_active_accounts(self) -> List[Account]:
+        """
+        Получает все активные аккаунты (для прогрева при старте)
+        """
+        try:
+            return self.db.query(Account).filter(Account.is_active == True).all()
+        except Exception as e:
+            logger.error(f"Failed to get active accounts: {e}")
+            return []
+            
+    def get_join_rate(self, account_id: int) -> Optional[float]:
+        """
+        Возвращает выученную скорость вступлений аккаунта (в минуту)
+        """
+        try:
+            return self.db.query(Account.join_rate).filter(Account.id == account_id).scalar()
+        except Exception as e:
+            logger.error(f"Failed to get join rate for account {account_id}: {e}")
+            return None
+
+    def save_join_rate(self, account_id: int, rate: float) -> bool:
+        """
+        Сохраняет выученную скорость вступлений аккаунта
+        """
+        try:
+            updated = self.db.query(Account).filter(Account.id == account_id).update(
+                {Account.join_rate: rate}, synchronize_session=False
+            )
+            self.db.commit()
+            return bool(updated)
+        except Exception as e:
+            logger.error(f"Failed to save join rate for account {account_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def set_account_owner(self, account_id: int, owner_id: int) -> bool:
+        """
+        Привязывает аккаунт к оператору бота
+        """
+        try:
+            account = self.db.query(Account).filter(Account.id == account_id).first()
+            if account:
+                account.owner_id = owner_id
+                self.db.commit()
+                return True
+            return False
+        except Exception as e:
+            logger.error(f"Failed to set owner for account {account_id}: {e}")
+            self.db.rollback()
+            return False
+            
     def update_account_info(self, phone: str, groups_count: int) -> bool:
         """
         Обновляет информацию об аккаунте
@@ -58,17 +124,36 @@ class DatabaseOperations:
             self.db.rollback()
             return False
             
-    def add_links(self, account_id: int, links: List[str]) -> List[Link]:
+    def add_links(self, account_id: int, links: List[str], priority: int = 0,
+                  deadline: Optional[datetime] = None) -> List[Link]:
         """
-        Добавляет ссылки для аккаунта
+        Добавляет ссылки для аккаунта.
+        Ссылки приводятся к каноническому виду, дубликаты и уже сохраненные пропускаются.
         """
         try:
+            parsed_links, invalid_links = parse_links(links)
+            if invalid_links:
+                logger.warning(f"Skipped {len(invalid_links)} invalid links for account {account_id}")
+
+            existing = set()
+            urls = [parsed.url for parsed in parsed_links]
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                existing.update(
+                    url for (url,) in self.db.query(Link.url).filter(Link.url.in_(chunk))
+                )
+
             new_links = []
-            for url in links:
+            for parsed in parsed_links:
+                if parsed.url in existing:
+                    continue
                 link = Link(
                     account_id=account_id,
-                    url=url,
-                    status="pending"
+                    url=parsed.url,
+                    link_type=parsed.kind,
+                    status="pending",
+                    priority=priority,
+                    deadline=deadline
                 )
                 self.db.add(link)
                 new_links.append(link)
@@ -140,8 +225,554 @@ class DatabaseOperations:
         try:
             return self.db.query(Link).filter(
                 Link.account_id == account_id,
-                Link.status == "failed"
+                Link.status.in_(["failed", "dead"])
             ).all()
         except Exception as e:
             logger.error(f"Failed to get failed links for account {account_id}: {e}")
-            return [] 
\ No newline at end of file
+            return []
+
+    def set_cooldown(self, account_id: int, operation: str, seconds: int,
+                     reason: Optional[str] = None) -> bool:
+        """
+        Записывает блокировку аккаунта для операции (FloodWaitError).
+        Более ранняя дата никогда не перезаписывает более позднюю.
+        """
+        try:
+            now = datetime.utcnow()
+            blocked_until = now + timedelta(seconds=seconds)
+            cooldown = self.db.query(AccountCooldown).filter(
+                AccountCooldown.account_id == account_id,
+                AccountCooldown.operation == operation
+            ).first()
+            if cooldown:
+                if cooldown.blocked_until < blocked_until:
+                    cooldown.blocked_until = blocked_until
+                    cooldown.reason = reason
+                cooldown.updated_at = now
+            else:
+                self.db.add(AccountCooldown(
+                    account_id=account_id,
+                    operation=operation,
+                    blocked_until=blocked_until,
+                    reason=reason,
+                    updated_at=now
+                ))
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to set cooldown for account {account_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def get_blocked_until(self, account_id: int, operation: str) -> Optional[datetime]:
+        """
+        Возвращает время окончания блокировки или None, если аккаунт свободен
+        """
+        try:
+            cooldown = self.db.query(AccountCooldown).filter(
+                AccountCooldown.account_id == account_id,
+                AccountCooldown.operation == operation,
+                AccountCooldown.blocked_until > datetime.utcnow()
+            ).first()
+            return cooldown.blocked_until if cooldown else None
+        except Exception as e:
+            logger.error(f"Failed to get cooldown for account {account_id}: {e}")
+            return None
+
+    def get_resolved_peer(self, account_id: int, username: str) -> Optional[ResolvedPeer]:
+        """
+        Получает закешированный результат резолва username для аккаунта
+        """
+        try:
+            return self.db.query(ResolvedPeer).filter(
+                ResolvedPeer.account_id == account_id,
+                ResolvedPeer.username == username
+            ).first()
+        except Exception as e:
+            logger.error(f"Failed to get resolved peer {username}: {e}")
+            return None
+
+    def save_resolved_peer(self, account_id: int, username: str, peer_id: int,
+                           access_hash: Optional[int], peer_type: str,
+                           title: Optional[str] = None) -> bool:
+        """
+        Сохраняет или обновляет результат резолва username
+        """
+        try:
+            peer = self.get_resolved_peer(account_id, username)
+            if not peer:
+                peer = ResolvedPeer(account_id=account_id, username=username)
+                self.db.add(peer)
+            peer.peer_id = peer_id
+            peer.access_hash = access_hash
+            peer.peer_type = peer_type
+            peer.title = title
+            peer.resolved_at = datetime.utcnow()
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save resolved peer {username}: {e}")
+            self.db.rollback()
+            return False
+
+    def delete_resolved_peer(self, account_id: int, username: str) -> bool:
+        """
+        Удаляет устаревшую запись кеша резолва
+        """
+        try:
+            self.db.query(ResolvedPeer).filter(
+                ResolvedPeer.account_id == account_id,
+                ResolvedPeer.username == username
+            ).delete()
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete resolved peer {username}: {e}")
+            self.db.rollback()
+            return False
+
+    def save_join_results(self, attempts: List[Dict], link_statuses: Dict[int, str]) -> bool:
+        """
+        Записывает пачку попыток вступления и статусов ссылок одной транзакцией
+        """
+        try:
+            if attempts:
+                self.db.bulk_insert_mappings(JoinAttempt, attempts)
+            if link_statuses:
+                self.db.bulk_update_mappings(Link, [
+                    {"id": link_id, "status": status}
+                    for link_id, status in link_statuses.items()
+                ])
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save {len(attempts)} join attempts: {e}")
+            self.db.rollback()
+            return False
+
+    def create_join_job(self, owner_id: Optional[int], links: List[Link]) -> Optional[JoinJob]:
+        """
+        Создает задание на вступление с элементом очереди на каждую ссылку
+        """
+        try:
+            job = JoinJob(owner_id=owner_id, status="running")
+            self.db.add(job)
+            self.db.flush()
+            self.db.add_all(
+                JoinWorkItem(
+                    job_id=job.id,
+                    link_id=link.id,
+                    status="queued",
+                    priority=link.priority or 0,
+                    deadline=link.deadline
+                )
+                for link in links
+            )
+            self.db.commit()
+            self.db.refresh(job)
+            return job
+        except Exception as e:
+            logger.error(f"Failed to create join job for owner {owner_id}: {e}")
+            self.db.rollback()
+            return None
+
+    def _claimable(self, now: datetime):
+        return or_(
+            and_(
+                JoinWorkItem.status == "queued",
+                or_(JoinWorkItem.not_before.is_(None), JoinWorkItem.not_before <= now)
+            ),
+            and_(JoinWorkItem.status == "leased", JoinWorkItem.lease_expires_at < now)
+        )
+
+    def claim_work_item(self, job_id: int, lease_owner: str,
+                        lease_seconds: int) -> Optional[JoinWorkItem]:
+        """
+        Забирает следующий свободный элемент очереди под lease.
+        Conditional UPDATE гарантирует, что элемент получит только один воркер.
+        """
+        try:
+            for _ in range(5):
+                now = datetime.utcnow()
+                candidate = self.db.query(JoinWorkItem.id).filter(
+                    JoinWorkItem.job_id == job_id,
+                    self._claimable(now)
+                ).order_by(
+                    # Highest priority first, then earliest deadline, then insertion order
+                    JoinWorkItem.priority.desc(),
+                    JoinWorkItem.deadline.is_(None),
+                    JoinWorkItem.deadline,
+                    JoinWorkItem.id
+                ).first()
+                if candidate is None:
+                    return None
+                updated = self.db.query(JoinWorkItem).filter(
+                    JoinWorkItem.id == candidate.id,
+                    self._claimable(now)
+                ).update({
+                    JoinWorkItem.status: "leased",
+                    JoinWorkItem.lease_owner: lease_owner,
+                    JoinWorkItem.lease_expires_at: now + timedelta(seconds=lease_seconds),
+                    JoinWorkItem.updated_at: now
+                }, synchronize_session=False)
+                self.db.commit()
+                if updated == 1:
+                    return self.db.get(JoinWorkItem, candidate.id)
+            return None
+        except Exception as e:
+            logger.error(f"Failed to claim work item for job {job_id}: {e}")
+            self.db.rollback()
+            return None
+
+    def heartbeat_work_items(self, lease_owner: str, item_ids: List[int], lease_seconds: int) -> int:
+        """
+        Продлевает lease у элементов, которые воркер еще обрабатывает
+        """
+        if not item_ids:
+            return 0
+        try:
+            now = datetime.utcnow()
+            updated = self.db.query(JoinWorkItem).filter(
+                JoinWorkItem.id.in_(item_ids),
+                JoinWorkItem.status == "leased",
+                JoinWorkItem.lease_owner == lease_owner
+            ).update({
+                JoinWorkItem.lease_expires_at: now + timedelta(seconds=lease_seconds),
+                JoinWorkItem.updated_at: now
+            }, synchronize_session=False)
+            self.db.commit()
+            return updated
+        except Exception as e:
+            logger.error(f"Failed to heartbeat work items: {e}")
+            self.db.rollback()
+            return 0
+
+    def complete_work_item(self, item_id: int, lease_owner: str, status: str,
+                           account_id: Optional[int] = None,
+                           error_message: Optional[str] = None) -> bool:
+        """
+        Завершает элемент и в той же транзакции фиксирует статус ссылки.
+        Ничего не делает, если lease уже потерян.
+        """
+        try:
+            item = self.db.query(JoinWorkItem).filter(
+                JoinWorkItem.id == item_id,
+                JoinWorkItem.status == "leased",
+                JoinWorkItem.lease_owner == lease_owner
+            ).first()
+            if not item:
+                return False
+            item.status = status
+            item.account_id = account_id
+            item.error_message = error_message
+            item.lease_owner = None
+            item.lease_expires_at = None
+            item.updated_at = datetime.utcnow()
+            item.link.status = status
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to complete work item {item_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def retry_work_item(self, item_id: int, lease_owner: str, delay: float,
+                        error_message: Optional[str] = None) -> bool:
+        """
+        Возвращает элемент в очередь после временной ошибки; взять его
+        можно не раньше чем через delay секунд. Только здесь растет attempts:
+        возврат при передаче аккаунта или истекшем lease попыткой не считается
+        """
+        try:
+            now = datetime.utcnow()
+            updated = self.db.query(JoinWorkItem).filter(
+                JoinWorkItem.id == item_id,
+                JoinWorkItem.status == "leased",
+                JoinWorkItem.lease_owner == lease_owner
+            ).update({
+                JoinWorkItem.status: "queued",
+                JoinWorkItem.lease_owner: None,
+                JoinWorkItem.lease_expires_at: None,
+                JoinWorkItem.not_before: now + timedelta(seconds=delay),
+                JoinWorkItem.attempts: JoinWorkItem.attempts + 1,
+                JoinWorkItem.error_message: error_message,
+                JoinWorkItem.updated_at: now
+            }, synchronize_session=False)
+            self.db.commit()
+            return updated == 1
+        except Exception as e:
+            logger.error(f"Failed to schedule retry of work item {item_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def release_work_items(self, lease_owner: str, item_ids: List[int]) -> int:
+        """
+        Возвращает необработанные элементы в очередь (отмена, остановка)
+        """
+        if not item_ids:
+            return 0
+        try:
+            updated = self.db.query(JoinWorkItem).filter(
+                JoinWorkItem.id.in_(item_ids),
+                JoinWorkItem.status == "leased",
+                JoinWorkItem.lease_owner == lease_owner
+            ).update({
+                JoinWorkItem.status: "queued",
+                JoinWorkItem.lease_owner: None,
+                JoinWorkItem.lease_expires_at: None
+            }, synchronize_session=False)
+            self.db.commit()
+            return updated
+        except Exception as e:
+            logger.error(f"Failed to release work items: {e}")
+            self.db.rollback()
+            return 0
+
+    def requeue_expired_leases(self) -> int:
+        """
+        Возвращает в очередь элементы с истекшим lease (упавший воркер)
+        """
+        try:
+            updated = self.db.query(JoinWorkItem).filter(
+                JoinWorkItem.status == "leased",
+                JoinWorkItem.lease_expires_at < datetime.utcnow()
+            ).update({
+                JoinWorkItem.status: "queued",
+                JoinWorkItem.lease_owner: None,
+                JoinWorkItem.lease_expires_at: None
+            }, synchronize_session=False)
+            self.db.commit()
+            return updated
+        except Exception as e:
+            logger.error(f"Failed to requeue expired leases: {e}")
+            self.db.rollback()
+            return 0
+
+    def count_work_items(self, job_id: int) -> Dict[str, int]:
+        """
+        Возвращает количество элементов задания по статусам
+        """
+        try:
+            rows = self.db.query(JoinWorkItem.status, func.count(JoinWorkItem.id)).filter(
+                JoinWorkItem.job_id == job_id
+            ).group_by(JoinWorkItem.status).all()
+            return {status: count for status, count in rows}
+        except Exception as e:
+            logger.error(f"Failed to count work items for job {job_id}: {e}")
+            return {}
+
+    def count_queued_by_owner(self) -> Dict[Optional[int], int]:
+        """
+        Число невыполненных элементов в идущих заданиях по операторам
+        """
+        try:
+            rows = self.db.query(JoinJob.owner_id, func.count(JoinWorkItem.id)).join(
+                JoinWorkItem, JoinWorkItem.job_id == JoinJob.id
+            ).filter(
+                JoinJob.status == "running",
+                JoinWorkItem.status.in_(("queued", "leased"))
+            ).group_by(JoinJob.owner_id).all()
+            return {owner_id: count for owner_id, count in rows}
+        except Exception as e:
+            logger.error(f"Failed to count queued work items: {e}")
+            return {}
+
+    def get_unfinished_jobs(self) -> List[JoinJob]:
+        """
+        Получает задания, прерванные остановкой или падением бота
+        """
+        try:
+            return self.db.query(JoinJob).filter(JoinJob.status == "running").all()
+        except Exception as e:
+            logger.error(f"Failed to get unfinished jobs: {e}")
+            return []
+
+    def finish_join_job(self, job_id: int, status: str = "finished") -> bool:
+        """
+        Закрывает идущее задание; при отмене невыполненные элементы тоже
+        закрываются. Уже закрытое задание не меняется: узел, увидевший пустую
+        очередь после отмены, не перезапишет "cancelled" на "finished".
+        Задание с элементами в очереди или под lease не завершается, его
+        продолжит следующий запуск
+        """
+        try:
+            query = self.db.query(JoinJob).filter(
+                JoinJob.id == job_id,
+                JoinJob.status == "running"
+            )
+            if status == "finished":
+                # Checked in the same UPDATE, so an item requeued meanwhile keeps the job open
+                query = query.filter(~exists().where(
+                    JoinWorkItem.job_id == job_id,
+                    JoinWorkItem.status.in_(["queued", "leased"])
+                ))
+            updated = query.update(
+                {JoinJob.status: status, JoinJob.finished_at: datetime.utcnow()},
+                synchronize_session=False
+            )
+            if not updated:
+                self.db.rollback()
+                return False
+            if status == "cancelled":
+                self.db.query(JoinWorkItem).filter(
+                    JoinWorkItem.job_id == job_id,
+                    JoinWorkItem.status.in_(["queued", "leased"])
+                ).update({
+                    JoinWorkItem.status: "cancelled",
+                    JoinWorkItem.lease_owner: None,
+                    JoinWorkItem.lease_expires_at: None
+                }, synchronize_session=False)
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to finish job {job_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def heartbeat_node(self, node_id: str, hostname: Optional[str] = None) -> bool:
+        """
+        Регистрирует узел или обновляет его heartbeat
+        """
+        try:
+            now = datetime.utcnow()
+            updated = self.db.query(Node).filter(Node.node_id == node_id).update(
+                {Node.heartbeat_at: now}, synchronize_session=False
+            )
+            if not updated:
+                self.db.add(Node(node_id=node_id, hostname=hostname, started_at=now, heartbeat_at=now))
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to heartbeat node {node_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def count_live_nodes(self, ttl_seconds: int) -> int:
+        """
+        Количество узлов, присылавших heartbeat за последние ttl_seconds
+        """
+        try:
+            since = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+            return self.db.query(func.count(Node.id)).filter(Node.heartbeat_at >= since).scalar() or 0
+        except Exception as e:
+            logger.error(f"Failed to count live nodes: {e}")
+            return 0
+
+    def prune_nodes(self, ttl_seconds: int) -> int:
+        """
+        Удаляет узлы, давно не присылавшие heartbeat
+        """
+        try:
+            since = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+            deleted = self.db.query(Node).filter(Node.heartbeat_at < since).delete(synchronize_session=False)
+            self.db.commit()
+            return deleted
+        except Exception as e:
+            logger.error(f"Failed to prune nodes: {e}")
+            self.db.rollback()
+            return 0
+
+    def remove_node(self, node_id: str) -> bool:
+        """
+        Снимает узел с регистрации и освобождает его аккаунты
+        """
+        try:
+            self.db.query(AccountLease).filter(AccountLease.node_id == node_id).update({
+                AccountLease.node_id: None,
+                AccountLease.expires_at: None
+            }, synchronize_session=False)
+            self.db.query(Node).filter(Node.node_id == node_id).delete(synchronize_session=False)
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to remove node {node_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def acquire_account_leases(self, node_id: str, account_ids: List[int], limit: int,
+                               lease_seconds: int) -> List[int]:
+        """
+        Забирает до limit свободных или просроченных аккаунтов из account_ids.
+        Conditional UPDATE гарантирует, что аккаунт достанется одному узлу.
+        """
+        if not account_ids or limit <= 0:
+            return []
+        try:
+            existing = {
+                account_id for (account_id,) in
+                self.db.query(AccountLease.account_id).filter(AccountLease.account_id.in_(account_ids))
+            }
+            for account_id in account_ids:
+                if account_id in existing:
+                    continue
+                try:
+                    with self.db.begin_nested():
+                        self.db.add(AccountLease(account_id=account_id))
+                except IntegrityError:
+                    # Another node created the row first
+                    pass
+            self.db.commit()
+
+            acquired = []
+            for account_id in account_ids:
+                if len(acquired) >= limit:
+                    break
+                now = datetime.utcnow()
+                updated = self.db.query(AccountLease).filter(
+                    AccountLease.account_id == account_id,
+                    or_(AccountLease.node_id.is_(None), AccountLease.expires_at < now)
+                ).update({
+                    AccountLease.node_id: node_id,
+                    AccountLease.expires_at: now + timedelta(seconds=lease_seconds),
+                    AccountLease.updated_at: now
+                }, synchronize_session=False)
+                self.db.commit()
+                if updated == 1:
+                    acquired.append(account_id)
+            return acquired
+        except Exception as e:
+            logger.error(f"Failed to acquire account leases for node {node_id}: {e}")
+            self.db.rollback()
+            return []
+
+    def renew_account_leases(self, node_id: str, lease_seconds: int) -> List[int]:
+        """
+        Продлевает аккаунты узла и возвращает id тех, что все еще за ним
+        """
+        try:
+            now = datetime.utcnow()
+            self.db.query(AccountLease).filter(AccountLease.node_id == node_id).update({
+                AccountLease.expires_at: now + timedelta(seconds=lease_seconds),
+                AccountLease.updated_at: now
+            }, synchronize_session=False)
+            self.db.commit()
+            return [
+                account_id for (account_id,) in
+                self.db.query(AccountLease.account_id).filter(AccountLease.node_id == node_id)
+            ]
+        except Exception as e:
+            logger.error(f"Failed to renew account leases for node {node_id}: {e}")
+            self.db.rollback()
+            return []
+
+    def release_account_leases(self, node_id: str, account_ids: List[int]) -> int:
+        """
+        Отдает аккаунты узла другим узлам (ребалансировка)
+        """
+        if not account_ids:
+            return 0
+        try:
+            updated = self.db.query(AccountLease).filter(
+                AccountLease.node_id == node_id,
+                AccountLease.account_id.in_(account_ids)
+            ).update({
+                AccountLease.node_id: None,
+                AccountLease.expires_at: None,
+                AccountLease.updated_at: datetime.utcnow()
+            }, synchronize_session=False)
+            self.db.commit()
+            return updated
+        except Exception as e:
+            logger.error(f"Failed to release account leases for node {node_id}: {e}")
+            self.db.rollback()
+            return 0
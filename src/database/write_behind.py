@@ -0,0 +1,135 @@
+import asyncio
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from config.config import settings
+from src.utils.logger import setup_logger
+from src.utils.metrics import DB_FLUSH_ROWS, DB_FLUSH_SECONDS
+
+if TYPE_CHECKING:
+    from src.database.operations import DatabaseOperations
+
+logger = setup_logger(__name__)
+
+class WriteBehindBuffer:
+    """
+    Буфер результатов вступления с отложенной записью.
+
+    Попытки вступления и статусы ссылок копятся в памяти и сбрасываются
+    в БД одной транзакцией, когда набралось batch_size записей или прошло
+    flush_ms миллисекунд. Статусы одной ссылки схлопываются (побеждает
+    последний). Если записей больше max_pending, добавление сбрасывает
+    буфер сразу; если БД недоступна, старые записи сверх max_pending
+    отбрасываются, так что память остается ограниченной.
+    """
+    def __init__(self, db_ops: "DatabaseOperations",
+                 batch_size: int = settings.WRITE_BEHIND_BATCH_SIZE,
+                 flush_ms: int = settings.WRITE_BEHIND_FLUSH_MS,
+                 max_pending: int = settings.WRITE_BEHIND_MAX_PENDING):
+        self.db_ops = db_ops
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_pending = max_pending
+        self._attempts: List[Dict] = []
+        self._link_statuses: Dict[int, str] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._attempts) + len(self._link_statuses)
+
+    def add_attempt(self, account_id: Optional[int], link_id: int, status: str,
+                    error_message: Optional[str] = None):
+        self._attempts.append({
+            "account_id": account_id,
+            "link_id": link_id,
+            "status": status,
+            "error_message": error_message
+        })
+        self._added()
+
+    def set_link_status(self, link_id: int, status: str):
+        self._link_statuses[link_id] = status
+        self._added()
+
+    def _added(self):
+        if self.pending >= self.max_pending:
+            # Backpressure: the database is behind, write inline instead of growing
+            self.flush()
+            return
+        self._ensure_flusher()
+        # Without a flusher the write-through above already tried
+        if self._wakeup is not None and self.pending >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, tests): write through
+            self.flush()
+            return
+        self._wakeup = asyncio.Event()
+        self._flusher = asyncio.create_task(self._run_flusher())
+
+    def flush(self) -> int:
+        """
+        Сбрасывает накопленные записи одной транзакцией
+        """
+        if not self.pending:
+            return 0
+        attempts, self._attempts = self._attempts, []
+        link_statuses, self._link_statuses = self._link_statuses, {}
+        with DB_FLUSH_SECONDS.time():
+            saved = self.db_ops.save_join_results(attempts, link_statuses)
+        if saved:
+            written = len(attempts) + len(link_statuses)
+            self.flushed += written
+            DB_FLUSH_ROWS.inc(amount=written)
+            return written
+
+        # Keep the batch for the next flush, but never beyond max_pending;
+        # newer statuses of the same link win, older links stay first in line
+        self._attempts = attempts + self._attempts
+        self._link_statuses = {**link_statuses, **self._link_statuses}
+        overflow = self.pending - self.max_pending
+        if overflow > 0:
+            # Attempt history goes first: a lost link status only means the link is joined again later
+            dropped_attempts = min(overflow, len(self._attempts))
+            del self._attempts[:dropped_attempts]
+            dropped_statuses = overflow - dropped_attempts
+            for link_id in list(self._link_statuses)[:dropped_statuses]:
+                del self._link_statuses[link_id]
+            self.dropped += overflow
+            logger.warning(
+                f"Write-behind buffer full, dropped {dropped_attempts} join attempts "
+                f"and {dropped_statuses} link statuses"
+            )
+        return 0
+
+    async def _run_flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+
+    async def close(self):
+        """
+        Останавливает фоновую запись и сбрасывает остаток
+        """
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        written = self.flush()
+        if written:
+            logger.info(f"Flushed {written} pending join results on shutdown")
@@ -1,40 +1,3 @@
-import logging
-import os
-from logging.handlers import RotatingFileHandler
-from config.config import settings
+from src.utils.logger import SAMPLED, setup_logger, stop_logging
 
-def setup_logger(name: str) -> logging.Logger:
-    """
-    Настраивает логгер с ротацией файлов
-    """
-    # Create logger
-    logger = logging.getLogger(name)
-    logger.setLevel(settings.LOG_LEVEL)
-    
-    # Create logs directory if it doesn't exist
-    os.makedirs(settings.LOG_DIR, exist_ok=True)
-    
-    # Create file handler
-    file_handler = RotatingFileHandler(
-        os.path.join(settings.LOG_DIR, f"{name}.log"),
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=5
-    )
-    file_handler.setLevel(settings.LOG_LEVEL)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(settings.LOG_LEVEL)
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger 
\ No newline at end of file
+__all__ = ["SAMPLED", "setup_logger", "stop_logging"]
@@ -0,0 +1,78 @@
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+LINK_USERNAME = "username"
+LINK_INVITE = "invite"
+LINK_PRIVATE = "private"
+
+# Paths on t.me that look like usernames but are not chats
+RESERVED_PATHS = frozenset({
+    "addemoji", "addlist", "addstickers", "addtheme", "bg", "boost",
+    "confirmphone", "invoice", "iv", "joinchat", "login", "proxy",
+    "setlanguage", "share", "socks"
+})
+
+_LINK_RE = re.compile(
+    r"""
+    \s*(?:
+        @(?P<at>[a-z][a-z0-9_]{3,31})
+      | (?:https?://)?(?:www\.)?(?:t\.me|telegram\.me|telegram\.dog)/
+        (?:
+            (?:\+|joinchat/)(?P<invite>[a-z0-9_-]{6,})
+          | c/(?P<private>\d+)(?:/\d+)*
+          | (?:s/)?(?P<username>[a-z][a-z0-9_]{3,31})(?:/\d+)*
+        )
+        /?(?:\?[^\s\#]*)?(?:\#\S*)?
+    )\s*
+    """,
+    re.VERBOSE | re.IGNORECASE
+)
+
+class ParsedLink(NamedTuple):
+    kind: str  # username/invite/private
+    value: str  # lowercase username, invite hash or channel id
+    key: str  # canonical key used for deduplication
+    url: str  # canonical url stored in the database
+
+def parse_link(raw: str) -> Optional[ParsedLink]:
+    """
+    Разбирает любую поддерживаемую форму ссылки в типизированную запись.
+    Возвращает None для невалидных ссылок.
+    """
+    match = _LINK_RE.fullmatch(raw)
+    if match is None:
+        return None
+
+    invite = match.group('invite')
+    if invite is not None:
+        return ParsedLink(LINK_INVITE, invite, f"invite:{invite}", f"https://t.me/+{invite}")
+
+    private = match.group('private')
+    if private is not None:
+        return ParsedLink(LINK_PRIVATE, private, f"c:{private}", f"https://t.me/c/{private}")
+
+    username = (match.group('at') or match.group('username')).lower()
+    if username in RESERVED_PATHS:
+        return None
+    return ParsedLink(LINK_USERNAME, username, f"u:{username}", f"https://t.me/{username}")
+
+def parse_links(lines: Iterable[str]) -> Tuple[List[ParsedLink], List[str]]:
+    """
+    Разбирает список строк, убирая дубликаты по каноническому ключу.
+    Возвращает (parsed_links, invalid_lines)
+    """
+    parsed_links = []
+    invalid_lines = []
+    seen = set()
+
+    for line in lines:
+        if not line or line.isspace():
+            continue
+        parsed = parse_link(line)
+        if parsed is None:
+            invalid_lines.append(line)
+        elif parsed.key not in seen:
+            seen.add(parsed.key)
+            parsed_links.append(parsed)
+
+    return parsed_links, invalid_lines
@@ -1,36 +1,143 @@
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional, Tuple
+
 from config.config import settings
 
-def setup_logger(name: str) -> logging.Logger:
-    logger = logging.getLogger(name)
-    logger.setLevel(settings.LOG_LEVEL)
-    
-    # Create logs directory if it doesn't exist
+# Pass as extra= on per-link and per-message log calls: with LOG_SAMPLE_EVERY=N
+# only one of every N records from that call site reaches the handlers
+SAMPLED = {"sampled": True}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна запись - одна строка JSON
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "where": f"{record.module}:{record.lineno}",
+        }
+        # QueueHandler has already folded any traceback into the message
+        return json.dumps(entry, ensure_ascii=False)
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает одну из every записей каждого места вызова, помеченного SAMPLED
+    """
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or not getattr(record, "sampled", False):
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        if seen % self.every:
+            return False
+        if seen:
+            record.msg = f"{record.msg} (1 of {self.every} sampled)"
+        return True
+
+class PerLoggerFileHandler(logging.Handler):
+    """
+    Пишет каждый логгер в свой файл LOG_DIR/<name>.log с ротацией.
+    Работает только в потоке QueueListener, поэтому файлы открываются лениво
+    """
+    def __init__(self, directory: str, formatter: logging.Formatter):
+        super().__init__()
+        self.directory = directory
+        self.setFormatter(formatter)
+        self._files: Dict[str, RotatingFileHandler] = {}
+
+    def emit(self, record: logging.LogRecord):
+        handler = self._files.get(record.name)
+        if handler is None:
+            handler = RotatingFileHandler(
+                os.path.join(self.directory, f"{record.name}.log"),
+                maxBytes=10*1024*1024,  # 10MB
+                backupCount=5,
+                encoding="utf-8"
+            )
+            handler.setFormatter(self.formatter)
+            self._files[record.name] = handler
+        handler.handle(record)
+
+    def close(self):
+        for handler in self._files.values():
+            handler.close()
+        self._files.clear()
+        super().close()
+
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+def _start_pipeline() -> QueueHandler:
+    """
+    Один QueueHandler на процесс: вызывающий поток только кладет запись
+    в очередь, файлы и консоль пишет фоновый поток QueueListener
+    """
+    global _queue_handler, _listener
     os.makedirs(settings.LOG_DIR, exist_ok=True)
-    
-    # Create file handler
-    file_handler = RotatingFileHandler(
-        os.path.join(settings.LOG_DIR, f"{name}.log"),
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=5
-    )
-    file_handler.setLevel(settings.LOG_LEVEL)
-    
-    # Create console handler
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+
+    file_handler = PerLoggerFileHandler(settings.LOG_DIR, formatter)
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(settings.LOG_LEVEL)
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger 
\ No newline at end of file
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(records)
+    _queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_EVERY))
+    _listener = QueueListener(records, file_handler, console_handler)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _queue_handler
+
+def stop_logging():
+    """
+    Дописывает очередь и закрывает файлы; повторный setup_logger запустит конвейер заново
+    """
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
+
+def setup_logger(name: str) -> logging.Logger:
+    """
+    Возвращает логгер, подключенный к общему неблокирующему конвейеру.
+    Повторные вызовы для того же имени не добавляют обработчиков, а запись
+    не уходит дальше к родителю, у которого тоже может быть этот обработчик
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(settings.LOG_LEVEL)
+    with _setup_lock:
+        handler = _queue_handler or _start_pipeline()
+        # Drop handlers left by an earlier pipeline, e.g. after stop_logging()
+        for old in [h for h in logger.handlers if isinstance(h, QueueHandler) and h is not handler]:
+            logger.removeHandler(old)
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
+        # src.bot and src.bot.handlers both get the queue handler, propagating would queue records twice
+        logger.propagate = False
+    return logger
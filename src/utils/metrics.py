@@ -0,0 +1,248 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+from config.config import settings
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _key(self, label_values: Sequence) -> LabelValues:
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(label_values)}")
+        return tuple("" if value is None else str(value) for value in label_values)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0):
+        key = self._key(label_values)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(self._key(label_values), 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+class Gauge(_Metric):
+    """
+    Значение задается set() или вычисляется функцией при каждом опросе
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], Dict[LabelValues, float]]] = None
+
+    def set(self, value: float, *label_values):
+        self._values[self._key(label_values)] = value
+
+    def set_function(self, function: Optional[Callable[[], Dict[LabelValues, float]]]):
+        self._function = function
+
+    def samples(self) -> List[str]:
+        values = dict(self._values)
+        if self._function is not None:
+            try:
+                for key, value in self._function().items():
+                    values[self._key(key if isinstance(key, tuple) else (key,))] = value
+            except Exception as e:
+                logger.error(f"Failed to collect {self.name}: {e}")
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: counts per bucket (non-cumulative, +Inf last), sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *label_values):
+        key = self._key(label_values)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def count(self, *label_values) -> int:
+        return sum(self._counts.get(self._key(label_values), ()))
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self._counts[key]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Метрики процесса в текстовом формате Prometheus (exposition format 0.0.4)
+    """
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        if buckets is None:
+            return self._register(Histogram(name, documentation, labels))
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+metrics = MetricsRegistry()
+
+JOIN_RESULTS = metrics.counter(
+    "join_attempts_total", "Join attempts by result and error class", ("result", "error_class")
+)
+FLOOD_WAITS = metrics.counter(
+    "join_flood_waits_total", "FloodWait errors per account", ("account_id",)
+)
+FLOOD_WAIT_SECONDS = metrics.counter(
+    "join_flood_wait_seconds_total", "Seconds of FloodWait imposed per account", ("account_id",)
+)
+QUEUE_DEPTH = metrics.gauge(
+    "join_queue_depth", "Links waiting or in flight in running jobs per operator", ("owner_id",)
+)
+RPC_SECONDS = metrics.histogram(
+    "telegram_rpc_duration_seconds", "MTProto request latency", ("method",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DB_FLUSH_SECONDS = metrics.histogram(
+    "db_flush_duration_seconds", "Write-behind flush latency",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+DB_FLUSH_ROWS = metrics.counter(
+    "db_flush_rows_total", "Join results written by write-behind flushes"
+)
+BOT_EDITS = metrics.counter(
+    "bot_message_edits_total", "Bot API progress message edits by result", ("result",)
+)
+EVENTS_DROPPED = metrics.gauge(
+    "metrics_events_dropped", "Join events the metrics subscriber lost to overflow"
+)
+
+class MetricsServer:
+    """
+    Локальный HTTP endpoint /metrics для Prometheus и /rpc со сводкой
+    и последними MTProto вызовами из RpcTracer (?limit=N)
+    """
+    def __init__(self, registry: MetricsRegistry = metrics, host: str = settings.METRICS_HOST,
+                 port: int = settings.METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    async def _handle_rpc(self, request: web.Request) -> web.Response:
+        # rpc_trace feeds the RPC histogram from here, import it late
+        from src.utils.rpc_trace import rpc_tracer
+        try:
+            # recent(0) would slice [-0:], the whole buffer
+            limit = max(1, int(request.query.get("limit", 100)))
+        except ValueError:
+            limit = 100
+        return web.json_response({
+            "loop_lag": rpc_tracer.loop_lag,
+            "summary": rpc_tracer.summary(),
+            "recent": [span._asdict() for span in rpc_tracer.recent(limit)],
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        app.router.add_get("/rpc", self._handle_rpc)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, NamedTuple, Optional, TextIO
+
+from config.config import settings
+from src.utils.logger import setup_logger
+from src.utils.metrics import RPC_SECONDS
+
+logger = setup_logger(__name__)
+
+class RpcSpan(NamedTuple):
+    started_at: float  # unix time
+    duration: float  # seconds, as seen by the awaiting coroutine
+    request: str  # TL request type, e.g. JoinChannelRequest
+    account: str  # session the call went through
+    dc_id: Optional[int]
+    proxy: str  # proxy address or "" for a direct connection
+    outcome: str  # "ok" or the exception class name
+    loop_lag: float  # event loop lag measured around the call, seconds
+
+def request_name(request) -> str:
+    if isinstance(request, (list, tuple)):
+        # Telethon sends a list of requests as one container
+        names = {type(item).__name__ for item in request}
+        return f"batch[{','.join(sorted(names))}]"
+    return type(request).__name__
+
+class RpcTracer:
+    """
+    Журнал MTProto вызовов: длительность, тип запроса, аккаунт, DC и исход.
+
+    Последние buffer_size вызовов хранятся в кольцевом буфере; если задан
+    export_path, каждый вызов дописывается туда строкой JSON. loop_lag -
+    задержка event loop, измеренная фоновой задачей: если длительность
+    вызова велика, а lag мал, время ушло на Telegram или прокси; большой
+    lag значит, что ответ ждал занятый event loop.
+    """
+    def __init__(self, buffer_size: int = settings.RPC_TRACE_BUFFER,
+                 export_path: Optional[str] = settings.RPC_TRACE_FILE,
+                 lag_interval: float = 0.5):
+        self.spans: Deque[RpcSpan] = deque(maxlen=buffer_size)
+        self.export_path = export_path
+        self.lag_interval = lag_interval
+        self.loop_lag = 0.0
+        self._export: Optional[TextIO] = None
+        self._lag_probe: Optional[asyncio.Task] = None
+
+    @contextmanager
+    def span(self, request, account: str, dc_id: Optional[int] = None, proxy: str = ""):
+        self._start_lag_probe()
+        started_at = time.time()
+        started = time.perf_counter()
+        lag_before = self.loop_lag
+        outcome = "ok"
+        try:
+            yield
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            self.record(RpcSpan(
+                started_at,
+                time.perf_counter() - started,
+                request if isinstance(request, str) else request_name(request),
+                account,
+                dc_id,
+                proxy,
+                outcome,
+                max(lag_before, self.loop_lag)
+            ))
+
+    def record(self, span: RpcSpan):
+        self.spans.append(span)
+        RPC_SECONDS.observe(span.duration, span.request)
+        if self.export_path:
+            self._write(span)
+
+    def _write(self, span: RpcSpan):
+        try:
+            if self._export is None:
+                self._export = open(self.export_path, "a", encoding="utf-8")
+            self._export.write(json.dumps(span._asdict()) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to export RPC span to {self.export_path}: {e}")
+            self.export_path = None
+
+    def _start_lag_probe(self):
+        if self._lag_probe is not None:
+            return
+        try:
+            self._lag_probe = asyncio.get_running_loop().create_task(self._probe_lag())
+        except RuntimeError:
+            pass
+
+    async def _probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag = max(0.0, loop.time() - expected)
+            if self._export is not None:
+                self._export.flush()
+
+    def recent(self, limit: int = 100) -> List[RpcSpan]:
+        return list(self.spans)[-limit:]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Сводка по типам запросов из буфера: число, ошибки, p50/p95/max
+        """
+        durations: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        for span in self.spans:
+            durations.setdefault(span.request, []).append(span.duration)
+            if span.outcome != "ok":
+                errors[span.request] = errors.get(span.request, 0) + 1
+        summary = {}
+        for name, values in durations.items():
+            values.sort()
+            summary[name] = {
+                "count": len(values),
+                "errors": errors.get(name, 0),
+                "p50": values[len(values) // 2],
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1],
+            }
+        return summary
+
+    def close(self):
+        if self._lag_probe is not None:
+            self._lag_probe.cancel()
+            self._lag_probe = None
+        if self._export is not None:
+            self._export.close()
+            self._export = None
+
+rpc_tracer = RpcTracer()
@@ -1,29 +1,19 @@
-import re
 from typing import Tuple, List
-from urllib.parse import urlparse
+
+from src.utils.link_parser import parse_link, parse_links
 
 def validate_telegram_link(link: str) -> Tuple[bool, str]:
     """
-    Проверяет, является ли ссылка валидной для Telegram (принимает @, t.me/, http, https)
+    Проверяет, является ли ссылка валидной для Telegram (@username, t.me/..., http(s)://t.me/...)
     """
-    link = link.strip()
-    if link.startswith('@') or link.startswith('t.me/') or link.startswith('https://t.me/') or link.startswith('http://t.me/') or link.startswith('http://') or link.startswith('https://'):
+    if parse_link(link) is not None:
         return True, ""
     return False, "Невалидная ссылка"
 
 def validate_links(links: List[str]) -> Tuple[List[str], List[str]]:
     """
     Валидирует список ссылок
-    Возвращает (valid_links, invalid_links)
+    Возвращает (valid_links, invalid_links), valid_links - канонические URL без дубликатов
     """
-    valid_links = []
-    invalid_links = []
-    
-    for link in links:
-        is_valid, _ = validate_telegram_link(link)
-        if is_valid:
-            valid_links.append(link)
-        else:
-            invalid_links.append(link)
-            
-    return valid_links, invalid_links 
\ No newline at end of file
+    parsed_links, invalid_links = parse_links(links)
+    return [parsed.url for parsed in parsed_links], invalid_links
@@ -0,0 +1,40 @@
+import pytest
+
+from src.core.rate_limiter import AimdPacer, TokenBucket
+
+def _pacer(rate: float = 10.0) -> AimdPacer:
+    pacer = AimdPacer(TokenBucket(rate=1.0, burst=1, clock=lambda: 0.0),
+                      min_rate=2.0, max_rate=20.0, increase=5.0, decrease=0.5)
+    pacer.set(rate)
+    return pacer
+
+def test_rate_is_kept_per_minute_on_the_bucket():
+    pacer = _pacer(12.0)
+    assert pacer.rate == pytest.approx(12.0)
+    assert pacer.bucket.rate == pytest.approx(0.2)
+
+def test_success_adds_increase_over_rate():
+    pacer = _pacer(10.0)
+    assert pacer.on_success() == pytest.approx(10.5)
+
+def test_flood_wait_multiplies_by_decrease():
+    pacer = _pacer(10.0)
+    assert pacer.on_flood_wait() == pytest.approx(5.0)
+
+@pytest.mark.parametrize("requested, expected", [(0.1, 2.0), (1000.0, 20.0), (7.0, 7.0)])
+def test_set_clamps_to_bounds(requested, expected):
+    assert _pacer().set(requested) == pytest.approx(expected)
+
+def test_adjustments_stay_within_bounds():
+    pacer = _pacer(19.9)
+    for _ in range(100):
+        pacer.on_success()
+    assert pacer.rate == pytest.approx(20.0)
+    for _ in range(100):
+        pacer.on_flood_wait()
+    assert pacer.rate == pytest.approx(2.0)
+
+@pytest.mark.parametrize("decrease", [0.0, 1.0, 1.5])
+def test_decrease_must_be_a_fraction(decrease):
+    with pytest.raises(ValueError):
+        AimdPacer(TokenBucket(rate=1.0, burst=1), 1.0, 10.0, 1.0, decrease)
@@ -0,0 +1,84 @@
+import asyncio
+
+from src.core.events import (
+    COALESCE,
+    DROP_NEWEST,
+    DROP_OLDEST,
+    EventBus,
+    JOIN_FAILED,
+    JOIN_SUCCEEDED
+)
+
+def _publish_then_drain(policy: str, published, kinds=None, maxsize: int = 3):
+    received = []
+
+    async def run():
+        bus = EventBus()
+        subscription = bus.subscribe(received.append, kinds, maxsize=maxsize, policy=policy)
+        # publish() never yields, so the subscriber sees nothing until the loop runs
+        for kind, account_id, url in published:
+            bus.publish(kind, account_id, url)
+        pending = subscription.pending
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        bus.close()
+        return subscription, pending
+
+    subscription, pending = asyncio.run(run())
+    return subscription, pending, [event.url for event in received]
+
+def _events(count: int, account_id=None):
+    return [(JOIN_SUCCEEDED, account_id if account_id is not None else n, f"link{n}") for n in range(count)]
+
+def test_drop_oldest_keeps_the_newest_events():
+    subscription, pending, urls = _publish_then_drain(DROP_OLDEST, _events(5))
+    assert pending == 3
+    assert urls == ["link2", "link3", "link4"]
+    assert subscription.dropped == 2
+
+def test_drop_newest_keeps_the_first_events():
+    subscription, pending, urls = _publish_then_drain(DROP_NEWEST, _events(5))
+    assert urls == ["link0", "link1", "link2"]
+    assert subscription.dropped == 2
+
+def test_coalesce_keeps_the_latest_event_per_account():
+    published = [
+        (JOIN_SUCCEEDED, 1, "a1"), (JOIN_SUCCEEDED, 2, "b1"),
+        (JOIN_SUCCEEDED, 1, "a2"), (JOIN_FAILED, 2, "b2"),
+    ]
+    subscription, pending, urls = _publish_then_drain(COALESCE, published)
+    assert pending == 2
+    # A replaced account moves to the back of the line
+    assert urls == ["a2", "b2"]
+    assert subscription.dropped == 2
+
+def test_coalesce_evicts_the_oldest_key_when_full():
+    subscription, pending, urls = _publish_then_drain(COALESCE, _events(5))
+    assert urls == ["link2", "link3", "link4"]
+    assert subscription.dropped == 2
+
+def test_kinds_filter_is_not_counted_as_dropped():
+    published = [(JOIN_SUCCEEDED, 1, "ok"), (JOIN_FAILED, 1, "failed")]
+    subscription, pending, urls = _publish_then_drain(DROP_OLDEST, published, kinds={JOIN_FAILED})
+    assert urls == ["failed"]
+    assert subscription.dropped == 0
+    assert subscription.delivered == 1
+
+def test_failing_handler_does_not_stop_delivery():
+    received = []
+
+    def handler(event):
+        if event.url == "bad":
+            raise RuntimeError("boom")
+        received.append(event.url)
+
+    async def run():
+        bus = EventBus()
+        bus.subscribe(handler)
+        for url in ("first", "bad", "last"):
+            bus.publish(JOIN_SUCCEEDED, 1, url)
+        await asyncio.sleep(0)
+        bus.close()
+
+    asyncio.run(run())
+    assert received == ["first", "last"]
@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.core.fair_share import FairShare
+
+class ReadyLimiter:
+    async def wait_ready(self):
+        return
+
+def _account():
+    return SimpleNamespace(session_file="fair_share_test", rate_limiter=ReadyLimiter())
+
+async def _take_turns(share: FairShare, account, owner, turns: int, order: list):
+    async def one():
+        async with share.turn(account, owner):
+            order.append(owner)
+            await asyncio.sleep(0)
+    await asyncio.gather(*(one() for _ in range(turns)))
+
+def test_turns_follow_weights():
+    share = FairShare({"heavy": 2.0})
+    order = []
+
+    async def run():
+        account = _account()
+        await asyncio.gather(
+            _take_turns(share, account, "light", 6, order),
+            _take_turns(share, account, "heavy", 12, order),
+        )
+
+    asyncio.run(run())
+    # While both wait, a weight of 2 gets two turns for every one of the other
+    assert order[:9].count("heavy") == 6
+    assert order[:9].count("light") == 3
+    assert share.granted == {"light": 6, "heavy": 12}
+
+def test_newcomer_is_not_starved_by_a_long_running_owner():
+    share = FairShare()
+    order = []
+
+    async def run():
+        account = _account()
+        bulk = asyncio.create_task(_take_turns(share, account, "bulk", 50, order))
+        while len(order) < 20:
+            await asyncio.sleep(0)
+        await _take_turns(share, account, "small", 3, order)
+        await bulk
+
+    asyncio.run(run())
+    first_small = order.index("small")
+    # The small job starts from the current virtual time: it gets the next
+    # turn and then alternates with the bulk job instead of waiting it out
+    assert first_small == 20
+    assert order[first_small:first_small + 5] == ["small", "bulk", "small", "bulk", "small"]
+    assert order.count("bulk") == 50
+
+def test_cancelled_waiter_gives_up_its_turn():
+    share = FairShare()
+    order = []
+
+    async def run():
+        account = _account()
+        holder_entered = asyncio.Event()
+        release_holder = asyncio.Event()
+
+        async def holder():
+            async with share.turn(account, "a"):
+                holder_entered.set()
+                await release_holder.wait()
+
+        holder_task = asyncio.create_task(holder())
+        await holder_entered.wait()
+        waiter = asyncio.create_task(_take_turns(share, account, "b", 1, order))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release_holder.set()
+        await holder_task
+        await _take_turns(share, account, "c", 1, order)
+
+    asyncio.run(run())
+    assert order == ["c"]
@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, inspect, text
+
+from src.database.database import init_db
+
+# links and accounts as they were before status, link_type, priority, owner_id and join_rate
+OLD_SCHEMA = [
+    """CREATE TABLE accounts (
+        id INTEGER PRIMARY KEY, phone VARCHAR NOT NULL UNIQUE, session_file VARCHAR NOT NULL,
+        is_active BOOLEAN, successful_joins INTEGER, errors INTEGER, last_used DATETIME, created_at DATETIME
+    )""",
+    """CREATE TABLE links (
+        id INTEGER PRIMARY KEY, url VARCHAR NOT NULL UNIQUE, is_active BOOLEAN, is_joined BOOLEAN,
+        successful_joins INTEGER, last_check DATETIME, created_at DATETIME,
+        account_id INTEGER REFERENCES accounts(id)
+    )""",
+    "INSERT INTO accounts (id, phone, session_file) VALUES (1, '+1', 'sessions/+1.session')",
+    "INSERT INTO links (id, url, is_joined, account_id) VALUES (1, 'https://t.me/joined_chat', 1, 1)",
+    "INSERT INTO links (id, url, is_joined, account_id) VALUES (2, 'https://t.me/+abcdefgh12', 0, 1)",
+]
+
+def test_init_db_upgrades_an_existing_database_in_place(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        for statement in OLD_SCHEMA:
+            connection.execute(text(statement))
+
+    init_db(engine)
+    init_db(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("links")}
+    assert {"status", "link_type", "priority", "deadline"} <= columns
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT id, status, link_type, priority FROM links ORDER BY id")).all()
+        assert rows == [(1, "success", "username", 0), (2, "pending", "invite", 0)]
+        assert connection.execute(text("SELECT owner_id, join_rate FROM accounts")).one() == (None, None)
+    engine.dispose()
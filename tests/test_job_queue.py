@@ -0,0 +1,73 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.account_manager import AccountManager
+from src.core.client_pool import ClientPool
+from src.core.events import EventBus
+from src.core.fake_telegram import SimulatedTelegram, SimulationConfig
+from src.core.job_queue import JobQueue
+from src.core.join_scheduler import JoinScheduler
+from src.core.simulation import run_virtual
+from src.database.models import Base, JoinJob
+from src.database.operations import DatabaseOperations
+
+def _db_ops(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    Base.metadata.create_all(engine)
+    return DatabaseOperations(sessionmaker(bind=engine)())
+
+def test_job_stays_open_when_every_account_retires(tmp_path):
+    db_ops = _db_ops(tmp_path)
+    # Room for three more chats per account, the rest of the links hit ChannelsTooMuchError
+    world = SimulatedTelegram(SimulationConfig(
+        accounts=2, links=10, invite_ratio=0.0, member_ratio=0.0, dialog_limit=3,
+        latency_min=0.01, latency_max=0.02, flood_threshold=100
+    ))
+    accounts = [db_ops.create_account(f"retire_{index}", f"retire_{index}") for index in range(2)]
+    links = db_ops.add_links(accounts[0].id, world.make_links(10))
+    job_id = db_ops.create_join_job(None, links).id
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        pool = ClientPool(max_connections=2, client_factory=world.client)
+        managers = [
+            AccountManager(account.session_file, account.id, db_ops, events=EventBus(), pool=pool, clock=loop.time)
+            for account in accounts
+        ]
+        try:
+            scheduler = JoinScheduler(managers, clock=loop.time)
+            await scheduler.run_job(JobQueue(db_ops), job_id)
+        finally:
+            await pool.close_all()
+        return scheduler
+
+    scheduler = run_virtual(run())
+
+    assert scheduler.success_count == 6
+    assert JobQueue(db_ops).remaining(job_id) == 4
+    # Nothing is leased any more and the job is not closed over the queued links
+    assert db_ops.count_work_items(job_id) == {"success": 6, "queued": 4}
+    assert not db_ops.finish_join_job(job_id)
+    db_ops.db.expire_all()
+    assert db_ops.db.get(JoinJob, job_id).status == "running"
+    assert [job.id for job in db_ops.get_unfinished_jobs()] == [job_id]
+
+def test_hand_off_and_lost_lease_do_not_count_attempts(tmp_path):
+    db_ops = _db_ops(tmp_path)
+    account = db_ops.create_account("attempts", "attempts")
+    job_id = db_ops.create_join_job(None, db_ops.add_links(account.id, ["https://t.me/attempts_test"])).id
+    job_queue = JobQueue(db_ops)
+
+    # Claim, then hand the item back as a retiring account does
+    assert job_queue.release(job_queue.claim(job_id))
+    # Claim again and lose the lease as a crashed worker does
+    JobQueue(db_ops, lease_seconds=-1).claim(job_id)
+    assert db_ops.requeue_expired_leases() == 1
+
+    item = job_queue.claim(job_id)
+    assert item.attempts == 0
+    # A transient failure is what spends the retry budget
+    assert job_queue.retry(item, 0)
+    assert job_queue.claim(job_id).attempts == 1
@@ -0,0 +1,58 @@
+import asyncio
+import random
+
+import pytest
+from telethon.errors import (
+    AuthKeyUnregisteredError,
+    ChannelPrivateError,
+    ChannelsTooMuchError,
+    FloodWaitError,
+    InviteHashExpiredError,
+    RpcCallFailError,
+    ServerError,
+    UserDeactivatedBanError
+)
+
+from src.core.join_errors import (
+    backoff_delay,
+    classify_error,
+    JoinResult,
+    ERROR_ACCOUNT,
+    ERROR_PERMANENT,
+    ERROR_RATE_LIMITED,
+    ERROR_TRANSIENT
+)
+
+@pytest.mark.parametrize("error, error_class", [
+    (FloodWaitError(None, capture=30), ERROR_RATE_LIMITED),
+    (ChannelsTooMuchError(None), ERROR_ACCOUNT),
+    (AuthKeyUnregisteredError(None), ERROR_ACCOUNT),
+    (UserDeactivatedBanError(None), ERROR_ACCOUNT),
+    (ConnectionError(), ERROR_TRANSIENT),
+    (asyncio.TimeoutError(), ERROR_TRANSIENT),
+    (RpcCallFailError(None), ERROR_TRANSIENT),
+    (ServerError(None, "INTERNAL"), ERROR_TRANSIENT),
+    (InviteHashExpiredError(None), ERROR_PERMANENT),
+    (ChannelPrivateError(None), ERROR_PERMANENT),
+    (ValueError("No user has that username"), ERROR_PERMANENT),
+])
+def test_classify_error(error, error_class):
+    assert classify_error(error) == error_class
+
+def test_only_transient_and_rate_limited_results_are_retryable():
+    assert JoinResult(False, "timeout", ERROR_TRANSIENT).retryable
+    assert JoinResult(False, "flood", ERROR_RATE_LIMITED).retryable
+    assert not JoinResult(False, "full", ERROR_ACCOUNT).retryable
+    assert not JoinResult(False, "expired", ERROR_PERMANENT).retryable
+    assert not JoinResult(True).retryable
+
+@pytest.mark.parametrize("attempt, ceiling", [(1, 5.0), (2, 10.0), (3, 20.0), (4, 40.0), (10, 60.0)])
+def test_backoff_delay_doubles_from_base_up_to_cap(attempt, ceiling, monkeypatch):
+    # Full jitter: the delay is uniform below the ceiling, pin it to the top
+    monkeypatch.setattr(random, "uniform", lambda low, high: high)
+    assert backoff_delay(attempt, base=5.0, cap=60.0) == ceiling
+
+def test_backoff_delay_is_jittered_within_the_ceiling():
+    delays = [backoff_delay(3, base=5.0, cap=60.0) for _ in range(200)]
+    assert all(0 <= delay <= 20.0 for delay in delays)
+    assert len(set(delays)) > 1
@@ -0,0 +1,48 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.account_manager import AccountManager
+from src.core.client_pool import ClientPool
+from src.core.events import EventBus
+from src.core.fake_telegram import SimulatedTelegram, SimulationConfig
+from src.core.join_scheduler import JoinScheduler
+from src.core.simulation import run_virtual
+from src.database.models import Base, JoinAttempt
+from src.database.operations import DatabaseOperations
+from src.database.write_behind import WriteBehindBuffer
+
+def test_already_joined_links_are_persisted(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'skip.db'}")
+    Base.metadata.create_all(engine)
+    db_ops = DatabaseOperations(sessionmaker(bind=engine)())
+    # The account is already in every chat of the campaign
+    world = SimulatedTelegram(SimulationConfig(accounts=1, links=5, invite_ratio=0.0, member_ratio=1.0))
+    urls = world.make_links(5)
+    account = db_ops.create_account("skip_joined", "skip_joined")
+    db_ops.add_links(account.id, urls)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        pool = ClientPool(max_connections=1, client_factory=world.client)
+        account_manager = AccountManager(
+            account.session_file, account.id, db_ops, events=EventBus(), pool=pool, clock=loop.time
+        )
+        write_buffer = WriteBehindBuffer(db_ops)
+        scheduler = JoinScheduler([account_manager], write_buffer=write_buffer, clock=loop.time)
+        try:
+            await scheduler.run(db_ops.get_pending_links(account.id))
+        finally:
+            await write_buffer.close()
+            await pool.close_all()
+        return scheduler
+
+    scheduler = run_virtual(run())
+
+    assert len(scheduler.skipped_links) == 5
+    assert world.stats["requests"] == 0
+    db_ops.db.expire_all()
+    # The next campaign has nothing left to queue
+    assert db_ops.get_pending_links(account.id) == []
+    assert db_ops.db.query(JoinAttempt).filter(JoinAttempt.status == "success").count() == 5
@@ -0,0 +1,53 @@
+import pytest
+
+from src.utils.link_parser import LINK_INVITE, LINK_PRIVATE, LINK_USERNAME, parse_link, parse_links
+
+@pytest.mark.parametrize("raw", [
+    "@Durov",
+    "https://t.me/Durov",
+    "t.me/durov/",
+    " t.me/durov ",
+    "http://www.telegram.me/durov?start=1",
+    "telegram.dog/durov#about",
+    "https://t.me/s/durov",
+    "https://t.me/durov/123",
+])
+def test_username_forms_share_one_canonical_link(raw):
+    parsed = parse_link(raw)
+    assert parsed is not None
+    assert (parsed.kind, parsed.value, parsed.key, parsed.url) == (
+        LINK_USERNAME, "durov", "u:durov", "https://t.me/durov"
+    )
+
+@pytest.mark.parametrize("raw", [
+    "https://t.me/+AbCdEf123",
+    "t.me/joinchat/AbCdEf123",
+    "https://telegram.me/joinchat/AbCdEf123/",
+])
+def test_invite_forms_keep_the_hash_case(raw):
+    parsed = parse_link(raw)
+    assert (parsed.kind, parsed.value, parsed.url) == (LINK_INVITE, "AbCdEf123", "https://t.me/+AbCdEf123")
+
+def test_private_message_link_points_at_the_channel():
+    parsed = parse_link("https://t.me/c/12345/67")
+    assert (parsed.kind, parsed.value, parsed.url) == (LINK_PRIVATE, "12345", "https://t.me/c/12345")
+
+@pytest.mark.parametrize("raw", [
+    "durov",  # no host and no @
+    "https://t.me/abc",  # usernames are at least 4 characters
+    "https://t.me/addstickers",  # reserved t.me path
+    "t.me/+abc",  # invite hash too short
+    "https://example.com/durov",
+    "https://t.me/durov extra",
+    "",
+])
+def test_invalid_links(raw):
+    assert parse_link(raw) is None
+
+def test_parse_links_deduplicates_by_canonical_key():
+    parsed, invalid = parse_links([
+        "t.me/durov", "@DUROV", "", "   ", "not a link",
+        "https://t.me/+AbCdEf123", "t.me/joinchat/AbCdEf123"
+    ])
+    assert [link.key for link in parsed] == ["u:durov", "invite:AbCdEf123"]
+    assert invalid == ["not a link"]
@@ -0,0 +1,23 @@
+import logging
+
+from config.config import settings
+from src.utils.logger import setup_logger, stop_logging
+
+def test_parent_and_child_loggers_emit_each_record_once(tmp_path, monkeypatch):
+    stop_logging()
+    monkeypatch.setattr(settings, "LOG_DIR", str(tmp_path))
+    try:
+        setup_logger("dup_check")
+        child = setup_logger("dup_check.child")
+        setup_logger("dup_check.child")
+        # Not set up itself: reaches the pipeline through its parent
+        grandchild = logging.getLogger("dup_check.child.grandchild")
+
+        child.warning("child line")
+        grandchild.warning("grandchild line")
+    finally:
+        stop_logging()
+
+    assert (tmp_path / "dup_check.child.log").read_text().count("child line") == 1
+    assert (tmp_path / "dup_check.child.grandchild.log").read_text().count("grandchild line") == 1
+    assert not (tmp_path / "dup_check.log").exists()
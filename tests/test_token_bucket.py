@@ -0,0 +1,67 @@
+import pytest
+
+from src.core.rate_limiter import TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_burst_then_refill_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, burst=2, clock=clock)
+
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.delay() == pytest.approx(2.0)
+
+    clock.now += 1
+    assert bucket.delay() == pytest.approx(1.0)
+    clock.now += 1
+    assert bucket.try_acquire()
+
+def test_tokens_never_exceed_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, burst=3, clock=clock)
+    clock.now += 1000
+    assert bucket.delay() == 0
+    assert bucket.tokens == 3
+
+def test_cooldown_blocks_and_does_not_accumulate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, burst=5, clock=clock)
+
+    bucket.set_cooldown(60)
+    assert bucket.tokens == 0
+    assert bucket.cooldown_remaining() == 60
+    # Nothing refills during the cooldown, the first token comes one interval after it
+    assert bucket.delay() == pytest.approx(61.0)
+    clock.now += 60
+    assert not bucket.try_acquire()
+    clock.now += 1
+    assert bucket.try_acquire()
+
+def test_shorter_cooldown_does_not_cut_a_longer_one():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, burst=1, clock=clock)
+    bucket.set_cooldown(60)
+    bucket.set_cooldown(10)
+    assert bucket.cooldown_remaining() == 60
+
+def test_set_rate_keeps_accumulated_tokens():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, burst=10, clock=clock)
+    bucket.tokens = 0
+    clock.now += 2
+    bucket.set_rate(0.1)
+    # Two seconds at the old rate were credited before the change
+    assert bucket.tokens == pytest.approx(2.0)
+    assert bucket.rate == 0.1
+
+@pytest.mark.parametrize("rate, burst", [(0, 1), (-1, 1), (1, 0)])
+def test_invalid_parameters(rate, burst):
+    with pytest.raises(ValueError):
+        TokenBucket(rate=rate, burst=burst)
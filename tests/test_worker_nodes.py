@@ -0,0 +1,151 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.core.fake_telegram import SimulatedTelegram, SimulationConfig
+from src.database.models import AccountLease, Base, JoinJob, JoinWorkItem
+from src.database.operations import DatabaseOperations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACCOUNTS = 4
+LINKS = 40
+
+def _world() -> SimulatedTelegram:
+    # Fast, flood-free Telegram; the seed makes every process generate the same links
+    return SimulatedTelegram(SimulationConfig(
+        accounts=ACCOUNTS, links=LINKS, member_ratio=0.0, expired_ratio=0.0,
+        latency_min=0.01, latency_max=0.02, flood_threshold=LINKS + 1
+    ))
+
+# A worker node process: the real run_worker_node with the simulated Telegram behind the client pool
+NODE = """
+import asyncio
+from src.core.client_pool import client_pool
+from src.database.database import get_db
+from src.database.operations import DatabaseOperations
+from src.core.worker_node import run_worker_node
+from tests.test_worker_nodes import _world, LINKS
+
+world = _world()
+world.make_links(LINKS)
+client_pool.client_factory = world.client
+asyncio.run(run_worker_node(DatabaseOperations(next(get_db()))))
+"""
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+def _start_node(env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", NODE], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def _wait_for(condition, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.2)
+    raise AssertionError(f"Timed out waiting for {what}")
+
+def test_two_worker_nodes_hand_over_accounts_and_finish_the_job(tmp_path):
+    db_path = tmp_path / "nodes.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    event.listen(engine, "connect", _sqlite_pragmas)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db_ops = DatabaseOperations(db)
+
+    account_ids = [
+        db_ops.create_account(f"node_test_{index}", f"node_test_{index}").id
+        for index in range(ACCOUNTS)
+    ]
+    links = db_ops.add_links(account_ids[0], _world().make_links(LINKS))
+    job_id = db_ops.create_join_job(None, links).id
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        API_ID="1",
+        API_HASH="x",
+        DATABASE_URL=f"sqlite:///{db_path}",
+        LOG_DIR=str(tmp_path / "logs"),
+        SESSION_DIR=str(tmp_path / "sessions"),
+        METRICS_PORT="0",
+        NODE_LEASE_SECONDS="3",
+        NODE_HEARTBEAT_INTERVAL="1",
+        JOB_LEASE_SECONDS="3",
+        JOB_HEARTBEAT_INTERVAL="1",
+        JOB_POLL_INTERVAL="0.2",
+        JOIN_RATE_PER_MINUTE="60",
+        JOIN_BURST="1",
+    )
+
+    def owners():
+        db.expire_all()
+        return {lease.account_id: lease.node_id for lease in db.query(AccountLease).all() if lease.node_id}
+
+    def done():
+        db.expire_all()
+        return db.query(JoinWorkItem).filter(
+            JoinWorkItem.job_id == job_id,
+            JoinWorkItem.status.notin_(("queued", "leased"))
+        ).count()
+
+    first = _start_node(env)
+    second = None
+    try:
+        _wait_for(lambda: len(owners()) == ACCOUNTS and len(set(owners().values())) == 1, 30,
+                  "the first node to take every account")
+        _wait_for(lambda: done() > 0, 30, "the first node to start joining")
+
+        # A second node joins: the first hands over half of the accounts
+        second = _start_node(env)
+        _wait_for(lambda: sorted(list(owners().values()).count(n) for n in set(owners().values())) == [2, 2],
+                  30, "the accounts to split between two nodes")
+        assert done() < LINKS, "the job finished before the second node took part"
+
+        # The first node dies without releasing anything: its leases expire and move over
+        first.send_signal(signal.SIGKILL)
+        first.wait()
+        _wait_for(lambda: len(owners()) == ACCOUNTS and len(set(owners().values())) == 1, 30,
+                  "the surviving node to take over every account")
+
+        _wait_for(lambda: done() == LINKS, 90, "the job to drain")
+        _wait_for(lambda: db.get(JoinJob, job_id).status == "finished", 30, "the job to be finished")
+        db.expire_all()
+        assert db.query(JoinWorkItem).filter(
+            JoinWorkItem.job_id == job_id, JoinWorkItem.status == "success"
+        ).count() == LINKS
+    finally:
+        for process in (first, second):
+            if process is not None and process.poll() is None:
+                process.terminate()
+                process.wait(10)
+        db.close()
+        engine.dispose()
+
+def test_finish_join_job_keeps_a_cancelled_job_cancelled(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cancel.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db_ops = DatabaseOperations(db)
+    account = db_ops.create_account("cancel_test", "cancel_test")
+    job = db_ops.create_join_job(None, db_ops.add_links(account.id, ["https://t.me/cancel_test"]))
+
+    assert db_ops.finish_join_job(job.id, "cancelled")
+    # A worker node that sees the drained queue afterwards must not overwrite the status
+    assert not db_ops.finish_join_job(job.id)
+    db.expire_all()
+    assert db.get(JoinJob, job.id).status == "cancelled"
+    db.close()
+    engine.dispose()
@@ -0,0 +1,63 @@
+import asyncio
+
+from src.database.write_behind import WriteBehindBuffer
+
+class FailingDatabase:
+    """
+    save_join_results, которая не может писать, пока available=False
+    """
+    def __init__(self):
+        self.available = False
+        self.saved_attempts = []
+        self.saved_statuses = {}
+
+    def save_join_results(self, attempts, link_statuses):
+        if not self.available:
+            return False
+        self.saved_attempts += attempts
+        self.saved_statuses.update(link_statuses)
+        return True
+
+def _fill(buffer: WriteBehindBuffer, links: int):
+    for link_id in range(links):
+        buffer.add_attempt(1, link_id, "success")
+        buffer.set_link_status(link_id, "success")
+        assert buffer.pending <= buffer.max_pending
+
+def test_buffer_stays_bounded_while_flushes_fail():
+    db = FailingDatabase()
+
+    async def run():
+        buffer = WriteBehindBuffer(db, batch_size=5, flush_ms=10, max_pending=10)
+        _fill(buffer, 100)
+        # Let the background flusher fail a few times too
+        await asyncio.sleep(0.05)
+        assert buffer.pending <= 10
+        assert buffer.dropped == 200 - buffer.pending
+
+        # Once the database is back, the newest results are written
+        db.available = True
+        await buffer.close()
+        assert buffer.pending == 0
+
+    asyncio.run(run())
+    assert 99 in db.saved_statuses
+
+def test_write_through_without_event_loop_stays_bounded():
+    db = FailingDatabase()
+    buffer = WriteBehindBuffer(db, batch_size=1, max_pending=10)
+    _fill(buffer, 100)
+    assert buffer.dropped == 200 - buffer.pending
+
+def test_failed_flush_keeps_the_latest_status_of_a_link():
+    db = FailingDatabase()
+    buffer = WriteBehindBuffer(db, max_pending=10)
+
+    buffer.set_link_status(1, "failed")
+    buffer.flush()
+    buffer.set_link_status(1, "success")
+    buffer.flush()
+
+    db.available = True
+    buffer.flush()
+    assert db.saved_statuses == {1: "success"}